@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BasisEngine:
+    """Spot/futures basis from matching aggTrade streams.
+
+    Each symbol owns a fixed slot in preallocated arrays holding the last
+    price and event time on each side, so a tick is one dict lookup and a few
+    array stores: no joins or allocations per tick. Basis is computed for all
+    dirty, time-aligned slots at once on a bounded publish cadence.
+
+    Annualized basis uses the same convention as the funding figures
+    (three 8h funding intervals per day), so the two are directly comparable.
+    """
+
+    def __init__(self, max_symbols: int = 64, max_skew_ms: int = 2000, publish_interval: float = 1.0,
+                 on_update: Optional[Callable[[str, Dict], None]] = None):
+        self.max_symbols = max_symbols
+        self.max_skew_ms = max_skew_ms
+        self.publish_interval = publish_interval
+        self.on_update = on_update
+
+        self.slots: Dict[str, int] = {}
+        self.symbols: List[Optional[str]] = []  # By slot; None for released slots
+        self.free_slots: List[int] = []
+        self.futures_price = np.full(max_symbols, np.nan)
+        self.futures_ts = np.zeros(max_symbols, dtype=np.int64)
+        self.spot_price = np.full(max_symbols, np.nan)
+        self.spot_ts = np.zeros(max_symbols, dtype=np.int64)
+        self.funding_rate = np.full(max_symbols, np.nan)
+        self.mark_price = np.full(max_symbols, np.nan)
+        self.index_price = np.full(max_symbols, np.nan)
+        self.dirty = np.zeros(max_symbols, dtype=bool)
+        self.latest: Dict[str, Dict] = {}
+
+    def _slot(self, symbol: str) -> Optional[int]:
+        slot = self.slots.get(symbol)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.symbols[slot] = symbol
+            elif len(self.symbols) < self.max_symbols:
+                slot = len(self.symbols)
+                self.symbols.append(symbol)
+            else:
+                return None
+            self.slots[symbol] = slot
+        return slot
+
+    def release(self, symbol: str):
+        """Free a symbol's slot, clearing its prices and last published basis"""
+        slot = self.slots.pop(symbol, None)
+        if slot is None:
+            return
+        self.symbols[slot] = None
+        self.free_slots.append(slot)
+        self.futures_price[slot] = self.spot_price[slot] = np.nan
+        self.futures_ts[slot] = self.spot_ts[slot] = 0
+        self.funding_rate[slot] = self.mark_price[slot] = self.index_price[slot] = np.nan
+        self.dirty[slot] = False
+        self.latest.pop(symbol, None)
+
+    def retain(self, keep):
+        """Release every symbol not in keep (the symbols still streamed)"""
+        for symbol in list(self.slots):
+            if symbol not in keep:
+                self.release(symbol)
+
+    def on_futures_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        """Trade listener for the futures aggTrade streams"""
+        slot = self._slot(symbol)
+        if slot is None:
+            return
+        self.futures_price[slot] = price
+        self.futures_ts[slot] = timestamp
+        self.dirty[slot] = True
+
+    async def handle_spot_trade(self, data: Dict):
+        """Process spot aggTrade data from Binance"""
+        try:
+            slot = self._slot(data.get('s', 'Unknown'))
+            if slot is None:
+                return
+            self.spot_price[slot] = float(data.get('p', 0))
+            self.spot_ts[slot] = data.get('T', 0)
+            self.dirty[slot] = True
+        except Exception as e:
+            logger.error(f"Error processing spot trade data: {e}")
+
+    def on_funding(self, symbol: str, funding_rate: float, mark_price: float, index_price: float, timestamp: int):
+        """Funding listener for the markPrice streams"""
+        slot = self._slot(symbol)
+        if slot is None:
+            return
+        self.funding_rate[slot] = funding_rate
+        self.mark_price[slot] = mark_price
+        self.index_price[slot] = index_price
+
+    def compute(self, only_dirty: bool = True) -> Dict[str, Dict]:
+        """Compute basis for time-aligned symbols (vectorized over slots)"""
+        count = len(self.symbols)
+        futures = self.futures_price[:count]
+        spot = self.spot_price[:count]
+        skew = np.abs(self.futures_ts[:count] - self.spot_ts[:count])
+        ready = np.isfinite(futures) & np.isfinite(spot) & (spot > 0) & (skew <= self.max_skew_ms)
+        if only_dirty:
+            ready &= self.dirty[:count]
+        self.dirty[:count] &= ~ready
+
+        indices = np.flatnonzero(ready)
+        if indices.size == 0:
+            return {}
+        basis = futures[indices] - spot[indices]
+        basis_pct = basis / spot[indices] * 100
+        annualized = basis_pct * 3 * 365
+        funding_annual = self.funding_rate[indices] * 100 * 3 * 365
+
+        updates = {}
+        for j, slot in enumerate(indices.tolist()):
+            symbol = self.symbols[slot]
+            updates[symbol] = {
+                'futuresPrice': float(futures[slot]),
+                'spotPrice': float(spot[slot]),
+                'basis': float(basis[j]),
+                'basisBps': float(basis_pct[j] * 100),
+                'annualized': float(annualized[j]),
+                'fundingAnnual': None if np.isnan(funding_annual[j]) else float(funding_annual[j]),
+                'markPrice': None if np.isnan(self.mark_price[slot]) else float(self.mark_price[slot]),
+                'skewMs': int(skew[slot]),
+                'timestamp': int(max(self.futures_ts[slot], self.spot_ts[slot]))
+            }
+        self.latest.update(updates)
+        return updates
+
+    async def publish_loop(self):
+        """Push basis updates for changed symbols at a bounded cadence"""
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            try:
+                updates = self.compute()
+                if self.on_update:
+                    for symbol, update in updates.items():
+                        self.on_update(symbol, update)
+            except Exception as e:
+                logger.error(f"Error publishing basis updates: {e}")
+
+    def get_snapshot(self) -> Dict[str, Dict]:
+        """Latest published basis per symbol"""
+        return dict(self.latest)
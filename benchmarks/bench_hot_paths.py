@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the handler and aggregation hot paths.
+
+Usage:
+    python benchmarks/bench_hot_paths.py                 # compare against baselines.json
+    python benchmarks/bench_hot_paths.py --record        # (re)record baselines.json
+    python benchmarks/bench_hot_paths.py --input rec.ndjson --only handle_trade
+
+Each benchmark reports the best per-message time over several repeats and
+fails (exit code 1) when it is slower than its baseline by more than the
+tolerance. Baselines are machine specific: record them on the box you
+compare on.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from websocket_manager import BinanceWebSocketManager
+from liquidation_handler import LiquidationHandler
+from funding_handler import FundingHandler
+from trades_handler import TradesHandler
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'DOGEUSDT', 'XRPUSDT', 'ADAUSDT', 'AVAXUSDT']
+PRICES = {'BTCUSDT': 65000.0, 'ETHUSDT': 3200.0, 'SOLUSDT': 150.0, 'BNBUSDT': 580.0,
+          'DOGEUSDT': 0.15, 'XRPUSDT': 0.55, 'ADAUSDT': 0.45, 'AVAXUSDT': 35.0}
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+def synthetic_trades(count: int, seed: int = 42, start_ms: Optional[int] = None) -> List[Dict]:
+    """aggTrade payloads spread over the default symbols at ~50k msgs/s of event time"""
+    rng = random.Random(seed)
+    start_ms = start_ms if start_ms is not None else 1_700_000_000_000
+    trades = []
+    for i in range(count):
+        symbol = SYMBOLS[i % 2] if rng.random() < 0.8 else rng.choice(SYMBOLS)
+        price = PRICES[symbol] * (1 + rng.uniform(-0.001, 0.001))
+        trades.append({
+            'e': 'aggTrade', 'E': start_ms + i // 50, 's': symbol, 'a': i,
+            'p': f"{price:.4f}", 'q': f"{rng.expovariate(1 / (5000 / PRICES[symbol])):.4f}",
+            'T': start_ms + i // 50, 'm': rng.random() < 0.5
+        })
+    return trades
+
+
+def synthetic_liquidations(count: int, seed: int = 43) -> List[Dict]:
+    """forceOrder payloads shaped like a liquidation cascade"""
+    rng = random.Random(seed)
+    start_ms = 1_700_000_000_000
+    events = []
+    for i in range(count):
+        symbol = rng.choice(SYMBOLS)
+        price = PRICES[symbol] * (1 - 0.0001 * i / max(count, 1))
+        quantity = rng.paretovariate(1.2) * 20_000 / PRICES[symbol]
+        events.append({
+            'e': 'forceOrder', 'E': start_ms + i * 5,
+            'o': {'s': symbol, 'S': 'SELL' if rng.random() < 0.8 else 'BUY', 'o': 'LIMIT', 'f': 'IOC',
+                  'q': f"{quantity:.4f}", 'p': f"{price:.4f}", 'ap': f"{price:.4f}", 'X': 'FILLED',
+                  'l': f"{quantity:.4f}", 'z': f"{quantity:.4f}", 'T': start_ms + i * 5}
+        })
+    return events
+
+
+def synthetic_funding(count: int, seed: int = 44) -> List[Dict]:
+    """markPriceUpdate payloads with slowly drifting funding rates"""
+    rng = random.Random(seed)
+    rates = {symbol: rng.uniform(-0.0002, 0.0005) for symbol in SYMBOLS}
+    events = []
+    for i in range(count):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        if rng.random() < 0.3:
+            rates[symbol] += rng.uniform(-0.000002, 0.000002)
+        events.append({
+            'e': 'markPriceUpdate', 'E': 1_700_000_000_000 + i * 125, 's': symbol,
+            'p': f"{PRICES[symbol]:.4f}", 'i': f"{PRICES[symbol]:.4f}", 'P': f"{PRICES[symbol]:.4f}",
+            'r': f"{rates[symbol]:.8f}", 'T': 1_700_028_800_000
+        })
+    return events
+
+
+def load_recorded(path: str) -> Dict[str, List[Dict]]:
+    """Load a recorded NDJSON capture (raw payloads or combined-stream envelopes)"""
+    recorded = {'aggTrade': [], 'forceOrder': [], 'markPriceUpdate': []}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            message = json.loads(line)
+            payload = message.get('data', message)
+            event_type = payload.get('e')
+            if event_type in recorded:
+                recorded[event_type].append(payload)
+    return recorded
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+def best_time(run: Callable[[], float], repeat: int) -> float:
+    """Run a timed body several times and keep the fastest (least noisy) result"""
+    run()  # Warm-up: imports, allocator and caches
+    return min(run() for _ in range(repeat))
+
+
+def run_async(coro_fn: Callable) -> Callable[[], float]:
+    """Wrap an async body returning elapsed seconds into a sync timer"""
+    def runner():
+        return asyncio.run(coro_fn())
+    return runner
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow console output so terminal cost doesn't dominate the numbers"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks: each returns seconds per message (or per call)
+# ---------------------------------------------------------------------------
+
+def bench_handle_trade(inputs: Dict, repeat: int) -> float:
+    trades = inputs['trades']
+
+    async def body():
+        handler = TradesHandler(min_usd_value=float('inf'))
+        start = time.perf_counter()
+        for trade in trades:
+            await handler.handle_trade(trade)
+        return time.perf_counter() - start
+
+    return best_time(run_async(body), repeat) / len(trades)
+
+
+def bench_handle_batch(inputs: Dict, repeat: int) -> float:
+    """Same trades as handle_trade, delivered as drained socket batches"""
+    trades = inputs['trades']
+    size = inputs['batch_size']
+    batches = [trades[i:i + size] for i in range(0, len(trades), size)]
+
+    async def body():
+        handler = TradesHandler(min_usd_value=float('inf'))
+        start = time.perf_counter()
+        for batch in batches:
+            await handler.handle_batch(batch)
+        return time.perf_counter() - start
+
+    return best_time(run_async(body), repeat) / len(trades)
+
+
+def bench_check_and_print_trades(inputs: Dict, repeat: int) -> float:
+    """One watermark sweep over thousands of symbols that closes (and alerts) every bucket"""
+    bucket_count = inputs['buckets']
+    # Trades a few seconds old: the sweep's watermark has passed all of their seconds
+    trade_ms = int(time.time() * 1000) - 3000
+    trades = [
+        {'s': f"SYM{i // 2}USDT", 'p': '10.0', 'q': '1.0', 'T': trade_ms, 'm': bool(i % 2)}
+        for i in range(bucket_count)
+    ]
+
+    async def body():
+        handler = TradesHandler(min_usd_value=0)
+        handler.console = False
+        for trade in trades:
+            await handler.handle_trade(trade)
+        handler.clock_offset_ms = 0.0  # Sweep against the local clock
+        start = time.perf_counter()
+        await handler._check_and_print_trades()
+        elapsed = time.perf_counter() - start
+        assert not handler.trade_buckets, "sweep left buckets open"
+        return elapsed
+
+    return best_time(run_async(body), repeat)
+
+
+def bench_handle_liquidation(inputs: Dict, repeat: int) -> float:
+    events = inputs['liquidations']
+
+    async def body():
+        handler = LiquidationHandler(min_usd_value=100_000)
+        with quiet():
+            start = time.perf_counter()
+            for event in events:
+                await handler.handle_liquidation(event)
+            return time.perf_counter() - start
+
+    return best_time(run_async(body), repeat) / len(events)
+
+
+def bench_handle_funding_rate(inputs: Dict, repeat: int) -> float:
+    events = inputs['funding']
+
+    async def body():
+        handler = FundingHandler(min_funding_rate=10)
+        with quiet():
+            start = time.perf_counter()
+            for event in events:
+                await handler.handle_funding_rate(event)
+            return time.perf_counter() - start
+
+    return best_time(run_async(body), repeat) / len(events)
+
+
+class _FakeWebSocket:
+    """Async iterator over pre-encoded frames, standing in for a live socket"""
+
+    def __init__(self, frames: List[str]):
+        self.frames = frames
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for frame in self.frames:
+            yield frame
+
+
+def bench_handle_messages(inputs: Dict, repeat: int) -> float:
+    """JSON decode plus callback dispatch in BinanceWebSocketManager._handle_messages"""
+    frames = [json.dumps(trade, separators=(',', ':')) for trade in inputs['trades']]
+
+    async def noop(data):
+        pass
+
+    async def body():
+        manager = BinanceWebSocketManager()
+        manager.callbacks['btcusdt@aggTrade'] = [noop]
+        start = time.perf_counter()
+        await manager._handle_messages('btcusdt@aggTrade', _FakeWebSocket(frames))
+        return time.perf_counter() - start
+
+    return best_time(run_async(body), repeat) / len(frames)
+
+
+def bench_emit_fanout(inputs: Dict, repeat: int) -> float:
+    """emit_liquidation/emit_trade/emit_funding matched against registered client sessions"""
+    import web_server
+    from bounded_state import symbols
+    from events import FundingEvent, LiquidationEvent, TradeEvent
+
+    count = inputs['emits']
+    btc = symbols.intern('BTCUSDT')
+    liquidation = LiquidationEvent(btc, False, 65000.0, 2.0, 130000.0, 1_700_000_000_000)
+    trade = TradeEvent(btc, 1_700_000_000, 750000.0, False)
+    funding = FundingEvent(btc, 0.01, 10.95, 1_700_000_000_000)
+
+    # Clients with mixed symbol sets and thresholds; a tenth use the compact encoding.
+    # Their sids have no socket, so emits are matched and encoded but not written
+    sids = [f"bench-{i}" for i in range(inputs['clients'])]
+    for i, sid in enumerate(sids):
+        watched = ['BTC', 'ETH'] if i % 3 else ['ETH', 'SOL']
+        web_server.client_sessions.update(sid, watched, 50_000 * (i % 4), 250_000 * (i % 4))
+        if i % 10 == 0:
+            web_server.compact_clients[sid] = 0
+
+    def body():
+        start = time.perf_counter()
+        for _ in range(count):
+            web_server.emit_liquidation(liquidation)
+            web_server.emit_trade(trade)
+            web_server.emit_funding(funding)
+        return time.perf_counter() - start
+
+    try:
+        return best_time(body, repeat) / (count * 3)
+    finally:
+        for sid in sids:
+            web_server.client_sessions.remove(sid)
+            web_server.compact_clients.pop(sid, None)
+
+
+BENCHMARKS = {
+    'handle_trade': bench_handle_trade,
+    'handle_batch': bench_handle_batch,
+    'check_and_print_trades': bench_check_and_print_trades,
+    'handle_liquidation': bench_handle_liquidation,
+    'handle_funding_rate': bench_handle_funding_rate,
+    'handle_messages_json': bench_handle_messages,
+    'emit_fanout': bench_emit_fanout,
+}
+
+
+def build_inputs(args) -> Dict:
+    inputs = {
+        'trades': synthetic_trades(args.trades),
+        'liquidations': synthetic_liquidations(args.liquidations),
+        'funding': synthetic_funding(args.funding),
+        'buckets': args.buckets,
+        'batch_size': args.batch_size,
+        'emits': args.emits,
+        'clients': args.clients,
+    }
+    if args.input:
+        recorded = load_recorded(args.input)
+        if recorded['aggTrade']:
+            inputs['trades'] = recorded['aggTrade']
+        if recorded['forceOrder']:
+            inputs['liquidations'] = recorded['forceOrder']
+        if recorded['markPriceUpdate']:
+            inputs['funding'] = recorded['markPriceUpdate']
+    return inputs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', action='store_true', help='write results as the new baselines')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='run selected benchmarks')
+    parser.add_argument('--input', help='recorded NDJSON capture to use instead of synthetic inputs')
+    parser.add_argument('--baselines', default=BASELINE_PATH)
+    parser.add_argument('--trades', type=int, default=50_000)
+    parser.add_argument('--liquidations', type=int, default=2_000)
+    parser.add_argument('--funding', type=int, default=20_000)
+    parser.add_argument('--buckets', type=int, default=5_000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--emits', type=int, default=2_000)
+    parser.add_argument('--clients', type=int, default=100)
+    args = parser.parse_args()
+
+    # Handlers log at INFO on every message; keep logging out of the measurement
+    logging.disable(logging.CRITICAL)
+
+    inputs = build_inputs(args)
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f).get('benchmarks', {})
+
+    results = {}
+    failed = []
+    for name in args.only or BENCHMARKS:
+        seconds = BENCHMARKS[name](inputs, args.repeat)
+        results[name] = seconds
+        baseline = baselines.get(name)
+        line = f"{name:<24} {seconds * 1e6:>10.2f} us/op {1 / seconds:>14,.0f} ops/s"
+        if baseline and not args.record:
+            change = seconds / baseline - 1
+            status = 'OK'
+            if change > args.tolerance:
+                status = 'REGRESSION'
+                failed.append(name)
+            line += f"   baseline {baseline * 1e6:.2f} us ({change:+.1%}) {status}"
+        print(line)
+
+    if args.record:
+        baselines.update(results)
+        with open(args.baselines, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'unit': 'seconds per op',
+                'benchmarks': baselines
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Recorded baselines to {args.baselines}")
+        return 0
+
+    if failed:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import os
+import sys
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+import numpy as np
+
+
+class BoundedDict(OrderedDict):
+    """Dict with a fixed capacity: writing a new key beyond it evicts the least recently written key"""
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.capacity = capacity
+        self.evictions = 0
+
+    def __setitem__(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        if len(self) > self.capacity:
+            self.popitem(last=False)
+            self.evictions += 1
+
+
+class SymbolTable:
+    """Interns exchange symbols as small integer ids.
+
+    Ids are embedded in bucket keys and packed events, so the table is
+    append-only; its capacity bounds it instead of eviction.
+    """
+
+    def __init__(self, capacity: int = 4096, quote: str = 'USDT'):
+        self.capacity = capacity
+        self.quote = quote
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.displays: List[str] = []  # Names without the quote asset (BTCUSDT -> BTC)
+
+    def intern(self, symbol: str) -> int:
+        """Id of a symbol, assigned on first sight"""
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            if len(self.names) >= self.capacity:
+                raise OverflowError(f"Symbol table full ({self.capacity} symbols), cannot add {symbol}")
+            symbol = sys.intern(symbol)
+            symbol_id = self.ids[symbol] = len(self.names)
+            self.names.append(symbol)
+            self.displays.append(sys.intern(symbol.replace(self.quote, '')))
+        return symbol_id
+
+    def name(self, symbol_id: int) -> str:
+        return self.names[symbol_id]
+
+    def display(self, symbol_id: int) -> str:
+        return self.displays[symbol_id]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+# Process-wide table shared by the handlers and the web fan-out
+symbols = SymbolTable()
+
+
+def deep_sizeof(obj, seen: set = None) -> int:
+    """Approximate bytes held by a structure: containers, slotted records and NumPy buffers"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Views share their base's buffer
+        return sys.getsizeof(obj) if obj.base is not None else obj.nbytes + sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None or callable(obj):
+        return size
+    if isinstance(obj, dict):
+        for key, value in list(obj.items()):
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for item in list(obj):
+            size += deep_sizeof(item, seen)
+    else:
+        for name in getattr(type(obj), '__slots__', ()):
+            size += deep_sizeof(getattr(obj, name, None), seen)
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError, AttributeError):
+        return 0
@@ -0,0 +1,231 @@
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Supported candle intervals in milliseconds
+INTERVALS = {
+    '1s': 1_000,
+    '1m': 60_000,
+    '5m': 300_000,
+    '1h': 3_600_000,
+}
+
+# Column layout of the float block of a candle series
+OPEN, HIGH, LOW, CLOSE, VOLUME, QUOTE_VOLUME, BUY_VOLUME, SELL_VOLUME = range(8)
+
+
+def _nice_bin_size(raw: float) -> float:
+    """Round a raw price bin size to 1, 2 or 5 times a power of ten"""
+    if raw <= 0:
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for step in (1, 2, 5, 10):
+        if raw <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+class CandleSeries:
+    """Fixed-capacity ring buffer of candles for one symbol and interval"""
+
+    def __init__(self, interval_ms: int, capacity: int, footprint_bin_bps: Optional[float] = None):
+        self.interval_ms = interval_ms
+        self.capacity = capacity
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, 8), dtype=np.float64)
+        self.trades = np.zeros(capacity, dtype=np.int64)
+        self.head = -1  # Slot of the current (still open) candle
+        self.count = 0
+        self.late_dropped = 0
+
+        # Footprint: per-price-bin [buy, sell] quote volume for each slot
+        self.footprint_bin_bps = footprint_bin_bps
+        self.footprint_bin: Optional[float] = None
+        self.footprints: Optional[List[Optional[Dict[float, List[float]]]]] = (
+            [None] * capacity if footprint_bin_bps else None
+        )
+
+    def add(self, price: float, quantity: float, timestamp: int, is_buyer_maker: bool) -> Optional[int]:
+        """Add a trade and return the slot of the candle it closed, if any"""
+        bucket = timestamp - timestamp % self.interval_ms
+        closed = None
+
+        if self.head < 0:
+            self._open(bucket, price)
+        elif bucket > self.open_time[self.head]:
+            closed = self.head
+            self._open(bucket, price)
+        elif bucket < self.open_time[self.head]:
+            # Late trade: fold into its (already closed) candle if still nearby
+            slot = self._find_recent(bucket)
+            if slot is None:
+                self.late_dropped += 1
+                return None
+            self._update(slot, price, quantity, is_buyer_maker, late=True)
+            return None
+
+        self._update(self.head, price, quantity, is_buyer_maker)
+        return closed
+
+    def _open(self, bucket: int, price: float):
+        """Start a new candle in the next slot, overwriting the oldest one"""
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.open_time[self.head] = bucket
+        row = self.values[self.head]
+        row[:] = 0.0
+        row[OPEN] = row[HIGH] = row[LOW] = row[CLOSE] = price
+        self.trades[self.head] = 0
+        if self.footprints is not None:
+            if self.footprint_bin is None:
+                self.footprint_bin = _nice_bin_size(price * self.footprint_bin_bps / 10_000)
+            self.footprints[self.head] = {}
+
+    def _find_recent(self, bucket: int, depth: int = 8) -> Optional[int]:
+        """Find the slot holding a recent closed candle"""
+        for back in range(1, min(self.count, depth)):
+            slot = (self.head - back) % self.capacity
+            if self.open_time[slot] == bucket:
+                return slot
+            if self.open_time[slot] < bucket:
+                break
+        return None
+
+    def _update(self, slot: int, price: float, quantity: float, is_buyer_maker: bool, late: bool = False):
+        """Fold a trade into the candle at the given slot"""
+        row = self.values[slot]
+        quote = price * quantity
+        if price > row[HIGH]:
+            row[HIGH] = price
+        if price < row[LOW]:
+            row[LOW] = price
+        if not late:
+            row[CLOSE] = price
+        row[VOLUME] += quantity
+        row[QUOTE_VOLUME] += quote
+        if is_buyer_maker:
+            row[SELL_VOLUME] += quote
+        else:
+            row[BUY_VOLUME] += quote
+        self.trades[slot] += 1
+
+        if self.footprints is not None:
+            footprint = self.footprints[slot]
+            price_bin = math.floor(price / self.footprint_bin) * self.footprint_bin
+            level = footprint.get(price_bin)
+            if level is None:
+                level = footprint[price_bin] = [0.0, 0.0]
+            level[1 if is_buyer_maker else 0] += quote
+
+    def slots(self, limit: Optional[int] = None, include_open: bool = True) -> np.ndarray:
+        """Return ring slots in chronological order"""
+        count = self.count if include_open else max(self.count - 1, 0)
+        if limit is not None:
+            count = min(count, limit)
+        newest = self.head if include_open else self.head - 1
+        return (np.arange(newest - count + 1, newest + 1)) % self.capacity
+
+    def to_dict(self, slot: int, footprint: bool = False) -> Dict:
+        """Build a JSON-friendly representation of the candle at a slot"""
+        row = self.values[slot]
+        candle = {
+            'openTime': int(self.open_time[slot]),
+            'closeTime': int(self.open_time[slot]) + self.interval_ms - 1,
+            'open': float(row[OPEN]),
+            'high': float(row[HIGH]),
+            'low': float(row[LOW]),
+            'close': float(row[CLOSE]),
+            'volume': float(row[VOLUME]),
+            'quoteVolume': float(row[QUOTE_VOLUME]),
+            'buyVolume': float(row[BUY_VOLUME]),
+            'sellVolume': float(row[SELL_VOLUME]),
+            'trades': int(self.trades[slot]),
+            'closed': slot != self.head,
+        }
+        if footprint and self.footprints is not None and self.footprints[slot] is not None:
+            candle['footprint'] = [
+                [price_bin, buy, sell]
+                for price_bin, (buy, sell) in sorted(self.footprints[slot].items())
+            ]
+        return candle
+
+
+class CandleBuilder:
+    """Builds multi-interval OHLCV (and optional footprint) candles from aggTrades.
+
+    Candles are closed by trade event time, never by wall clock, so replaying a
+    recorded stream produces the same candles as the live feed. At most
+    ``max_symbols`` symbols are kept; the least recently traded one is evicted.
+    """
+
+    def __init__(self, intervals: Tuple[str, ...] = ('1s', '1m', '5m', '1h'), capacity: int = 1440,
+                 footprint: bool = False, footprint_intervals: Tuple[str, ...] = ('1m', '5m'),
+                 footprint_bin_bps: float = 5.0,
+                 on_close: Optional[Callable[[str, str, Dict], None]] = None, max_symbols: int = 64):
+        unknown = [interval for interval in intervals if interval not in INTERVALS]
+        if unknown:
+            raise ValueError(f"Unsupported candle intervals: {unknown}")
+        self.intervals = intervals
+        self.capacity = capacity
+        self.footprint = footprint
+        self.footprint_intervals = footprint_intervals
+        self.footprint_bin_bps = footprint_bin_bps
+        self.on_close = on_close
+        self.max_symbols = max_symbols
+        self.evictions = 0
+        self.series: Dict[str, Dict[str, CandleSeries]] = {}
+
+    def _create_series(self, symbol: str) -> Dict[str, CandleSeries]:
+        """Preallocate the ring buffers for a newly seen symbol"""
+        if len(self.series) >= self.max_symbols:
+            victim = min(self.series, key=self._last_open_time)
+            logger.info(f"Candle builder full, evicting {victim} for {symbol}")
+            del self.series[victim]
+            self.evictions += 1
+        series = {}
+        for interval in self.intervals:
+            use_footprint = self.footprint and interval in self.footprint_intervals
+            series[interval] = CandleSeries(
+                INTERVALS[interval],
+                self.capacity,
+                self.footprint_bin_bps if use_footprint else None
+            )
+        self.series[symbol] = series
+        return series
+
+    def _last_open_time(self, symbol: str) -> int:
+        """Open time of the newest candle of a symbol (its last activity)"""
+        candles = next(iter(self.series[symbol].values()))
+        return int(candles.open_time[candles.head]) if candles.head >= 0 else 0
+
+    def add_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        """Trade listener: fold an aggTrade into every interval of its symbol"""
+        series = self.series.get(symbol)
+        if series is None:
+            series = self._create_series(symbol)
+
+        for interval, candles in series.items():
+            closed = candles.add(price, quantity, timestamp, is_buyer_maker)
+            if closed is not None and self.on_close:
+                try:
+                    self.on_close(symbol, interval, candles.to_dict(closed, footprint=True))
+                except Exception as e:
+                    logger.error(f"Error in candle close callback for {symbol} {interval}: {e}")
+
+    def get_candles(self, symbol: str, interval: str, limit: Optional[int] = None,
+                    include_open: bool = True, footprint: bool = False) -> List[Dict]:
+        """Return candles for a symbol and interval, oldest first"""
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported candle interval: {interval}")
+        candles = self.series.get(symbol, {}).get(interval)
+        if candles is None:
+            return []
+        return [candles.to_dict(int(slot), footprint) for slot in candles.slots(limit, include_open)]
+
+    def get_symbols(self) -> List[str]:
+        """Return symbols that have candle data"""
+        return list(self.series.keys())
@@ -0,0 +1,117 @@
+import threading
+from bisect import bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Event kinds with a per-client USD threshold; everything else (funding,
+# candles, basis) is delivered to every client watching the symbol
+THRESHOLD_KINDS = ('liquidation', 'trade')
+ANY_KIND = 'any'
+
+_MAX_SID = '\uffff'  # Sorts after any real sid
+
+
+class ClientSession:
+    """Filter settings of one dashboard client"""
+
+    __slots__ = ('sid', 'symbols', 'thresholds')
+
+    def __init__(self, sid: str, symbols: Iterable[str], min_liquidation: float, min_trade: float):
+        self.sid = sid
+        self.symbols: Set[str] = set(symbols)
+        self.thresholds = {'liquidation': float(min_liquidation), 'trade': float(min_trade)}
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbols': sorted(self.symbols),
+            'minLiquidation': self.thresholds['liquidation'],
+            'minTrade': self.thresholds['trade']
+        }
+
+
+class ClientSessionIndex:
+    """Per-client filters indexed by symbol for O(matching clients) fan-out.
+
+    For every symbol and kind the index keeps a list of (threshold, sid)
+    sorted by threshold, so the clients interested in an event of a given
+    USD value are a bisect plus a slice. Symbols are reference counted so
+    the union of all client symbol sets can drive stream subscriptions.
+    """
+
+    def __init__(self):
+        self.sessions: Dict[str, ClientSession] = {}
+        self.index: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        self.symbol_refs: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def _add(self, session: ClientSession):
+        for symbol in session.symbols:
+            kinds = self.index.get(symbol)
+            if kinds is None:
+                kinds = self.index[symbol] = {kind: [] for kind in THRESHOLD_KINDS + (ANY_KIND,)}
+            for kind in THRESHOLD_KINDS:
+                insort(kinds[kind], (session.thresholds[kind], session.sid))
+            insort(kinds[ANY_KIND], (0.0, session.sid))
+            self.symbol_refs[symbol] = self.symbol_refs.get(symbol, 0) + 1
+
+    def _remove(self, session: ClientSession):
+        for symbol in session.symbols:
+            kinds = self.index[symbol]
+            for kind in THRESHOLD_KINDS:
+                kinds[kind].remove((session.thresholds[kind], session.sid))
+            kinds[ANY_KIND].remove((0.0, session.sid))
+            self.symbol_refs[symbol] -= 1
+            if self.symbol_refs[symbol] == 0:
+                del self.symbol_refs[symbol]
+                del self.index[symbol]
+
+    def update(self, sid: str, symbols: Iterable[str], min_liquidation: float, min_trade: float) -> ClientSession:
+        """Create or replace a client's filters"""
+        session = ClientSession(sid, symbols, min_liquidation, min_trade)
+        with self.lock:
+            previous = self.sessions.get(sid)
+            if previous is not None:
+                self._remove(previous)
+            self.sessions[sid] = session
+            self._add(session)
+        return session
+
+    def remove(self, sid: str) -> Optional[ClientSession]:
+        """Drop a client's filters (on disconnect)"""
+        with self.lock:
+            session = self.sessions.pop(sid, None)
+            if session is not None:
+                self._remove(session)
+        return session
+
+    def match(self, symbol: str, kind: str = ANY_KIND, usd_value: float = 0.0) -> List[str]:
+        """Client ids whose filters accept an event"""
+        with self.lock:
+            kinds = self.index.get(symbol)
+            if kinds is None:
+                return []
+            entries = kinds[kind if kind in THRESHOLD_KINDS else ANY_KIND]
+            if kind not in THRESHOLD_KINDS:
+                return [sid for _, sid in entries]
+            end = bisect_right(entries, (usd_value, _MAX_SID))
+            return [sid for _, sid in entries[:end]]
+
+    def get(self, sid: str) -> Optional[ClientSession]:
+        return self.sessions.get(sid)
+
+    def active_symbols(self) -> List[str]:
+        """Union of all client symbol sets"""
+        with self.lock:
+            return sorted(self.symbol_refs)
+
+    def min_threshold(self, kind: str) -> Optional[float]:
+        """Lowest threshold any client uses for a kind (None without clients)"""
+        with self.lock:
+            thresholds = [session.thresholds[kind] for session in self.sessions.values()]
+        return min(thresholds) if thresholds else None
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                'clients': len(self.sessions),
+                'symbols': dict(self.symbol_refs)
+            }
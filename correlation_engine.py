@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CorrelationEngine:
+    """Rolling cross-symbol return correlation and anomaly scores.
+
+    Every ``sample_interval`` seconds one row of log returns and traded
+    volume per symbol is pushed into a ``window`` x ``max_symbols`` ring.
+    Running sums (sum, sum of squares and the sum of outer products of
+    returns) are updated by adding the new row and subtracting the one that
+    falls out of the window, so each sample costs one O(N^2) vectorized
+    update. To keep floating-point error from accumulating over long uptimes,
+    the sums are recomputed from the ring every ``resync_every`` samples.
+
+    Besides correlation, each symbol gets z-scores of its latest return and
+    volume against its own window, and a residual z-score of its return
+    after removing its beta to the reference symbol: a large residual is an
+    alt moving on its own rather than with BTC.
+    """
+
+    def __init__(self, max_symbols: int = 64, window: int = 300, sample_interval: float = 1.0,
+                 publish_every: int = 5, reference: str = 'BTCUSDT',
+                 on_update: Optional[Callable[[Dict], None]] = None):
+        self.max_symbols = max_symbols
+        self.window = window
+        self.sample_interval = sample_interval
+        self.publish_every = publish_every
+        self.reference = reference
+        self.on_update = on_update
+
+        self.resync_every = window
+        self.slots: Dict[str, int] = {}
+        self.symbols: List[Optional[str]] = []  # By slot; None for released slots
+        self.free_slots: List[int] = []
+        self.trade_price = np.full(max_symbols, np.nan)
+        self.mark_price = np.full(max_symbols, np.nan)
+        self.sampled_price = np.full(max_symbols, np.nan)  # Price at the previous sample
+        self.volume = np.zeros(max_symbols)  # Quote volume since the previous sample
+
+        self.returns = np.zeros((window, max_symbols))
+        self.volumes = np.zeros((window, max_symbols))
+        self.head = -1
+        self.count = 0
+        self.samples = 0
+
+        # Running sums over the window
+        self.return_sum = np.zeros(max_symbols)
+        self.return_sq = np.zeros(max_symbols)
+        self.return_cross = np.zeros((max_symbols, max_symbols))
+        self.volume_sum = np.zeros(max_symbols)
+        self.volume_sq = np.zeros(max_symbols)
+
+        self.latest: Optional[Dict] = None
+
+    def _slot(self, symbol: str) -> Optional[int]:
+        slot = self.slots.get(symbol)
+        if slot is None:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.symbols[slot] = symbol
+            elif len(self.symbols) < self.max_symbols:
+                slot = len(self.symbols)
+                self.symbols.append(symbol)
+            else:
+                return None
+            self.slots[symbol] = slot
+        return slot
+
+    def release(self, symbol: str):
+        """Free a symbol's slot, clearing its prices and history"""
+        slot = self.slots.pop(symbol, None)
+        if slot is None:
+            return
+        self.symbols[slot] = None
+        self.free_slots.append(slot)
+        self.trade_price[slot] = self.mark_price[slot] = self.sampled_price[slot] = np.nan
+        self.volume[slot] = 0.0
+        self.returns[:, slot] = 0.0
+        self.volumes[:, slot] = 0.0
+        self.resync()
+
+    def retain(self, keep):
+        """Release every symbol not in keep (the symbols still streamed)"""
+        for symbol in list(self.slots):
+            if symbol not in keep:
+                self.release(symbol)
+
+    def resync(self):
+        """Recompute the running sums from the ring (rows not yet written are zero)"""
+        self.return_sum = self.returns.sum(axis=0)
+        self.return_sq = (self.returns * self.returns).sum(axis=0)
+        self.return_cross = self.returns.T @ self.returns
+        self.volume_sum = self.volumes.sum(axis=0)
+        self.volume_sq = (self.volumes * self.volumes).sum(axis=0)
+
+    def on_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        """Trade listener for the futures aggTrade streams"""
+        slot = self._slot(symbol)
+        if slot is None:
+            return
+        self.trade_price[slot] = price
+        self.volume[slot] += price * quantity
+
+    def on_funding(self, symbol: str, funding_rate: float, mark_price: float, index_price: float, timestamp: int):
+        """Funding listener: mark price stands in for symbols without trades"""
+        slot = self._slot(symbol)
+        if slot is None:
+            return
+        self.mark_price[slot] = mark_price
+
+    def sample(self):
+        """Push one row of returns and volumes and update the running sums"""
+        price = np.where(np.isnan(self.trade_price), self.mark_price, self.trade_price)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.log(price / self.sampled_price)
+        returns[~np.isfinite(returns)] = 0.0
+        self.sampled_price = np.where(np.isnan(price), self.sampled_price, price)
+        volumes = self.volume
+        self.volume = np.zeros(self.max_symbols)
+
+        self.head = (self.head + 1) % self.window
+        if self.count == self.window:
+            old_returns = self.returns[self.head]
+            old_volumes = self.volumes[self.head]
+            self.return_sum -= old_returns
+            self.return_sq -= old_returns * old_returns
+            self.return_cross -= np.outer(old_returns, old_returns)
+            self.volume_sum -= old_volumes
+            self.volume_sq -= old_volumes * old_volumes
+        else:
+            self.count += 1
+
+        self.returns[self.head] = returns
+        self.volumes[self.head] = volumes
+        self.return_sum += returns
+        self.return_sq += returns * returns
+        self.return_cross += np.outer(returns, returns)
+        self.volume_sum += volumes
+        self.volume_sq += volumes * volumes
+        self.samples += 1
+        if self.samples % self.resync_every == 0:
+            self.resync()
+
+    def compute(self) -> Optional[Dict]:
+        """Correlation matrix and per-symbol scores from the running sums"""
+        names = [symbol for symbol in self.symbols if symbol is not None]
+        if not names or self.count < 2:
+            return None
+        active = np.array([self.slots[symbol] for symbol in names])
+        n = len(active)
+        count = self.count
+        mean = self.return_sum[active] / count
+        cov = self.return_cross[np.ix_(active, active)] / count - np.outer(mean, mean)
+        variance = np.maximum(np.diag(cov), 0.0)
+        std = np.sqrt(variance)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+            returns = self.returns[self.head, active]
+            return_z = (returns - mean) / std
+
+            volume_mean = self.volume_sum[active] / count
+            volume_std = np.sqrt(np.maximum(self.volume_sq[active] / count - volume_mean ** 2, 0.0))
+            volume_z = (self.volumes[self.head, active] - volume_mean) / volume_std
+
+            ref = names.index(self.reference) if self.reference in self.slots else None
+            if ref is not None:
+                beta = cov[:, ref] / variance[ref]
+                residual = (returns - mean) - beta * (returns[ref] - mean[ref])
+                residual_std = std * np.sqrt(np.maximum(1.0 - corr[:, ref] ** 2, 0.0))
+                residual_z = residual / residual_std
+                ref_corr = corr[:, ref]
+            else:
+                beta = residual_z = ref_corr = np.full(n, np.nan)
+
+        def clean(values: np.ndarray, digits: int) -> List:
+            # JSON has no NaN: undefined scores (flat or missing prices) become null
+            values = np.round(values, digits).astype(object)
+            values[~np.isfinite(values.astype(float))] = None
+            return values.tolist()
+
+        self.latest = {
+            'symbols': [symbol.replace('USDT', '') for symbol in names],
+            'reference': self.reference.replace('USDT', ''),
+            'window': count,
+            'correlation': clean(corr, 3),
+            'refCorrelation': clean(ref_corr, 3),
+            'beta': clean(beta, 3),
+            'returnZ': clean(return_z, 2),
+            'volumeZ': clean(volume_z, 2),
+            'residualZ': clean(residual_z, 2)
+        }
+        return self.latest
+
+    async def publish_loop(self):
+        """Sample on a fixed cadence (no drift) and publish every publish_every samples"""
+        loop = asyncio.get_running_loop()
+        next_sample = loop.time() + self.sample_interval
+        while True:
+            await asyncio.sleep(max(next_sample - loop.time(), 0))
+            next_sample += self.sample_interval
+            if next_sample < loop.time():
+                # Stalled past a whole interval: skip the missed samples rather than burst them
+                next_sample = loop.time()
+            try:
+                self.sample()
+                if self.samples % self.publish_every == 0:
+                    update = self.compute()
+                    if update and self.on_update:
+                        self.on_update(self.summary(update))
+            except Exception as e:
+                logger.error(f"Error updating correlations: {e}")
+
+    @staticmethod
+    def summary(update: Dict) -> Dict:
+        """Dashboard push: per-symbol scores without the N x N matrix"""
+        return {key: value for key, value in update.items() if key != 'correlation'}
+
+    def get_snapshot(self) -> Optional[Dict]:
+        """Latest computed matrix and scores"""
+        return self.latest
@@ -0,0 +1,129 @@
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from bounded_state import symbols
+
+# On every event .symbol is the display name (BTC) and .exchange_symbol the exchange name (BTCUSDT)
+
+# Leading field of packed records (see web_server compact encoding)
+PACKED_LIQUIDATION = 0
+PACKED_TRADE = 1
+PACKED_FUNDING = 2
+
+
+class LiquidationEvent:
+    """Alerted liquidation: slotted record, serialized only when a client needs it"""
+
+    __slots__ = ('symbol_id', 'is_buy', 'price', 'quantity', 'usd_value', 'timestamp', 'created')
+
+    def __init__(self, symbol_id: int, is_buy: bool, price: float, quantity: float, usd_value: float, timestamp: int):
+        self.symbol_id = symbol_id
+        self.is_buy = is_buy
+        self.price = price
+        self.quantity = quantity
+        self.usd_value = usd_value
+        self.timestamp = timestamp
+        self.created = time.time()  # Emit time, kept for replays to new clients
+
+    @property
+    def symbol(self) -> str:
+        return symbols.display(self.symbol_id)
+
+    @property
+    def exchange_symbol(self) -> str:
+        return symbols.name(self.symbol_id)
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'side': 'BUY' if self.is_buy else 'SELL',
+            'price': self.price,
+            'quantity': self.quantity,
+            'usdValue': self.usd_value,
+            'timestamp': self.timestamp
+        }
+
+    def to_payload(self) -> Dict:
+        return {'timestamp': datetime.utcfromtimestamp(self.created).isoformat(), 'data': self.to_dict()}
+
+    def pack(self) -> List:
+        return [PACKED_LIQUIDATION, self.symbol_id, int(self.is_buy), self.price, self.quantity,
+                round(self.usd_value, 2), self.timestamp]
+
+
+class TradeEvent:
+    """Alerted one-second trade bucket (correction: revised total after late trades)"""
+
+    __slots__ = ('symbol_id', 'second', 'usd_value', 'is_buyer_maker', 'correction', 'created')
+
+    def __init__(self, symbol_id: int, second: int, usd_value: float, is_buyer_maker: bool,
+                 correction: bool = False):
+        self.symbol_id = symbol_id
+        self.second = second
+        self.usd_value = usd_value
+        self.is_buyer_maker = is_buyer_maker
+        self.correction = correction
+        self.created = time.time()  # Emit time, kept for replays to new clients
+
+    @property
+    def symbol(self) -> str:
+        return symbols.display(self.symbol_id)
+
+    @property
+    def exchange_symbol(self) -> str:
+        return symbols.name(self.symbol_id)
+
+    @property
+    def timestr(self) -> str:
+        return datetime.fromtimestamp(self.second).strftime('%H:%M:%S')
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'timestr': self.timestr,
+            'usdValue': self.usd_value,
+            'direction': 'SELL' if self.is_buyer_maker else 'BUY',
+            'correction': self.correction
+        }
+
+    def to_payload(self) -> Dict:
+        return {'timestamp': datetime.utcfromtimestamp(self.created).isoformat(), 'data': self.to_dict()}
+
+    def pack(self) -> List:
+        return [PACKED_TRADE, self.symbol_id, self.timestr, round(self.usd_value, 2), int(self.is_buyer_maker),
+                int(self.correction)]
+
+
+class FundingEvent:
+    """Current funding rate of a symbol (rate and annual in percent)"""
+
+    __slots__ = ('symbol_id', 'rate', 'annual', 'timestamp')
+
+    def __init__(self, symbol_id: int, rate: float, annual: float, timestamp: int):
+        self.symbol_id = symbol_id
+        self.rate = rate
+        self.annual = annual
+        self.timestamp = timestamp
+
+    @property
+    def symbol(self) -> str:
+        return symbols.display(self.symbol_id)
+
+    @property
+    def exchange_symbol(self) -> str:
+        return symbols.name(self.symbol_id)
+
+    def to_dict(self) -> Dict:
+        return {
+            'rate': self.rate,
+            'annual': self.annual,
+            'direction': "LONGS PAY SHORTS" if self.rate > 0 else "SHORTS PAY LONGS",
+            'timestamp': self.timestamp
+        }
+
+    def to_payload(self) -> Dict:
+        return {'symbol': self.exchange_symbol, 'data': self.to_dict()}
+
+    def pack(self) -> List:
+        return [PACKED_FUNDING, self.symbol_id, self.rate, self.annual, self.timestamp]
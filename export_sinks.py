@@ -0,0 +1,402 @@
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _encode(record: Dict) -> bytes:
+    """Compact NDJSON line for one record"""
+    return json.dumps(record, separators=(',', ':')).encode() + b'\n'
+
+
+class ExportSink(ABC):
+    """Base class for export sinks.
+
+    Events are queued without blocking (dropped and counted when the queue is
+    full) and written by a dedicated worker thread in batches bounded by
+    ``max_batch`` records or ``max_delay`` seconds, whichever comes first.
+    """
+
+    def __init__(self, name: str, max_batch: int = 500, max_delay: float = 1.0, queue_size: int = 10_000):
+        self.name = name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def publish(self, record: Dict):
+        """Queue a record for export; never blocks the caller"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending records and stop the worker"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        running = True
+        while running:
+            batch: List[Dict] = []
+            try:
+                item = self.queue.get(timeout=self.max_delay)
+            except queue.Empty:
+                self._idle()
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    written = self.write_batch(batch)
+                    self.written += len(batch) if written is None else written
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Export sink {self.name} failed to write {len(batch)} records: {e}")
+        self._shutdown()
+
+    @abstractmethod
+    def write_batch(self, batch: List[Dict]) -> Optional[int]:
+        """Write a batch; return the number of records written if not all of them"""
+
+    def _idle(self):
+        """Called by the worker when no records arrived for max_delay seconds"""
+
+    def _shutdown(self):
+        """Called by the worker after the final flush"""
+
+    def get_stats(self) -> Dict:
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors
+        }
+
+
+class _RotatingFileSink(ExportSink):
+    """Shared rotation logic for file sinks (rotate by size or age)"""
+
+    extension = ''
+
+    def __init__(self, name: str, directory: str, prefix: str = 'events',
+                 rotate_bytes: int = 64 * 1024 * 1024, rotate_seconds: float = 3600, **kwargs):
+        super().__init__(name, **kwargs)
+        self.directory = directory
+        self.prefix = prefix
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.current_path: Optional[str] = None
+        self.current_bytes = 0
+        self.opened_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _needs_rotation(self) -> bool:
+        return (self.current_path is None
+                or self.current_bytes >= self.rotate_bytes
+                or time.monotonic() - self.opened_at >= self.rotate_seconds)
+
+    def _next_path(self) -> str:
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{self.prefix}-{stamp}{self.extension}")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{suffix}{self.extension}")
+            suffix += 1
+        return path
+
+    def _rotate(self):
+        self._close_file()
+        self.current_path = self._next_path()
+        self.current_bytes = 0
+        self.opened_at = time.monotonic()
+        self._open_file(self.current_path)
+
+    def write_batch(self, batch: List[Dict]):
+        if self._needs_rotation():
+            self._rotate()
+        self.current_bytes += self._write(batch)
+
+    def _idle(self):
+        # Close aged-out files even when no events arrive
+        if self.current_path is not None and time.monotonic() - self.opened_at >= self.rotate_seconds:
+            self._close_file()
+            self.current_path = None
+
+    def _shutdown(self):
+        self._close_file()
+
+    @abstractmethod
+    def _open_file(self, path: str):
+        """Open a new output file"""
+
+    @abstractmethod
+    def _write(self, batch: List[Dict]) -> int:
+        """Append a batch to the open file; returns the bytes written"""
+
+    @abstractmethod
+    def _close_file(self):
+        """Close the open file, if any"""
+
+
+class NDJSONFileSink(_RotatingFileSink):
+    """Rotating newline-delimited JSON files"""
+
+    extension = '.ndjson'
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__('ndjson', directory, **kwargs)
+        self.file = None
+
+    def _open_file(self, path: str):
+        self.file = open(path, 'ab')
+
+    def _write(self, batch: List[Dict]) -> int:
+        data = b''.join(_encode(record) for record in batch)
+        self.file.write(data)
+        self.file.flush()
+        return len(data)
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ParquetFileSink(_RotatingFileSink):
+    """Rotating Parquet files, one row group per batch (requires pyarrow)"""
+
+    extension = '.parquet'
+
+    def __init__(self, directory: str, **kwargs):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("ParquetFileSink requires pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        # Payloads differ per event type, so they are stored as JSON text
+        self.schema = pyarrow.schema([
+            ('type', pyarrow.string()),
+            ('ts', pyarrow.int64()),
+            ('data', pyarrow.string()),
+        ])
+        super().__init__('parquet', directory, **kwargs)
+        self.writer = None
+
+    def _open_file(self, path: str):
+        self.writer = self.pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def _write(self, batch: List[Dict]) -> int:
+        table = self.pa.table({
+            'type': [record['type'] for record in batch],
+            'ts': [record['ts'] for record in batch],
+            'data': [json.dumps(record['data'], separators=(',', ':')) for record in batch],
+        }, schema=self.schema)
+        self.writer.write_table(table)
+        return table.nbytes
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class UnixSocketSink(ExportSink):
+    """NDJSON over a Unix-domain stream socket, reconnecting after failures"""
+
+    def __init__(self, path: str, retry_seconds: float = 5.0, **kwargs):
+        super().__init__('unix', **kwargs)
+        self.path = path
+        self.retry_seconds = retry_seconds
+        self.sock: Optional[socket.socket] = None
+        self.next_attempt = 0.0
+
+    def _connect(self) -> bool:
+        if self.sock is not None:
+            return True
+        if time.monotonic() < self.next_attempt:
+            return False
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.retry_seconds)
+            sock.connect(self.path)
+            self.sock = sock
+            return True
+        except OSError as e:
+            self.next_attempt = time.monotonic() + self.retry_seconds
+            logger.warning(f"Unix socket sink cannot connect to {self.path}: {e}")
+            return False
+
+    def write_batch(self, batch: List[Dict]):
+        if not self._connect():
+            self.dropped += len(batch)
+            return 0
+        try:
+            self.sock.sendall(b''.join(_encode(record) for record in batch))
+        except OSError:
+            self.sock.close()
+            self.sock = None
+            self.next_attempt = time.monotonic() + self.retry_seconds
+            raise
+
+    def _shutdown(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class UDPMulticastSink(ExportSink):
+    """NDJSON lines packed into UDP multicast datagrams"""
+
+    def __init__(self, group: str, port: int, ttl: int = 1, max_datagram: int = 1400, **kwargs):
+        super().__init__('udp', **kwargs)
+        self.address = (group, port)
+        self.max_datagram = max_datagram
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, struct.pack('b', ttl))
+
+    def write_batch(self, batch: List[Dict]):
+        datagram = b''
+        for record in batch:
+            line = _encode(record)
+            if datagram and len(datagram) + len(line) > self.max_datagram:
+                self.sock.sendto(datagram, self.address)
+                datagram = b''
+            datagram += line
+        if datagram:
+            self.sock.sendto(datagram, self.address)
+
+    def _shutdown(self):
+        self.sock.close()
+
+
+class LocalPubSub:
+    """In-process stand-in for a Redis pub/sub client (``publish(channel, message)``)"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, List[Callable[[str, str], None]]] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel: str, callback: Callable[[str, str], None]):
+        with self.lock:
+            self.subscribers.setdefault(channel, []).append(callback)
+
+    def publish(self, channel: str, message: str) -> int:
+        with self.lock:
+            callbacks = list(self.subscribers.get(channel, []))
+        for callback in callbacks:
+            callback(channel, message)
+        return len(callbacks)
+
+
+class PubSubSink(ExportSink):
+    """Publishes each record to '<prefix>:<type>' on a Redis-style client (redis:// URLs require redis)"""
+
+    def __init__(self, client, channel_prefix: str = 'binance', **kwargs):
+        super().__init__('pubsub', **kwargs)
+        self.client = client
+        self.channel_prefix = channel_prefix
+
+    def write_batch(self, batch: List[Dict]):
+        pipeline = self.client.pipeline() if hasattr(self.client, 'pipeline') else self.client
+        for record in batch:
+            pipeline.publish(f"{self.channel_prefix}:{record['type']}", json.dumps(record, separators=(',', ':')))
+        if pipeline is not self.client:
+            pipeline.execute()
+
+
+class SinkPipeline:
+    """Fans handler events out to the configured export sinks"""
+
+    def __init__(self, sinks: Optional[List[ExportSink]] = None):
+        self.sinks: List[ExportSink] = sinks or []
+
+    def add(self, sink: ExportSink):
+        self.sinks.append(sink)
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def publish(self, event_type: str, data: Dict):
+        """Publish an event to every sink (non-blocking)"""
+        record = {'type': event_type, 'ts': int(time.time() * 1000), 'data': data}
+        for sink in self.sinks:
+            sink.publish(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def get_stats(self) -> Dict:
+        return {sink.name: sink.get_stats() for sink in self.sinks}
+
+
+def build_pipeline_from_env(spec: Optional[str] = None) -> Optional[SinkPipeline]:
+    """Build a pipeline from EXPORT_SINKS, a comma-separated list such as
+
+    ``ndjson:/data/events,parquet:/data/pq,unix:/tmp/events.sock,udp:239.1.1.1:5007,redis://localhost:6379/0``
+    """
+    spec = spec if spec is not None else os.environ.get('EXPORT_SINKS', '')
+    entries = [entry.strip() for entry in spec.split(',') if entry.strip()]
+    if not entries:
+        return None
+
+    pipeline = SinkPipeline()
+    for entry in entries:
+        kind, _, target = entry.partition(':')
+        try:
+            if kind == 'ndjson':
+                pipeline.add(NDJSONFileSink(target))
+            elif kind == 'parquet':
+                pipeline.add(ParquetFileSink(target))
+            elif kind == 'unix':
+                pipeline.add(UnixSocketSink(target))
+            elif kind == 'udp':
+                group, _, port = target.rpartition(':')
+                pipeline.add(UDPMulticastSink(group, int(port)))
+            elif kind in ('redis', 'rediss'):
+                try:
+                    import redis
+                except ImportError:
+                    raise ImportError("redis:// export sinks require redis: pip install redis")
+                pipeline.add(PubSubSink(redis.Redis.from_url(entry)))
+            else:
+                logger.error(f"Unknown export sink: {entry}")
+        except Exception as e:
+            logger.error(f"Failed to create export sink {entry}: {e}")
+    return pipeline if pipeline.sinks else None
@@ -1,16 +1,75 @@
 import logging
+import os
 from datetime import datetime
-from typing import Dict
+from typing import Callable, Dict, List
 from colorama import Fore, Style, init
 
+from bounded_state import BoundedDict
+
 init(autoreset=True)
 logger = logging.getLogger(__name__)
 
 
+# Annual-rate boundaries of the intensity bands, ascending:
+# NEGATIVE | NEUTRAL | MODERATE | HIGH | EXTREME
+INTENSITY_BOUNDS = (-10, 5, 30, 50)
+
+
+def intensity_band(annual_rate: float) -> int:
+    """Index of the intensity band of an annual rate (0 = NEGATIVE ... 4 = EXTREME)"""
+    if annual_rate < INTENSITY_BOUNDS[0]:
+        return 0
+    band = 1
+    for bound in INTENSITY_BOUNDS[1:]:
+        if annual_rate > bound:
+            band += 1
+    return band
+
+
+def funding_filter_options() -> Dict:
+    """FundingHandler significance-filter settings from FUNDING_* environment variables"""
+    options = {}
+    for env_name, option in (('FUNDING_EPSILON', 'rate_epsilon'),
+                             ('FUNDING_RELATIVE_EPSILON', 'relative_epsilon'),
+                             ('FUNDING_BAND_MARGIN', 'band_margin'),
+                             ('FUNDING_MIN_INTERVAL', 'min_emit_interval'),
+                             ('FUNDING_REFRESH_INTERVAL', 'refresh_interval')):
+        value = os.environ.get(env_name)
+        if value:
+            try:
+                options[option] = float(value)
+            except ValueError:
+                logger.warning(f"Ignoring invalid {env_name}={value!r}")
+    return options
+
+
 class FundingHandler:
-    def __init__(self, min_funding_rate: float = 0.01):
+    def __init__(self, min_funding_rate: float = 0.01, rate_epsilon: float = 0.0005,
+                 relative_epsilon: float = 0.05, band_margin: float = 2.0,
+                 min_emit_interval: float = 30.0, refresh_interval: float = 300.0):
         self.min_funding_rate = min_funding_rate
-        self.last_rates = {}  # Track last seen rates to detect changes
+        # Per symbol: [last emitted rate, intensity band, event time (ms) of the last emit]
+        self.last_rates = BoundedDict(1024)
+        # Significance filter: a change counts once it reaches the larger of the
+        # absolute epsilon (rate in %) and the relative epsilon of the last rate
+        self.rate_epsilon = rate_epsilon
+        self.relative_epsilon = relative_epsilon
+        self.band_margin = band_margin  # Annual % beyond a band boundary before the band flips
+        self.min_emit_interval = min_emit_interval  # Seconds between emits of significant changes
+        self.refresh_interval = refresh_interval  # Any change is emitted at least this often
+        self.emitted_updates = 0
+        self.suppressed_updates = 0
+        # Load shedding: process one markPrice update per symbol and interval (0 = all)
+        self.conflate_interval = 0.0
+        self.last_processed = BoundedDict(1024)  # Symbol -> event time (ms) of the last processed update
+        self.conflated_updates = 0
+        self.console = True  # Print rates to the terminal
+        self.sinks = None  # Optional SinkPipeline for exported alerts
+        self.funding_listeners: List[Callable] = []  # Called with every markPrice update
+
+    def add_funding_listener(self, listener: Callable):
+        """Register a callable(symbol, funding_rate, mark_price, index_price, timestamp) fed by every markPrice update"""
+        self.funding_listeners.append(listener)
         
     async def handle_funding_rate(self, data: Dict):
         """Process funding rate data from WebSocket markPrice stream"""
@@ -19,28 +78,97 @@ class FundingHandler:
             funding_rate = float(data.get('r', 0))
             timestamp = data.get('E', 0)
             
-            # For new symbols, always show the first rate
-            is_new_symbol = symbol not in self.last_rates
+            if self.conflate_interval:
+                last = self.last_processed.get(symbol)
+                if last is not None and timestamp - last < self.conflate_interval * 1000:
+                    self.conflated_updates += 1
+                    return
+                self.last_processed[symbol] = timestamp
             
-            # Check if this is a new rate or rate has changed
-            if not is_new_symbol and symbol in self.last_rates and self.last_rates[symbol] == funding_rate:
-                return  # Skip if rate hasn't changed
-                
-            self.last_rates[symbol] = funding_rate
+            # Feed downstream consumers before change detection
+            if self.funding_listeners:
+                mark_price = float(data.get('p', 0))
+                index_price = float(data.get('i', 0))
+                for listener in self.funding_listeners:
+                    listener(symbol, funding_rate, mark_price, index_price, timestamp)
+            
+            if not self._is_significant(symbol, funding_rate, timestamp):
+                self.suppressed_updates += 1
+                return
+            self.emitted_updates += 1
             
             # Convert to percentage and annualized rate
             funding_rate_pct = funding_rate * 100
             annual_rate = funding_rate_pct * 3 * 365  # Funding every 8 hours
             
-            # Check if rate is significant (using annual rate)
+            # Only show rates above the configured annual minimum
             if abs(annual_rate) >= self.min_funding_rate:
                 self._print_funding_rate(symbol, funding_rate_pct, annual_rate, timestamp)
+                if self.sinks:
+                    self.sinks.publish('funding', {
+                        'symbol': symbol,
+                        'rate': funding_rate_pct,
+                        'annual': annual_rate,
+                        'timestamp': timestamp
+                    })
                 
         except Exception as e:
             logger.error(f"Error processing funding rate data: {e}")
             
+    def _is_significant(self, symbol: str, funding_rate: float, timestamp: int) -> bool:
+        """Decide whether a rate update is worth emitting, recording it if so
+        
+        New symbols and band changes are always emitted. Changes of at least
+        the epsilon are emitted at most every min_emit_interval, and smaller
+        changes are refreshed every refresh_interval.
+        """
+        rate_pct = funding_rate * 100
+        annual_rate = rate_pct * 3 * 365
+        state = self.last_rates.get(symbol)
+        if state is None:
+            self.last_rates[symbol] = [rate_pct, intensity_band(annual_rate), timestamp]
+            return True
+            
+        last_rate, band, emitted_at = state
+        if rate_pct == last_rate:
+            return False
+            
+        # Hysteresis: the rate must clear a boundary by band_margin to change band
+        new_band = band
+        if annual_rate > last_rate * 3 * 365:
+            shifted = intensity_band(annual_rate - self.band_margin)
+            if shifted > band:
+                new_band = shifted
+        else:
+            shifted = intensity_band(annual_rate + self.band_margin)
+            if shifted < band:
+                new_band = shifted
+                
+        elapsed = (timestamp - emitted_at) / 1000
+        change = abs(rate_pct - last_rate)
+        significant = change >= max(self.rate_epsilon, self.relative_epsilon * abs(last_rate))
+        if (new_band != band
+                or (significant and elapsed >= self.min_emit_interval)
+                or elapsed >= self.refresh_interval):
+            self.last_rates[symbol] = [rate_pct, new_band, timestamp]
+            return True
+        return False
+        
+    def get_filter_stats(self) -> Dict:
+        """Emitted versus suppressed funding updates"""
+        total = self.emitted_updates + self.suppressed_updates
+        return {
+            'emitted': self.emitted_updates,
+            'suppressed': self.suppressed_updates,
+            'suppressed_ratio': round(self.suppressed_updates / total, 4) if total else 0.0,
+            'conflated': self.conflated_updates,
+            'symbols': len(self.last_rates)
+        }
+        
     def _print_funding_rate(self, symbol: str, funding_rate_pct: float, annual_rate: float, timestamp: int):
         """Print formatted funding rate information"""
+        if not self.console:
+            return
         dt = datetime.fromtimestamp(timestamp / 1000)
         time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
         
@@ -0,0 +1,190 @@
+import asyncio
+import heapq
+import logging
+import time
+import warnings
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from bounded_state import SymbolTable, symbols
+
+logger = logging.getLogger(__name__)
+
+SIDES = ('long', 'short')  # Liquidated position: a SELL force order closes a long
+
+
+def _format_usd(value: float) -> str:
+    if value >= 1_000_000:
+        return f"${value / 1_000_000:g}M"
+    return f"${value / 1_000:g}K"
+
+
+class ImpactStudy:
+    """Event study of the forward price path after large liquidations.
+
+    Every liquidation of at least ``min_usd_value`` records the last traded
+    price of its symbol and is then observed at each horizon (+1s, +5s,
+    +30s, +5m by default). Observations wait in one heap ordered by due
+    time; each holds only its next horizon and is pushed back for the
+    following one once resolved, so a cascade of thousands of liquidations
+    costs O(log n) per resolution instead of a timer per event. Due
+    observations are resolved from the aggTrade listener as event time
+    passes them, with the price of the last trade at or before the due time.
+
+    Impacts are signed basis points in the direction of the force order:
+    positive means the price kept moving the way the liquidation pushed it.
+    Each (size bucket, side, horizon) keeps a ring of its latest ``window``
+    impacts, from which the rolling curves are computed on request.
+    """
+
+    def __init__(self, min_usd_value: float = 100000, horizons: Sequence[float] = (1, 5, 30, 300),
+                 size_edges: Sequence[float] = (250_000, 1_000_000, 5_000_000), window: int = 500,
+                 max_pending: int = 20000, max_price_age: float = 10.0, idle_grace: float = 2.0,
+                 table: SymbolTable = symbols):
+        self.min_usd_value = min_usd_value
+        self.horizons = list(horizons)
+        self.horizons_ms = [int(horizon * 1000) for horizon in horizons]
+        self.size_edges = np.asarray(size_edges, dtype=float)
+        self.window = window
+        self.max_pending = max_pending
+        self.max_price_age_ms = max_price_age * 1000
+        self.idle_grace = idle_grace
+        self.table = table
+
+        # Last trade per symbol id
+        self.last_price = np.full(table.capacity, np.nan)
+        self.last_trade_ms = np.zeros(table.capacity, dtype=np.int64)
+
+        # (due ms, sequence, symbol id, horizon index, base price, sign, size bucket)
+        self.pending: List[tuple] = []
+        self.sequence = 0
+        self.watermark = 0  # Latest trade event time seen (ms)
+        self.watermark_at = time.monotonic()  # When the watermark last advanced
+
+        shape = (len(size_edges) + 1, len(SIDES), len(horizons))
+        self.impacts = np.full(shape + (window,), np.nan)
+        self.heads = np.zeros(shape, dtype=np.int64)  # Samples written per ring
+
+        self.observed = 0
+        self.resolved = 0
+        self.dropped = 0  # Over max_pending
+        self.unpriced = 0  # No recent trade to take the starting price from
+        self.stale = 0  # Horizons skipped for lack of a recent trade at the due time
+
+    def size_labels(self) -> List[str]:
+        edges = [_format_usd(edge) for edge in self.size_edges]
+        return [f"<{edges[0]}"] + [f"{low}-{high}" for low, high in zip(edges, edges[1:])] + [f">={edges[-1]}"]
+
+    def on_liquidation(self, symbol: str, side: str, price: float, quantity: float, timestamp: int):
+        """Liquidation listener: start observing liquidations above the threshold"""
+        usd_value = price * quantity
+        if usd_value < self.min_usd_value:
+            return
+        symbol_id = self.table.intern(symbol)
+        base_price = self.last_price[symbol_id]
+        if np.isnan(base_price) or abs(timestamp - self.last_trade_ms[symbol_id]) > self.max_price_age_ms:
+            self.unpriced += 1
+            return
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        sign = -1.0 if side == 'SELL' else 1.0
+        bucket = int(np.searchsorted(self.size_edges, usd_value, side='right'))
+        self.sequence += 1
+        heapq.heappush(self.pending, (timestamp + self.horizons_ms[0], self.sequence, symbol_id, 0,
+                                      float(base_price), sign, bucket))
+        self.observed += 1
+
+    def on_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        """Trade listener: resolve observations due before this trade, then record its price"""
+        if timestamp > self.watermark:
+            if self.pending and self.pending[0][0] < timestamp:
+                # Prices still hold the last trade at or before each due time
+                self.resolve(timestamp - 1)
+            self.watermark = timestamp
+            self.watermark_at = time.monotonic()
+        symbol_id = self.table.intern(symbol)
+        self.last_price[symbol_id] = price
+        self.last_trade_ms[symbol_id] = timestamp
+
+    def resolve(self, until_ms: float) -> int:
+        """Record every observation due at or before until_ms; returns how many were recorded"""
+        pending = self.pending
+        count = 0
+        while pending and pending[0][0] <= until_ms:
+            due, sequence, symbol_id, horizon, base_price, sign, bucket = pending[0]
+            if due - self.last_trade_ms[symbol_id] > self.max_price_age_ms:
+                # Stream dropped or quiet: a stale price would read as zero impact
+                self.stale += 1
+            else:
+                side = 0 if sign < 0 else 1
+                impact = (self.last_price[symbol_id] / base_price - 1.0) * 10000.0 * sign
+                head = self.heads[bucket, side, horizon]
+                self.impacts[bucket, side, horizon, head % self.window] = impact
+                self.heads[bucket, side, horizon] = head + 1
+                count += 1
+
+            next_horizon = horizon + 1
+            if next_horizon < len(self.horizons_ms):
+                heapq.heapreplace(pending, (due - self.horizons_ms[horizon] + self.horizons_ms[next_horizon],
+                                            sequence, symbol_id, next_horizon, base_price, sign, bucket))
+            else:
+                heapq.heappop(pending)
+        self.resolved += count
+        return count
+
+    def sweep(self):
+        """Advance event time by wall time while no trades arrive, so quiet markets still resolve"""
+        idle = time.monotonic() - self.watermark_at
+        if self.pending and self.watermark and idle > self.idle_grace:
+            self.resolve(self.watermark + idle * 1000)
+
+    async def run(self, interval: float = 1.0):
+        """Sweep for idle symbols until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error resolving impact observations: {e}")
+
+    def get_snapshot(self) -> Dict:
+        """Rolling impact curves (bps per horizon) by size bucket and side"""
+        filled = np.minimum(self.heads, self.window)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Empty rings give NaN, reported as null
+            mean = np.nanmean(self.impacts, axis=-1)
+            median = np.nanmedian(self.impacts, axis=-1)
+            continuation = np.nansum(self.impacts > 0, axis=-1) / filled
+
+        def clean(values: np.ndarray, digits: int) -> List:
+            values = np.round(values, digits).astype(object)
+            values[~np.isfinite(values.astype(float))] = None
+            return values.tolist()
+
+        curves = []
+        for bucket, label in enumerate(self.size_labels()):
+            for side, side_name in enumerate(SIDES):
+                if not filled[bucket, side].any():
+                    continue
+                curves.append({
+                    'size': label,
+                    'side': side_name,
+                    'samples': filled[bucket, side].tolist(),
+                    'meanBps': clean(mean[bucket, side], 2),
+                    'medianBps': clean(median[bucket, side], 2),
+                    'continuation': clean(continuation[bucket, side], 3)
+                })
+        return {
+            'horizons': self.horizons,
+            'minUsdValue': self.min_usd_value,
+            'sizeBuckets': self.size_labels(),
+            'curves': curves,
+            'pending': len(self.pending),
+            'observed': self.observed,
+            'resolved': self.resolved,
+            'dropped': self.dropped,
+            'unpriced': self.unpriced,
+            'stale': self.stale
+        }
@@ -1,8 +1,10 @@
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, List
 from colorama import Fore, Style, init
 
+from bounded_state import symbols
+
 init(autoreset=True)
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,13 @@ class LiquidationHandler:
     def __init__(self, min_usd_value: float = 100000):
         self.min_usd_value = min_usd_value
         self.symbols_of_interest = []  # Will be set dynamically
+        self.console = True  # Print alerts to the terminal
+        self.liquidation_listeners: List[Callable] = []  # Called with every valid liquidation
+        self.sinks = None  # Optional SinkPipeline for exported alerts
+
+    def add_liquidation_listener(self, listener: Callable):
+        """Register a callable(symbol, side, price, quantity, timestamp) fed by every liquidation"""
+        self.liquidation_listeners.append(listener)
         
     async def handle_liquidation(self, data: Dict):
         """Process liquidation order data from Binance futures"""
@@ -54,6 +63,23 @@ class LiquidationHandler:
             # Only process large liquidations
             if usd_value >= self.min_usd_value:
                 self._print_liquidation(symbol, side, price, quantity, usd_value, timestamp)
+                if self.sinks:
+                    self.sinks.publish('liquidation', {
+                        'symbol': symbol,
+                        'side': side,
+                        'price': price,
+                        'quantity': quantity,
+                        'usdValue': usd_value,
+                        'timestamp': timestamp
+                    })
+                    
+            # Feed downstream consumers regardless of the print threshold, after
+            # the alert so a failing listener cannot drop it
+            for listener in self.liquidation_listeners:
+                try:
+                    listener(symbol, side, price, quantity, timestamp)
+                except Exception:
+                    logger.exception("Error in liquidation listener")
                 
         except Exception as e:
             logger.error(f"Error processing liquidation data: {e}", exc_info=True)
@@ -61,11 +87,13 @@ class LiquidationHandler:
     def _print_liquidation(self, symbol: str, side: str, price: float, 
                           quantity: float, usd_value: float, timestamp: int):
         """Print formatted liquidation information"""
+        if not self.console:
+            return
         dt = datetime.fromtimestamp(timestamp / 1000)
         time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
         
-        # Format symbol (remove USDT)
-        symbol_display = symbol.replace('USDT', '')
+        # Precomputed display name (BTCUSDT -> BTC)
+        symbol_display = symbols.display(symbols.intern(symbol))
         
         # Determine liquidation type and color
         if side == 'SELL':
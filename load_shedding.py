@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Tiers in escalation order; each keeps the measures of the tiers below it
+TIER_NAMES = ('normal', 'quiet_console', 'conflate_mark_price', 'coarsen')
+NORMAL, QUIET_CONSOLE, CONFLATE_MARK_PRICE, COARSEN = range(len(TIER_NAMES))
+
+
+class LoadShedder:
+    """Switches priority tiers from event-loop lag and ingest backlog.
+
+    The tier a sample calls for is the highest one whose lag or backlog
+    threshold it reaches. Escalation is immediate; de-escalation goes one
+    tier at a time, once the pressure has stayed below the current tier for
+    ``cooldown`` seconds, so the controller does not flap at a boundary.
+    What each tier sheds is up to ``on_change(tier)``.
+    """
+
+    def __init__(self, lag: Callable[[], float], backlog: Callable[[], int],
+                 lag_thresholds_ms: Sequence[float] = (100, 250, 500),
+                 backlog_thresholds: Sequence[int] = (500, 2000, 8000),
+                 interval: float = 0.5, cooldown: float = 10.0,
+                 on_change: Optional[Callable[[int], None]] = None):
+        self.lag = lag
+        self.backlog = backlog
+        self.lag_thresholds_ms = lag_thresholds_ms
+        self.backlog_thresholds = backlog_thresholds
+        self.interval = interval
+        self.cooldown = cooldown
+        self.on_change = on_change
+
+        self.tier = NORMAL
+        self.tier_since = time.time()
+        self.calm_since: Optional[float] = None  # Monotonic time pressure dropped below the tier
+        self.last_lag_ms = 0.0
+        self.last_backlog = 0
+        self.transitions = deque(maxlen=50)
+
+    def pressure_tier(self, lag_ms: float, backlog: int) -> int:
+        """Tier called for by one lag/backlog sample"""
+        tier = NORMAL
+        for level, (lag_limit, backlog_limit) in enumerate(zip(self.lag_thresholds_ms, self.backlog_thresholds), 1):
+            if lag_ms >= lag_limit or backlog >= backlog_limit:
+                tier = level
+        return tier
+
+    def update(self, lag_ms: float, backlog: int, now: Optional[float] = None) -> int:
+        """Feed one sample and move the tier; returns the current tier"""
+        now = time.monotonic() if now is None else now
+        self.last_lag_ms = lag_ms
+        self.last_backlog = backlog
+        target = self.pressure_tier(lag_ms, backlog)
+        if target > self.tier:
+            self._set_tier(target)
+            self.calm_since = None
+        elif target < self.tier:
+            if self.calm_since is None:
+                self.calm_since = now
+            elif now - self.calm_since >= self.cooldown:
+                self._set_tier(self.tier - 1)
+                self.calm_since = now  # The next step down needs its own calm period
+        else:
+            self.calm_since = None
+        return self.tier
+
+    def _set_tier(self, tier: int):
+        previous = self.tier
+        self.tier = tier
+        self.tier_since = time.time()
+        self.transitions.append({
+            'at': self.tier_since,
+            'from': TIER_NAMES[previous],
+            'to': TIER_NAMES[tier],
+            'lag_ms': round(self.last_lag_ms, 1),
+            'backlog': self.last_backlog
+        })
+        log = logger.warning if tier > previous else logger.info
+        log(f"Load shedding {TIER_NAMES[previous]} -> {TIER_NAMES[tier]} "
+            f"(lag {self.last_lag_ms:.0f}ms, backlog {self.last_backlog} frames)")
+        if self.on_change:
+            try:
+                self.on_change(tier)
+            except Exception as e:
+                logger.error(f"Error applying load shedding tier {TIER_NAMES[tier]}: {e}")
+
+    async def run(self):
+        """Sample lag and backlog until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.update(self.lag(), self.backlog())
+            except Exception as e:
+                logger.error(f"Error in load shedding controller: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'tier': self.tier,
+            'name': TIER_NAMES[self.tier],
+            'since': self.tier_since,
+            'lag_ms': round(self.last_lag_ms, 1),
+            'backlog': self.last_backlog,
+            'transitions': list(self.transitions)
+        }
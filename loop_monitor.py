@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures asyncio event-loop scheduling lag.
+
+    A sleeper task asks to be woken every ``interval`` seconds; any delay
+    beyond that is time the loop spent busy with other callbacks.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600, warn_ms: float = 250.0):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.samples = deque(maxlen=window)  # Recent lag samples in ms
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    async def run(self):
+        """Sample loop lag until cancelled"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - start - self.interval) * 1000)
+            self.last_lag_ms = lag_ms
+            self.samples.append(lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            if lag_ms >= self.warn_ms:
+                logger.warning(f"Event loop lag {lag_ms:.0f}ms")
+
+    def recent_max_ms(self, count: int = 5) -> float:
+        """Worst lag over the last few samples"""
+        recent = list(self.samples)[-count:]
+        return max(recent) if recent else 0.0
+
+    def get_stats(self) -> Dict:
+        """Return lag statistics over the sample window"""
+        if not self.samples:
+            return {'last_ms': 0.0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0, 'samples': 0}
+        lags = np.fromiter(self.samples, dtype=np.float64)
+        p50, p99 = np.percentile(lags, [50, 99])
+        return {
+            'last_ms': round(self.last_lag_ms, 2),
+            'mean_ms': round(float(lags.mean()), 2),
+            'p50_ms': round(float(p50), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(self.max_lag_ms, 2),
+            'samples': int(lags.size)
+        }
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples another thread's Python stack.
+
+    Samples are taken from ``sys._current_frames()`` by the calling thread,
+    so the profiled thread runs unmodified (no tracing hooks installed).
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+
+    def _stack(self, frame) -> str:
+        """Collapse a frame chain into 'root;...;leaf'"""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = code.co_filename.rsplit('/', 1)[-1]
+            names.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    def sample(self, thread_id: int, seconds: float) -> Dict[str, int]:
+        """Sample the given thread for a number of seconds and count stacks"""
+        counts: Dict[str, int] = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack = self._stack(frame)
+            counts[stack] = counts.get(stack, 0) + 1
+            del frame
+            time.sleep(self.interval)
+        return counts
+
+    @staticmethod
+    def supported() -> bool:
+        """False when gevent has patched threading: thread ids are then greenlet ids and
+        the ingest loop shares the OS thread of the sampler, so there is no stack to sample"""
+        try:
+            from gevent import monkey
+        except ImportError:
+            return True
+        return not monkey.is_module_patched('threading')
+
+    @staticmethod
+    def collapse(counts: Dict[str, int]) -> str:
+        """Format counts in the collapsed-stack format used by flamegraph.pl/speedscope"""
+        lines = [f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+        return '\n'.join(lines) + '\n'
+
@@ -1,12 +1,16 @@
+import argparse
 import asyncio
 import logging
+import os
 import signal
 from colorama import init
 
 from websocket_manager import BinanceWebSocketManager
 from liquidation_handler import LiquidationHandler
-from funding_handler import FundingHandler
+from funding_handler import FundingHandler, funding_filter_options
 from trades_handler import TradesHandler
+from export_sinks import build_pipeline_from_env
+from terminal_dashboard import TerminalDashboard
 
 # Initialize colorama for Windows support
 init()
@@ -20,7 +24,7 @@ logger = logging.getLogger(__name__)
 
 
 class BinanceDataStream:
-    def __init__(self):
+    def __init__(self, dashboard: bool = False):
         # Thresholds - modify these values to change filtering
         self.min_liquidation_usd = 100000  # Minimum liquidation size in USD
         self.min_trade_usd = 500000        # Minimum aggregated trade size per second in USD
@@ -29,14 +33,41 @@ class BinanceDataStream:
         # Initialize components
         self.ws_manager = BinanceWebSocketManager()
         self.liquidation_handler = LiquidationHandler(self.min_liquidation_usd)
-        self.funding_handler = FundingHandler(self.min_funding_rate)
+        self.funding_handler = FundingHandler(self.min_funding_rate, **funding_filter_options())
         self.trades_handler = TradesHandler(self.min_trade_usd)
         
+        # Optional export sinks (EXPORT_SINKS env var) fed by all handlers
+        self.sinks = build_pipeline_from_env()
+        if self.sinks:
+            self.liquidation_handler.sinks = self.sinks
+            self.funding_handler.sinks = self.sinks
+            self.trades_handler.sinks = self.sinks
+        
+        # Full-screen dashboard replaces the scrolling alert output
+        self.dashboard = None
+        if dashboard:
+            self.dashboard = TerminalDashboard(
+                self.ws_manager,
+                min_liquidation_usd=self.min_liquidation_usd,
+                refresh_hz=float(os.environ.get('DASHBOARD_REFRESH_HZ', 4))
+            )
+            self.liquidation_handler.add_liquidation_listener(self.dashboard.on_liquidation)
+            self.trades_handler.add_trade_listener(self.dashboard.on_trade)
+            self.funding_handler.add_funding_listener(self.dashboard.on_funding)
+            self.liquidation_handler.console = False
+            self.trades_handler.console = False
+            self.funding_handler.console = False
+        
+        # Legs per latency-critical stream (liquidations, aggTrades)
+        self.redundancy = int(os.environ.get('WS_REDUNDANCY', 1))
+        
         self.running = False
         
     async def start(self):
         """Start all data streams"""
         self.running = True
+        if self.sinks:
+            self.sinks.start()
         
         # Prepare subscriptions
         subscriptions = []
@@ -46,7 +77,8 @@ class BinanceDataStream:
             subscriptions.append({
                 'stream': stream,
                 'callback': self.liquidation_handler.handle_liquidation,
-                'is_futures': True
+                'is_futures': True,
+                'redundancy': self.redundancy
             })
             
         # Trade streams (futures market to match liquidations)
@@ -54,7 +86,9 @@ class BinanceDataStream:
             subscriptions.append({
                 'stream': stream,
                 'callback': self.trades_handler.handle_trade,
-                'is_futures': True
+                'batch_callback': self.trades_handler.handle_batch,
+                'is_futures': True,
+                'redundancy': self.redundancy
             })
             
         # Funding rate streams (futures market)
@@ -73,6 +107,11 @@ class BinanceDataStream:
             self.trades_handler.print_aggregated_trades()
         )
         
+        # Reconnect streams that stay silent for longer than usual
+        watchdog_task = asyncio.create_task(self.ws_manager.watchdog())
+        
+        dashboard_task = asyncio.create_task(self.dashboard.run()) if self.dashboard else None
+        
         # Keep the main task running
         try:
             while self.running:
@@ -81,7 +120,16 @@ class BinanceDataStream:
             pass
         finally:
             trade_aggregation_task.cancel()
+            watchdog_task.cancel()
+            if dashboard_task:
+                dashboard_task.cancel()
+                try:
+                    await dashboard_task  # Restores the terminal before the goodbye lines
+                except asyncio.CancelledError:
+                    pass
             await self.ws_manager.close_all()
+            if self.sinks:
+                self.sinks.close()
             
     def stop(self):
         """Stop all data streams"""
@@ -89,9 +137,9 @@ class BinanceDataStream:
         self.running = False
 
 
-async def main():
+async def main(dashboard: bool = False):
     """Main entry point"""
-    stream = BinanceDataStream()
+    stream = BinanceDataStream(dashboard=dashboard)
     
     try:
         await stream.start()
@@ -104,8 +152,13 @@ async def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binance futures liquidation, trade and funding monitor")
+    parser.add_argument('--dashboard', action='store_true',
+                        default=os.environ.get('TERMINAL_DASHBOARD', '').lower() in ('1', 'true', 'yes'),
+                        help="full-screen dashboard instead of scrolling alerts (env TERMINAL_DASHBOARD)")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(dashboard=args.dashboard))
     except KeyboardInterrupt:
         print("\n\n🛑 Interrupted by user")
         print("👋 Goodbye!")
\ No newline at end of file
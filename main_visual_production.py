@@ -7,9 +7,20 @@ import time
 
 from websocket_manager import BinanceWebSocketManager
 from liquidation_handler import LiquidationHandler
-from funding_handler import FundingHandler
+from funding_handler import FundingHandler, funding_filter_options
 from trades_handler import TradesHandler
-from web_server import app, socketio, emit_liquidation, emit_trade, emit_funding
+from export_sinks import build_pipeline_from_env
+from candle_builder import CandleBuilder
+from tick_store import TickStore
+from loop_monitor import LoopLagMonitor
+from load_shedding import LoadShedder, QUIET_CONSOLE, CONFLATE_MARK_PRICE, COARSEN
+from basis_engine import BasisEngine
+from correlation_engine import CorrelationEngine
+from impact_study import ImpactStudy
+from symbol_registry import build_registry_from_env
+from bounded_state import BoundedDict, symbols
+from events import FundingEvent, LiquidationEvent, TradeEvent
+from web_server import app, socketio, emit_liquidation, emit_trade, emit_funding, emit_candle, emit_basis, emit_correlation, set_push_shedding, snapshot_cache
 
 # Initialize colorama for Windows support
 init()
@@ -33,49 +44,33 @@ class VisualLiquidationHandler(LiquidationHandler):
         super()._print_liquidation(symbol, side, price, quantity, usd_value, timestamp)
         
         # Emit to web interface
-        emit_liquidation({
-            'symbol': symbol.replace('USDT', ''),
-            'side': side,
-            'price': price,
-            'quantity': quantity,
-            'usdValue': usd_value,
-            'timestamp': timestamp
-        })
+        emit_liquidation(LiquidationEvent(symbols.intern(symbol), side == 'BUY', price, quantity, usd_value, timestamp))
 
 
 class VisualFundingHandler(FundingHandler):
-    def __init__(self, min_funding_rate: float = 0.01):
-        super().__init__(min_funding_rate)
-        self.current_rates = {}  # Store current rates for all symbols
+    def __init__(self, min_funding_rate: float = 0.01, **filter_options):
+        super().__init__(min_funding_rate, **filter_options)
+        self.current_rates = BoundedDict(1024)  # Store current rates for all symbols
         
     def _print_funding_rate(self, symbol, funding_rate_pct, annual_rate, timestamp):
         # Call parent to print to console
         super()._print_funding_rate(symbol, funding_rate_pct, annual_rate, timestamp)
         
         # Store the current rate
-        self.current_rates[symbol] = {
-            'rate': funding_rate_pct,
-            'annual': annual_rate,
-            'direction': "LONGS PAY SHORTS" if funding_rate_pct > 0 else "SHORTS PAY LONGS",
-            'timestamp': timestamp
-        }
+        event = FundingEvent(symbols.intern(symbol), funding_rate_pct, annual_rate, timestamp)
+        self.current_rates[symbol] = event
         
         # Emit to web interface
-        emit_funding(symbol, self.current_rates[symbol])
+        emit_funding(event)
 
 
 class VisualTradesHandler(TradesHandler):
-    def _print_aggregated_trade(self, symbol, time_bucket, usd_total, is_buyer_maker):
+    def _on_aggregated_trade(self, symbol_id, second, usd_total, is_buyer_maker, correction=False):
         # Call parent to print to console
-        super()._print_aggregated_trade(symbol, time_bucket, usd_total, is_buyer_maker)
+        super()._on_aggregated_trade(symbol_id, second, usd_total, is_buyer_maker, correction)
         
         # Emit to web interface
-        emit_trade({
-            'symbol': symbol,
-            'timestr': time_bucket,
-            'usdValue': usd_total,
-            'direction': 'SELL' if is_buyer_maker else 'BUY'
-        })
+        emit_trade(TradeEvent(symbol_id, second, usd_total, is_buyer_maker, correction))
 
 
 class BinanceDataStreamVisualDynamic:
@@ -85,31 +80,103 @@ class BinanceDataStreamVisualDynamic:
         self.min_liquidation_usd = 100000
         self.min_trade_usd = 500000
         self.min_funding_rate = 10
+        self.default_symbols = list(self.active_symbols)
+        self.default_min_liquidation = self.min_liquidation_usd
+        self.default_min_trade = self.min_trade_usd
         
         # Initialize components
         self.ws_manager = BinanceWebSocketManager()
         self.liquidation_handler = VisualLiquidationHandler(self.min_liquidation_usd)
-        self.funding_handler = VisualFundingHandler(self.min_funding_rate)
+        self.funding_handler = VisualFundingHandler(self.min_funding_rate, **funding_filter_options())
         self.trades_handler = VisualTradesHandler(self.min_trade_usd)
         
+        # Optional export sinks (EXPORT_SINKS env var) fed by all handlers
+        self.sinks = build_pipeline_from_env()
+        if self.sinks:
+            self.liquidation_handler.sinks = self.sinks
+            self.funding_handler.sinks = self.sinks
+            self.trades_handler.sinks = self.sinks
+        
+        # Candles are built from the same aggTrade feed, so charts need no extra connection
+        self.candle_builder = CandleBuilder(
+            footprint=os.environ.get('CANDLE_FOOTPRINT', '0') == '1',
+            on_close=emit_candle,
+            max_symbols=int(os.environ.get('CANDLE_SYMBOLS', 64))
+        )
+        self.trades_handler.add_trade_listener(self.candle_builder.add_trade)
+        
+        # Columnar tick history for time-indexed queries
+        self.tick_store = TickStore(
+            trade_capacity=int(os.environ.get('TICK_STORE_TRADES', 400_000)),
+            liquidation_capacity=int(os.environ.get('TICK_STORE_LIQUIDATIONS', 20_000)),
+            retention_hours=float(os.environ.get('TICK_STORE_HOURS', 4)),
+            max_trade_symbols=int(os.environ.get('TICK_STORE_SYMBOLS', 16))
+        )
+        self.trades_handler.add_trade_listener(self.tick_store.add_trade)
+        self.liquidation_handler.add_liquidation_listener(self.tick_store.add_liquidation)
+        
+        # Spot/futures basis from matching spot aggTrade streams
+        self.enable_basis = os.environ.get('ENABLE_SPOT_BASIS', '1') == '1'
+        self.basis_engine = BasisEngine(on_update=emit_basis)
+        if self.enable_basis:
+            self.trades_handler.add_trade_listener(self.basis_engine.on_futures_trade)
+            self.funding_handler.add_funding_listener(self.basis_engine.on_funding)
+        
+        # Rolling cross-symbol correlation and anomaly scores
+        self.enable_correlation = os.environ.get('ENABLE_CORRELATION', '1') == '1'
+        self.correlation_engine = CorrelationEngine(
+            window=int(os.environ.get('CORRELATION_WINDOW', 300)),
+            on_update=emit_correlation
+        )
+        if self.enable_correlation:
+            self.trades_handler.add_trade_listener(self.correlation_engine.on_trade)
+            self.funding_handler.add_funding_listener(self.correlation_engine.on_funding)
+        
+        # Forward price path after large liquidations
+        self.enable_impact_study = os.environ.get('ENABLE_IMPACT_STUDY', '1') == '1'
+        self.impact_study = ImpactStudy(
+            self.min_liquidation_usd,
+            window=int(os.environ.get('IMPACT_WINDOW', 500)),
+            max_pending=int(os.environ.get('IMPACT_MAX_PENDING', 20000))
+        )
+        if self.enable_impact_study:
+            self.trades_handler.add_trade_listener(self.impact_study.on_trade)
+            self.liquidation_handler.add_liquidation_listener(self.impact_study.on_liquidation)
+        
+        # Exchange metadata, stream and display names per symbol
+        self.registry = build_registry_from_env()
+        
         self.running = False
-        self.current_subscriptions = {}
+        self.current_subscriptions = {}  # Stream key -> display symbol (None for all-market streams)
         self.update_queue = asyncio.Queue()
         self.loop = None
+        self.thread_id = None
+        self.lag_monitor = LoopLagMonitor()
         
-    def update_settings(self, symbols=None, min_liquidation=None, min_trade=None):
+        # Priority tiers under ingest pressure; liquidations are never shed
+        self.load_shedder = LoadShedder(
+            lag=self.lag_monitor.recent_max_ms,
+            backlog=self.ws_manager.get_backlog,
+            on_change=self._apply_load_tier
+        )
+        
+        # Legs per latency-critical stream (liquidations, main-symbol aggTrades)
+        self.redundancy = int(os.environ.get('WS_REDUNDANCY', 1))
+        
+    def update_settings(self, symbol_names=None, min_liquidation=None, min_trade=None):
         """Update settings dynamically - thread safe"""
-        logger.info(f"update_settings called with symbols={symbols}, min_liq={min_liquidation}, min_trade={min_trade}")
+        logger.info(f"update_settings called with symbols={symbol_names}, min_liq={min_liquidation}, min_trade={min_trade}")
         update_data = {}
         
-        if symbols is not None:
-            self.active_symbols = symbols
-            update_data['symbols'] = symbols
-            print(f"Updated symbols: {symbols}")
+        if symbol_names is not None:
+            self.active_symbols = symbol_names
+            update_data['symbols'] = symbol_names
+            print(f"Updated symbols: {symbol_names}")
             
         if min_liquidation is not None:
             self.min_liquidation_usd = min_liquidation
             self.liquidation_handler.min_usd_value = min_liquidation
+            self.impact_study.min_usd_value = min_liquidation
             print(f"Updated min liquidation: ${min_liquidation}")
             
         if min_trade is not None:
@@ -127,12 +194,32 @@ class BinanceDataStreamVisualDynamic:
         else:
             logger.warning(f"Cannot queue update - loop={self.loop}, update_data={update_data}")
         
+    def apply_client_filters(self, symbol_names):
+        """Apply the union of all client symbol sets to the shared ingest
+        
+        Streams follow the union of client symbol sets (the defaults when no
+        client is connected). Client thresholds only filter the per-client
+        fan-out: the handler thresholds stay at the operator configuration,
+        which also gates console output, export sinks and the impact study.
+        """
+        symbol_names = list(symbol_names) if symbol_names else list(self.default_symbols)
+        if set(symbol_names) != set(self.active_symbols):
+            self.update_settings(symbol_names=symbol_names)
+
+    def _apply_load_tier(self, tier):
+        """Shed work by tier: console output, then markPrice rate, then trade bucket and push granularity"""
+        self.trades_handler.console = tier < QUIET_CONSOLE
+        self.funding_handler.console = tier < QUIET_CONSOLE
+        self.funding_handler.conflate_interval = 15.0 if tier >= CONFLATE_MARK_PRICE else 0.0
+        self.trades_handler.bucket_seconds = 5 if tier >= COARSEN else 1
+        set_push_shedding(0.5 if tier >= COARSEN else 0.0)
+
     def send_current_funding_rates(self):
         """Send current funding rates for active symbols"""
         for symbol in self.active_symbols:
-            symbol_full = f"{symbol}USDT"
-            if symbol_full in self.funding_handler.current_rates:
-                emit_funding(symbol_full, self.funding_handler.current_rates[symbol_full])
+            info = self.registry.resolve(symbol)
+            if info is not None and info.symbol in self.funding_handler.current_rates:
+                emit_funding(self.funding_handler.current_rates[info.symbol])
     
     async def update_streams(self):
         """Update WebSocket streams based on active symbols"""
@@ -142,15 +229,17 @@ class BinanceDataStreamVisualDynamic:
             if stream_name.startswith('!'):
                 continue
                 
-            symbol = stream_name.split('@')[0].upper()
-            if symbol.replace('USDT', '') not in self.active_symbols:
+            if self.current_subscriptions[stream_name] not in self.active_symbols:
                 # Close this stream
-                if stream_name in self.ws_manager.connections:
-                    await self.ws_manager.connections[stream_name].close()
-                    del self.ws_manager.connections[stream_name]
-                    del self.ws_manager.callbacks[stream_name]
-                    del self.current_subscriptions[stream_name]
-                    print(f"Closed stream: {stream_name}")
+                await self.ws_manager.disconnect(stream_name)
+                del self.current_subscriptions[stream_name]
+                print(f"Closed stream: {stream_name}")
+        
+        # Free correlation and basis slots of symbols no longer streamed
+        streamed = {self.registry.resolve(symbol).symbol for symbol in self.active_symbols
+                    if self.registry.is_known(symbol)}
+        self.correlation_engine.retain(streamed)
+        self.basis_engine.retain(streamed)
         
         # Add new streams
         new_subscriptions = []
@@ -160,38 +249,55 @@ class BinanceDataStreamVisualDynamic:
             new_subscriptions.append({
                 'stream': "!forceOrder@arr",
                 'callback': self.liquidation_handler.handle_liquidation,
-                'is_futures': True
+                'is_futures': True,
+                'redundancy': self.redundancy
             })
-            self.current_subscriptions["!forceOrder@arr"] = True
+            self.current_subscriptions["!forceOrder@arr"] = None
             logger.info("Re-adding liquidation stream")
         
         for symbol in self.active_symbols:
-            symbol_lower = symbol.lower() + 'usdt'
+            if not self.registry.is_known(symbol):
+                logger.warning(f"Skipping streams for unknown symbol {symbol}")
+                continue
+            info = self.registry.resolve(symbol)
             
             # Trade stream
-            stream_name = f"{symbol_lower}@aggTrade"
+            stream_name = info.trade_stream
             if stream_name not in self.current_subscriptions:
                 new_subscriptions.append({
                     'stream': stream_name,
                     'callback': self.trades_handler.handle_trade,
-                    'is_futures': True
+                    'batch_callback': self.trades_handler.handle_batch,
+                    'is_futures': True,
+                    'redundancy': self.redundancy if symbol in self.default_symbols else 1
                 })
-                self.current_subscriptions[stream_name] = True
+                self.current_subscriptions[stream_name] = symbol
                 
             # Funding stream
-            stream_name = f"{symbol_lower}@markPrice"
+            stream_name = info.mark_price_stream
             if stream_name not in self.current_subscriptions:
                 new_subscriptions.append({
                     'stream': stream_name,
                     'callback': self.funding_handler.handle_funding_rate,
                     'is_futures': True
                 })
-                self.current_subscriptions[stream_name] = True
+                self.current_subscriptions[stream_name] = symbol
+                
+            # Spot trade stream for basis
+            stream_key = self.ws_manager.stream_key(info.trade_stream, is_futures=False)
+            if self.enable_basis and stream_key not in self.current_subscriptions:
+                new_subscriptions.append({
+                    'stream': info.trade_stream,
+                    'callback': self.basis_engine.handle_spot_trade,
+                    'is_futures': False
+                })
+                self.current_subscriptions[stream_key] = symbol
         
         # Subscribe to new streams
         if new_subscriptions:
             await self.ws_manager.subscribe_multiple(new_subscriptions)
             print(f"Added {len(new_subscriptions)} new streams")
+        snapshot_cache.invalidate()
             
         # Send current funding rates after a short delay to allow streams to connect
         await asyncio.sleep(0.5)
@@ -200,12 +306,20 @@ class BinanceDataStreamVisualDynamic:
     async def start(self):
         """Start all data streams"""
         self.running = True
+        if self.sinks:
+            self.sinks.start()
         self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()  # Target for the sampling profiler
+        lag_task = asyncio.create_task(self.lag_monitor.run())
+        shedding_task = asyncio.create_task(self.load_shedder.run())
         
         import os
         port = os.environ.get('PORT', 5000)
         print(f"📊 Web Interface: http://localhost:{port}")
         
+        # Contract metadata (disk cache first) before building stream names
+        await self.registry.load()
+        
         # Initial subscriptions
         subscriptions = []
         
@@ -213,34 +327,51 @@ class BinanceDataStreamVisualDynamic:
         subscriptions.append({
             'stream': "!forceOrder@arr",
             'callback': self.liquidation_handler.handle_liquidation,
-            'is_futures': True
+            'is_futures': True,
+            'redundancy': self.redundancy
         })
-        self.current_subscriptions["!forceOrder@arr"] = True
+        self.current_subscriptions["!forceOrder@arr"] = None
         
         # Add streams for default symbols
         for symbol in self.active_symbols:
-            symbol_lower = symbol.lower() + 'usdt'
+            if not self.registry.is_known(symbol):
+                logger.warning(f"Skipping streams for unknown symbol {symbol}")
+                continue
+            info = self.registry.resolve(symbol)
             
             # Trade streams
-            stream_name = f"{symbol_lower}@aggTrade"
+            stream_name = info.trade_stream
             subscriptions.append({
                 'stream': stream_name,
                 'callback': self.trades_handler.handle_trade,
-                'is_futures': True
+                'batch_callback': self.trades_handler.handle_batch,
+                'is_futures': True,
+                'redundancy': self.redundancy if symbol in self.default_symbols else 1
             })
-            self.current_subscriptions[stream_name] = True
+            self.current_subscriptions[stream_name] = symbol
             
             # Funding streams
-            stream_name = f"{symbol_lower}@markPrice"
+            stream_name = info.mark_price_stream
             subscriptions.append({
                 'stream': stream_name,
                 'callback': self.funding_handler.handle_funding_rate,
                 'is_futures': True
             })
-            self.current_subscriptions[stream_name] = True
+            self.current_subscriptions[stream_name] = symbol
+            
+            # Spot trade streams for basis
+            if self.enable_basis:
+                subscriptions.append({
+                    'stream': info.trade_stream,
+                    'callback': self.basis_engine.handle_spot_trade,
+                    'is_futures': False
+                })
+                stream_key = self.ws_manager.stream_key(info.trade_stream, is_futures=False)
+                self.current_subscriptions[stream_key] = symbol
         
         # Subscribe to WebSocket streams
         await self.ws_manager.subscribe_multiple(subscriptions)
+        snapshot_cache.invalidate()
         
         # Start the trade aggregation task
         trade_aggregation_task = asyncio.create_task(
@@ -250,6 +381,22 @@ class BinanceDataStreamVisualDynamic:
         # Start task to process updates from the queue
         update_task = asyncio.create_task(self._process_updates())
         
+        # Start the basis publisher
+        basis_task = asyncio.create_task(self.basis_engine.publish_loop())
+        
+        # Start the fixed-cadence correlation sampler
+        correlation_task = None
+        if self.enable_correlation:
+            correlation_task = asyncio.create_task(self.correlation_engine.publish_loop())
+        
+        # Resolve impact observations while trades are quiet
+        impact_task = None
+        if self.enable_impact_study:
+            impact_task = asyncio.create_task(self.impact_study.run())
+        
+        # Reconnect streams that stay silent for longer than usual
+        watchdog_task = asyncio.create_task(self.ws_manager.watchdog())
+        
         # Keep the main task running
         try:
             while self.running:
@@ -259,7 +406,17 @@ class BinanceDataStreamVisualDynamic:
         finally:
             trade_aggregation_task.cancel()
             update_task.cancel()
+            lag_task.cancel()
+            shedding_task.cancel()
+            basis_task.cancel()
+            if correlation_task:
+                correlation_task.cancel()
+            if impact_task:
+                impact_task.cancel()
+            watchdog_task.cancel()
             await self.ws_manager.close_all()
+            if self.sinks:
+                self.sinks.close()
             
     async def _process_updates(self):
         """Process updates from the queue"""
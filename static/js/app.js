@@ -9,6 +9,31 @@ let thresholds = {
     minTrade: 500000
 };
 
+// Candle chart state
+let candles = [];
+let candleSymbol = 'BTC';
+let candleInterval = '1m';
+const MAX_CANDLES = 120;
+
+// Render queue: socket events are buffered and applied once per animation frame
+const pending = {
+    liquidations: [],
+    trades: [],
+    funding: {},
+    candles: [],
+    correlation: null
+};
+let frameScheduled = false;
+let frameCostEwma = 0;
+let maxRateHint = parseInt(new URLSearchParams(window.location.search).get('maxRate')) || 0;
+// Packed-array pushes are used unless the page is opened with ?encoding=json
+const encodingHint = new URLSearchParams(window.location.search).get('encoding') || 'compact';
+let symbolTable = [];  // Symbol ids of packed records, filled by 'symbols' pushes
+const fundingRates = {};  // Latest funding data per short symbol
+const MAX_HISTORY = 1000;  // Rows kept in the virtualized lists
+let liquidationList = null;
+let tradeList = null;
+
 // Symbol mapping
 const symbolMap = {
     'btc': 'BTC',
@@ -24,26 +49,147 @@ const symbolMap = {
 // Socket.IO event handlers
 socket.on('connect', () => {
     console.log('Connected to server');
+    // Filters are per connection, so (re)send them on every connect
+    sendSettingsUpdate();
+    symbolTable = [];
+    const hints = { encoding: encodingHint };
+    if (maxRateHint) {
+        hints.maxRate = maxRateHint;
+    }
+    socket.emit('client_hints', hints);
 });
 
 socket.on('disconnect', () => {
     console.log('Disconnected from server');
 });
 
-socket.on('liquidation', (event) => {
-    addLiquidation(event.data);
-    updateTotalEvents();
-});
+socket.on('liquidation', (event) => queueEvent('liquidation', event));
+socket.on('trade', (event) => queueEvent('trade', event));
+socket.on('funding', (event) => queueEvent('funding', event));
+socket.on('candle', (event) => queueEvent('candle', event));
+socket.on('correlation', (event) => queueEvent('correlation', event));
 
-socket.on('trade', (event) => {
-    addTrade(event.data);
-    updateTotalEvents();
+// Conflated updates for clients that sent a max-rate hint
+socket.on('batch', (batch) => {
+    batch.events.forEach(([name, event]) => queueEvent(name, event));
 });
 
-socket.on('funding', (data) => {
-    updateFundingRate(data.symbol, data.data);
+// Compact encoding: symbol table entries, then packed records
+socket.on('symbols', ({ start, names }) => {
+    symbolTable.splice(start, names.length, ...names);
 });
 
+socket.on('p', (records) => records.forEach(unpackRecord));
+
+function unpackRecord(record) {
+    const symbol = symbolTable[record[1]];
+    if (record[0] === 0) {
+        queueEvent('liquidation', { data: {
+            symbol,
+            side: record[2] ? 'BUY' : 'SELL',
+            price: record[3],
+            quantity: record[4],
+            usdValue: record[5],
+            timestamp: record[6]
+        } });
+    } else if (record[0] === 1) {
+        queueEvent('trade', { data: {
+            symbol,
+            timestr: record[2],
+            usdValue: record[3],
+            direction: record[4] ? 'SELL' : 'BUY',
+            correction: record[5] === 1
+        } });
+    } else if (record[0] === 2) {
+        queueEvent('funding', { symbol: `${symbol}USDT`, data: {
+            rate: record[2],
+            annual: record[3],
+            direction: record[2] > 0 ? 'LONGS PAY SHORTS' : 'SHORTS PAY LONGS',
+            timestamp: record[4]
+        } });
+    }
+}
+
+function queueEvent(name, event) {
+    if (name === 'liquidation') {
+        pending.liquidations.push(event.data);
+    } else if (name === 'trade') {
+        pending.trades.push(event.data);
+    } else if (name === 'funding') {
+        // Only the latest rate per symbol matters
+        pending.funding[event.symbol] = event.data;
+    } else if (name === 'candle') {
+        pending.candles.push(event);
+    } else if (name === 'correlation') {
+        // Each update replaces the whole table
+        pending.correlation = event;
+    }
+    scheduleFrame();
+}
+
+function scheduleFrame() {
+    if (frameScheduled) return;
+    frameScheduled = true;
+    requestAnimationFrame(flushPending);
+}
+
+function flushPending() {
+    frameScheduled = false;
+    if (!liquidationList) {
+        // DOM not ready yet: keep the queue for the next frame
+        scheduleFrame();
+        return;
+    }
+    const started = performance.now();
+    
+    if (pending.liquidations.length) {
+        addLiquidations(pending.liquidations);
+        pending.liquidations = [];
+    }
+    if (pending.trades.length) {
+        addTrades(pending.trades);
+        pending.trades = [];
+    }
+    for (const symbol in pending.funding) {
+        updateFundingRate(symbol, pending.funding[symbol]);
+    }
+    pending.funding = {};
+    if (pending.candles.length) {
+        pending.candles.forEach(applyCandle);
+        pending.candles = [];
+        drawCandles();
+    }
+    if (pending.correlation) {
+        updateCorrelation(pending.correlation);
+        pending.correlation = null;
+    }
+    
+    trackFrameCost(performance.now() - started);
+}
+
+function trackFrameCost(cost) {
+    // Slow devices ask the server for conflated updates
+    frameCostEwma = frameCostEwma * 0.9 + cost * 0.1;
+    if (!maxRateHint && frameCostEwma > 12) {
+        maxRateHint = 4;
+        socket.emit('client_hints', { maxRate: maxRateHint });
+        console.log(`Frames are slow (${frameCostEwma.toFixed(1)}ms), requesting ${maxRateHint} updates/s`);
+    }
+}
+
+function applyCandle(event) {
+    if (event.symbol !== candleSymbol || event.interval !== candleInterval) return;
+    
+    // Replace the in-progress copy of this candle, or append a new one
+    const last = candles[candles.length - 1];
+    if (last && last.openTime === event.data.openTime) {
+        candles[candles.length - 1] = event.data;
+    } else {
+        candles.push(event.data);
+        if (candles.length > MAX_CANDLES) candles.shift();
+    }
+}
+
 // Setup controls
 document.addEventListener('DOMContentLoaded', () => {
     // Setup settings panel toggle
@@ -66,6 +212,10 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initialize button position
     settingsToggle.style.left = '300px';
     
+    // Virtualized event lists with reused row nodes
+    liquidationList = new VirtualList(document.getElementById('liquidations-list'), 86, renderLiquidationRow);
+    tradeList = new VirtualList(document.getElementById('trades-list'), 86, renderTradeRow);
+    
     // Initialize funding rates visibility
     const showFundingRates = document.getElementById('show-funding-rates').checked;
     const fundingSidebar = document.querySelector('.funding-sidebar');
@@ -78,81 +228,149 @@ document.addEventListener('DOMContentLoaded', () => {
         updateFundingCards();
     }
     
+    // Candle chart controls
+    document.getElementById('candle-symbol').addEventListener('change', (e) => {
+        candleSymbol = e.target.value;
+        loadCandles();
+    });
+    document.getElementById('candle-interval').addEventListener('change', (e) => {
+        candleInterval = e.target.value;
+        loadCandles();
+    });
+    window.addEventListener('resize', drawCandles);
+    updateCandleSymbols();
+    
     // Apply settings button
     document.getElementById('apply-settings').addEventListener('click', applySettings);
-    
-    // Send initial settings to server
-    sendSettingsUpdate();
 });
 
 // Functions
-function addLiquidation(data) {
-    // Filter by active symbols
-    if (!activeSymbols.includes(data.symbol)) return;
-    
-    // Filter by threshold
-    if (data.usdValue < thresholds.minLiquidation) return;
-    
-    const list = document.getElementById('liquidations-list');
-    const item = document.createElement('div');
-    
-    const isLong = data.side === 'SELL';
-    item.className = `event-item ${isLong ? 'liquidation-long' : 'liquidation-short'}`;
-    
-    const largeClass = data.usdValue >= 1000000 ? 'large-value' : '';
+class VirtualList {
+    // Renders only the visible window of a long history using a small pool of row nodes
+    constructor(container, rowHeight, renderRow) {
+        this.container = container;
+        this.rowHeight = rowHeight;
+        this.renderRow = renderRow;
+        this.items = [];  // Newest first
+        this.pool = [];
+        this.spacer = document.createElement('div');
+        this.spacer.className = 'virtual-spacer';
+        container.appendChild(this.spacer);
+        container.addEventListener('scroll', () => this.render());
+        window.addEventListener('resize', () => this.render());
+    }
     
-    item.innerHTML = `
-        <div class="time">${new Date(data.timestamp).toLocaleTimeString()}</div>
-        <div>
-            <span class="symbol">${data.symbol}</span>
-            <span class="type">${isLong ? 'LONG LIQ' : 'SHORT LIQ'}</span>
-            <span class="price">@ $${data.price.toLocaleString()}</span>
-            <span class="value ${largeClass}">$${formatValue(data.usdValue)}</span>
-        </div>
-    `;
+    prepend(newItems) {
+        // newItems are oldest first; the list shows newest first
+        for (let i = 0; i < newItems.length; i++) {
+            this.items.unshift(newItems[i]);
+        }
+        if (this.items.length > MAX_HISTORY) {
+            this.items.length = MAX_HISTORY;
+        }
+        this.render();
+    }
     
-    list.insertBefore(item, list.firstChild);
+    clear() {
+        this.items = [];
+        this.render();
+    }
     
-    // Keep only last 50 items
-    while (list.children.length > 50) {
-        list.removeChild(list.lastChild);
+    render() {
+        this.spacer.style.height = `${this.items.length * this.rowHeight}px`;
+        
+        const first = Math.floor(this.container.scrollTop / this.rowHeight);
+        const visible = Math.ceil(this.container.clientHeight / this.rowHeight) + 2;
+        
+        while (this.pool.length < visible) {
+            const node = document.createElement('div');
+            node.innerHTML = `
+                <div class="time"></div>
+                <div>
+                    <span class="symbol"></span>
+                    <span class="type"></span>
+                    <span class="price"></span>
+                    <span class="value"></span>
+                </div>
+            `;
+            node.refs = {
+                time: node.querySelector('.time'),
+                symbol: node.querySelector('.symbol'),
+                type: node.querySelector('.type'),
+                price: node.querySelector('.price'),
+                value: node.querySelector('.value')
+            };
+            this.container.appendChild(node);
+            this.pool.push(node);
+        }
+        
+        this.pool.forEach((node, i) => {
+            const index = first + i;
+            const item = this.items[index];
+            if (!item) {
+                node.style.display = 'none';
+                node.item = null;
+                return;
+            }
+            node.style.display = '';
+            node.style.transform = `translateY(${index * this.rowHeight}px)`;
+            // Only touch text when the row now shows a different event
+            if (node.item !== item) {
+                node.item = item;
+                this.renderRow(node, item);
+            }
+        });
     }
 }
 
-function addTrade(data) {
-    // Filter by active symbols
-    if (!activeSymbols.includes(data.symbol)) return;
-    
-    // Filter by threshold
-    if (data.usdValue < thresholds.minTrade) return;
-    
-    const list = document.getElementById('trades-list');
-    const item = document.createElement('div');
-    
+function renderLiquidationRow(node, data) {
+    const isLong = data.side === 'SELL';
+    node.className = `event-item virtual-row ${isLong ? 'liquidation-long' : 'liquidation-short'}`;
+    node.refs.time.textContent = new Date(data.timestamp).toLocaleTimeString();
+    node.refs.symbol.textContent = data.symbol;
+    node.refs.type.textContent = isLong ? 'LONG LIQ' : 'SHORT LIQ';
+    node.refs.price.textContent = `@ $${data.price.toLocaleString()}`;
+    node.refs.value.textContent = `$${formatValue(data.usdValue)}`;
+    node.refs.value.className = `value ${data.usdValue >= 1000000 ? 'large-value' : ''}`;
+}
+
+function renderTradeRow(node, data) {
     const isBuy = data.direction === 'BUY';
-    item.className = `event-item ${isBuy ? 'trade-buy' : 'trade-sell'}`;
-    
-    const largeClass = data.usdValue >= 3000000 ? 'large-value' : '';
-    
-    item.innerHTML = `
-        <div class="time">${data.timestr}</div>
-        <div>
-            <span class="symbol">${data.symbol}</span>
-            <span class="type">${data.direction}</span>
-            <span class="value ${largeClass}">$${formatValue(data.usdValue)}</span>
-        </div>
-    `;
-    
-    list.insertBefore(item, list.firstChild);
-    
-    // Keep only last 50 items
-    while (list.children.length > 50) {
-        list.removeChild(list.lastChild);
+    node.className = `event-item virtual-row ${isBuy ? 'trade-buy' : 'trade-sell'}`;
+    node.refs.time.textContent = data.timestr;
+    node.refs.symbol.textContent = data.symbol;
+    node.refs.type.textContent = data.direction;
+    // Late trades re-send a bucket with its revised total
+    node.refs.price.textContent = data.correction ? 'revised' : '';
+    node.refs.value.textContent = `$${formatValue(data.usdValue)}`;
+    node.refs.value.className = `value ${data.usdValue >= 3000000 ? 'large-value' : ''}`;
+}
+
+function addLiquidations(events) {
+    // Filter by active symbols and threshold
+    const accepted = events.filter(data =>
+        activeSymbols.includes(data.symbol) && data.usdValue >= thresholds.minLiquidation
+    );
+    if (accepted.length) {
+        liquidationList.prepend(accepted);
+        updateTotalEvents(accepted.length);
+    }
+}
+
+function addTrades(events) {
+    // Filter by active symbols and threshold
+    const accepted = events.filter(data =>
+        activeSymbols.includes(data.symbol) && data.usdValue >= thresholds.minTrade
+    );
+    if (accepted.length) {
+        tradeList.prepend(accepted);
+        updateTotalEvents(accepted.length);
     }
 }
 
 function updateFundingRate(symbol, data) {
     const symbolShort = symbol.replace('USDT', '');
+    fundingRates[symbolShort] = data;
     
     // Check if this symbol is active
     if (!activeSymbols.includes(symbolShort)) return;
@@ -184,8 +402,30 @@ function updateFundingRate(symbol, data) {
     }
 }
 
-function updateTotalEvents() {
-    totalEvents++;
+function updateCorrelation(update) {
+    const body = document.querySelector('#correlation-table tbody');
+    if (!body) return;
+    const format = (value, digits) => value === null ? '–' : value.toFixed(digits);
+    // Largest residual first: symbols moving independently of the reference
+    const order = update.symbols
+        .map((symbol, i) => i)
+        .sort((a, b) => Math.abs(update.residualZ[b] || 0) - Math.abs(update.residualZ[a] || 0));
+    body.innerHTML = order.map(i => {
+        const residual = update.residualZ[i];
+        const outlier = residual !== null && Math.abs(residual) > 3;
+        return `<tr class="${outlier ? 'outlier' : ''}">
+            <td>${update.symbols[i]}</td>
+            <td>${format(update.refCorrelation[i], 2)}</td>
+            <td>${format(update.beta[i], 2)}</td>
+            <td>${format(update.returnZ[i], 1)}</td>
+            <td>${format(residual, 1)}</td>
+            <td>${format(update.volumeZ[i], 1)}</td>
+        </tr>`;
+    }).join('');
+}
+
+function updateTotalEvents(count = 1) {
+    totalEvents += count;
     // Total events counter removed from UI
 }
 
@@ -231,6 +471,9 @@ function applySettings() {
         updateFundingCards();
     }
     
+    // Keep the candle chart on an active symbol
+    updateCandleSymbols();
+    
     // Send to server
     sendSettingsUpdate();
     
@@ -245,20 +488,35 @@ function applySettings() {
 }
 
 function updateFundingCards() {
+    // Update cards in place: keep existing ones, add missing, drop inactive
     const container = document.getElementById('funding-rates');
-    container.innerHTML = '';
+    const wanted = new Set(activeSymbols.map(symbol => `${symbol.toLowerCase()}-funding`));
     
-    activeSymbols.forEach(symbol => {
-        const card = document.createElement('div');
-        card.className = 'funding-card';
-        card.id = `${symbol.toLowerCase()}-funding`;
-        card.innerHTML = `
-            <h3>${symbol}/USDT</h3>
-            <div class="rate">--</div>
-            <div class="annual">Annual: --</div>
-            <div class="direction">--</div>
-        `;
-        container.appendChild(card);
+    Array.from(container.children).forEach(card => {
+        if (!wanted.has(card.id)) {
+            container.removeChild(card);
+        }
+    });
+    
+    activeSymbols.forEach((symbol, index) => {
+        let card = document.getElementById(`${symbol.toLowerCase()}-funding`);
+        if (!card) {
+            card = document.createElement('div');
+            card.className = 'funding-card';
+            card.id = `${symbol.toLowerCase()}-funding`;
+            card.innerHTML = `
+                <h3>${symbol}/USDT</h3>
+                <div class="rate">--</div>
+                <div class="annual">Annual: --</div>
+                <div class="direction">--</div>
+            `;
+        }
+        if (container.children[index] !== card) {
+            container.insertBefore(card, container.children[index] || null);
+        }
+        if (fundingRates[symbol]) {
+            updateFundingRate(symbol, fundingRates[symbol]);
+        }
     });
 }
 
@@ -268,4 +526,69 @@ function sendSettingsUpdate() {
         minLiquidation: thresholds.minLiquidation,
         minTrade: thresholds.minTrade
     });
-}
\ No newline at end of file
+}
+
+function updateCandleSymbols() {
+    const select = document.getElementById('candle-symbol');
+    select.innerHTML = '';
+    activeSymbols.forEach(symbol => {
+        const option = document.createElement('option');
+        option.value = symbol;
+        option.textContent = symbol;
+        select.appendChild(option);
+    });
+    
+    if (!activeSymbols.includes(candleSymbol) && activeSymbols.length) {
+        candleSymbol = activeSymbols[0];
+    }
+    select.value = candleSymbol;
+    loadCandles();
+}
+
+function loadCandles() {
+    // Candles come from the server's own aggTrade feed, not a second Binance connection
+    fetch(`/api/candles?symbol=${candleSymbol}&interval=${candleInterval}&limit=${MAX_CANDLES}`)
+        .then(response => response.ok ? response.json() : { candles: [] })
+        .then(result => {
+            candles = result.candles || [];
+            drawCandles();
+        })
+        .catch(error => console.error('Failed to load candles:', error));
+}
+
+function drawCandles() {
+    const canvas = document.getElementById('candle-chart');
+    if (!canvas) return;
+    
+    const width = canvas.clientWidth;
+    const height = canvas.clientHeight;
+    canvas.width = width;
+    canvas.height = height;
+    
+    const ctx = canvas.getContext('2d');
+    ctx.clearRect(0, 0, width, height);
+    if (!candles.length) return;
+    
+    const high = Math.max(...candles.map(c => c.high));
+    const low = Math.min(...candles.map(c => c.low));
+    const range = high - low || 1;
+    const padding = 10;
+    const y = price => padding + (high - price) / range * (height - 2 * padding);
+    const step = width / MAX_CANDLES;
+    const bodyWidth = Math.max(1, step * 0.6);
+    const offset = MAX_CANDLES - candles.length;
+    
+    candles.forEach((candle, i) => {
+        const x = (offset + i) * step + step / 2;
+        ctx.strokeStyle = ctx.fillStyle = candle.close >= candle.open ? '#3fb950' : '#f85149';
+        
+        ctx.beginPath();
+        ctx.moveTo(x, y(candle.high));
+        ctx.lineTo(x, y(candle.low));
+        ctx.stroke();
+        
+        const top = y(Math.max(candle.open, candle.close));
+        const bottom = y(Math.min(candle.open, candle.close));
+        ctx.fillRect(x - bodyWidth / 2, top, bodyWidth, Math.max(1, bottom - top));
+    });
+}
@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from bounded_state import SymbolTable, symbols
+
+logger = logging.getLogger(__name__)
+
+FUTURES_EXCHANGE_INFO_URL = 'https://fapi.binance.com/fapi/v1/exchangeInfo'
+
+
+class SymbolInfo:
+    """Contract metadata of one symbol plus its precomputed display and stream names"""
+
+    __slots__ = ('symbol_id', 'symbol', 'display', 'base_asset', 'quote_asset', 'contract_type',
+                 'status', 'tick_size', 'step_size', 'trade_stream', 'mark_price_stream')
+
+    def __init__(self, symbol_id: int, symbol: str, display: str, base_asset: str, quote_asset: str,
+                 contract_type: Optional[str] = None, status: Optional[str] = None,
+                 tick_size: Optional[float] = None, step_size: Optional[float] = None):
+        self.symbol_id = symbol_id
+        self.symbol = symbol
+        self.display = display
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.contract_type = contract_type
+        self.status = status
+        self.tick_size = tick_size
+        self.step_size = step_size
+        stream_prefix = symbol.lower()
+        self.trade_stream = f"{stream_prefix}@aggTrade"
+        self.mark_price_stream = f"{stream_prefix}@markPrice"
+
+    @property
+    def is_perpetual(self) -> bool:
+        return self.contract_type == 'PERPETUAL'
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.symbol_id,
+            'symbol': self.symbol,
+            'display': self.display,
+            'baseAsset': self.base_asset,
+            'quoteAsset': self.quote_asset,
+            'contractType': self.contract_type,
+            'status': self.status,
+            'tickSize': self.tick_size,
+            'stepSize': self.step_size
+        }
+
+
+class HttpExchangeInfoSource:
+    """exchangeInfo from the Binance REST API"""
+
+    def __init__(self, url: str = FUTURES_EXCHANGE_INFO_URL, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def fetch(self) -> Dict:
+        import aiohttp
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(self.url) as response:
+                response.raise_for_status()
+                return await response.json()
+
+    def __repr__(self):
+        return self.url
+
+
+class FileExchangeInfoSource:
+    """exchangeInfo from a local JSON file (fixtures, offline runs)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch(self) -> Dict:
+        with open(self.path) as f:
+            return json.load(f)
+
+    def __repr__(self):
+        return self.path
+
+
+class SymbolRegistry:
+    """Exchange symbols with interned ids, display names, stream names and contract metadata.
+
+    Metadata comes from a pluggable source and is cached on disk, so a
+    restart within ``ttl`` seconds needs no network round trip; a stale
+    cache is still used when the source fails. Ids come from the shared
+    ``SymbolTable``, so they match the ids in trade buckets and packed events.
+    Symbols missing from the metadata still resolve, without contract details.
+    """
+
+    def __init__(self, source=None, cache_path: Optional[str] = None, ttl: float = 86400,
+                 table: SymbolTable = symbols):
+        self.source = source
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.table = table
+        self.by_id: List[Optional[SymbolInfo]] = []  # Indexed by symbol id
+        self.by_display: Dict[str, SymbolInfo] = {}  # Preferred contract per display name
+        self.loaded_from: Optional[str] = None
+        self.loaded_at = 0.0
+
+    async def load(self) -> bool:
+        """Load metadata from a fresh cache, else the source (refreshing the cache), else a stale cache"""
+        exchange_info = self._read_cache(max_age=self.ttl)
+        if exchange_info is not None:
+            self.loaded_from = 'cache'
+        elif self.source is not None:
+            try:
+                exchange_info = await self.source.fetch()
+                self.loaded_from = repr(self.source)
+                self._write_cache(exchange_info)
+            except Exception as e:
+                logger.warning(f"Failed to fetch exchange info from {self.source!r}: {e}")
+                exchange_info = self._read_cache(max_age=None)
+                if exchange_info is not None:
+                    self.loaded_from = 'stale cache'
+
+        if exchange_info is None:
+            logger.warning("No exchange info available, symbols resolve without contract metadata")
+            return False
+        count = self._index(exchange_info)
+        self.loaded_at = time.time()
+        logger.info(f"Loaded {count} symbols from {self.loaded_from}")
+        return True
+
+    def _read_cache(self, max_age: Optional[float]) -> Optional[Dict]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(self.cache_path) > max_age:
+                return None
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable exchange info cache {self.cache_path}: {e}")
+            return None
+
+    def _write_cache(self, exchange_info: Dict):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(exchange_info, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write exchange info cache {self.cache_path}: {e}")
+
+    def _index(self, exchange_info: Dict) -> int:
+        count = 0
+        for entry in exchange_info.get('symbols', []):
+            symbol = entry.get('symbol')
+            if not symbol:
+                continue
+            filters = {f.get('filterType'): f for f in entry.get('filters', [])}
+            try:
+                info = self._register(
+                    symbol,
+                    base_asset=entry.get('baseAsset', ''),
+                    quote_asset=entry.get('quoteAsset', self.table.quote),
+                    contract_type=entry.get('contractType'),
+                    status=entry.get('status'),
+                    tick_size=float(filters['PRICE_FILTER']['tickSize']) if 'PRICE_FILTER' in filters else None,
+                    step_size=float(filters['LOT_SIZE']['stepSize']) if 'LOT_SIZE' in filters else None
+                )
+            except OverflowError as e:
+                logger.error(str(e))
+                break
+            # Perpetuals win the display name over delivery contracts (BTCUSDT vs BTCUSDT_250926)
+            current = self.by_display.get(info.display)
+            if current is None or info.is_perpetual or not current.is_perpetual:
+                self.by_display[info.display] = info
+            count += 1
+        return count
+
+    def _register(self, symbol: str, **metadata) -> SymbolInfo:
+        symbol_id = self.table.intern(symbol)
+        if len(self.by_id) <= symbol_id:
+            self.by_id.extend([None] * (symbol_id + 1 - len(self.by_id)))
+        info = SymbolInfo(symbol_id, self.table.name(symbol_id), self.table.display(symbol_id), **metadata)
+        self.by_id[symbol_id] = info
+        return info
+
+    def get(self, symbol: str) -> SymbolInfo:
+        """Info of an exchange symbol (BTCUSDT), registered without metadata if unknown.
+
+        Only exchangeInfo entries claim display names, so resolving an unlisted
+        symbol does not make ``is_known`` true for it.
+        """
+        symbol_id = self.table.intern(symbol)
+        info = self.by_id[symbol_id] if symbol_id < len(self.by_id) else None
+        if info is None:
+            info = self._register(symbol, base_asset=self.table.display(symbol_id), quote_asset=self.table.quote)
+        return info
+
+    def resolve(self, display: str) -> Optional[SymbolInfo]:
+        """Info of a display name as used by clients and settings (BTC), None if not listed.
+
+        A pure lookup: display names come from clients, so resolving one never
+        interns it into the shared, capped symbol table. Without metadata the
+        stream names are still derived, on an info that is not registered.
+        """
+        info = self.by_display.get(display)
+        if info is not None:
+            return info
+        symbol = f"{display}{self.table.quote}"
+        symbol_id = self.table.ids.get(symbol)
+        if symbol_id is not None and symbol_id < len(self.by_id) and self.by_id[symbol_id] is not None:
+            return self.by_id[symbol_id]
+        if self.loaded_at:
+            return None
+        return SymbolInfo(-1 if symbol_id is None else symbol_id, symbol, display, display, self.table.quote)
+
+    def is_known(self, display: str) -> bool:
+        """Whether a display name is a trading contract (always true before metadata is loaded)"""
+        if not self.loaded_at:
+            return True
+        info = self.by_display.get(display)
+        return info is not None and info.status in (None, 'TRADING')
+
+    def get_snapshot(self) -> Dict:
+        return {
+            'loaded_from': self.loaded_from,
+            'loaded_at': self.loaded_at,
+            'symbols': [info.to_dict() for info in self.by_id if info is not None]
+        }
+
+
+def build_registry_from_env() -> SymbolRegistry:
+    """Registry configured by EXCHANGE_INFO_SOURCE (URL or file path), EXCHANGE_INFO_CACHE and EXCHANGE_INFO_TTL"""
+    location = os.environ.get('EXCHANGE_INFO_SOURCE', FUTURES_EXCHANGE_INFO_URL)
+    if location.startswith(('http://', 'https://')):
+        source = HttpExchangeInfoSource(location)
+    else:
+        source = FileExchangeInfoSource(location)
+    return SymbolRegistry(
+        source=source,
+        cache_path=os.environ.get('EXCHANGE_INFO_CACHE', os.path.join('.cache', 'exchange_info.json')),
+        ttl=float(os.environ.get('EXCHANGE_INFO_TTL', 86400))
+    )
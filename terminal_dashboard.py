@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from colorama import Fore, Style
+
+from funding_handler import intensity_band
+
+logger = logging.getLogger(__name__)
+
+BAND_LABELS = ('NEGATIVE', 'NEUTRAL', 'MODERATE', 'HIGH', 'EXTREME')
+BAND_COLORS = (Fore.GREEN, Fore.WHITE, Fore.CYAN, Fore.YELLOW, Fore.RED)
+
+# A screen line is a list of (text, ANSI style) segments
+Line = List[Tuple[str, str]]
+
+
+class TradeFlow:
+    """Per-second buy/sell USD and trade counts of one symbol over a rolling window"""
+
+    __slots__ = ('window', 'stamps', 'buy', 'sell', 'count', 'last_price')
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.stamps = [-1] * window
+        self.buy = [0.0] * window
+        self.sell = [0.0] * window
+        self.count = [0] * window
+        self.last_price = 0.0
+
+    def add(self, second: int, usd_value: float, is_sell: bool, price: float):
+        slot = second % self.window
+        if self.stamps[slot] != second:
+            self.stamps[slot] = second
+            self.buy[slot] = self.sell[slot] = 0.0
+            self.count[slot] = 0
+        if is_sell:
+            self.sell[slot] += usd_value
+        else:
+            self.buy[slot] += usd_value
+        self.count[slot] += 1
+        self.last_price = price
+
+    def totals(self, now_second: int) -> Tuple[float, float, int]:
+        """Buy USD, sell USD and trade count over the window ending at now_second"""
+        oldest = now_second - self.window
+        buy = sell = 0.0
+        count = 0
+        for slot, stamp in enumerate(self.stamps):
+            if stamp > oldest:
+                buy += self.buy[slot]
+                sell += self.sell[slot]
+                count += self.count[slot]
+        return buy, sell, count
+
+
+class DashboardLogHandler(logging.Handler):
+    """Keeps the latest log records for the footer instead of writing over the screen"""
+
+    def __init__(self, capacity: int = 3):
+        super().__init__(logging.WARNING)
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.records.append(f"{datetime.fromtimestamp(record.created):%H:%M:%S} "
+                                f"{record.levelname} {record.getMessage()}")
+        except Exception:
+            self.handleError(record)
+
+
+class TerminalDashboard:
+    """Full-screen terminal view redrawn at a fixed rate from in-memory state.
+
+    Handlers feed the state through their listener hooks, which cost a few
+    list operations per event. The screen is rebuilt every 1/refresh_hz
+    seconds and only the lines that changed since the last frame are written,
+    so terminal output is bounded by the refresh rate and the screen size,
+    not by the event rate.
+    """
+
+    def __init__(self, ws_manager=None, min_liquidation_usd: float = 0.0, refresh_hz: float = 4.0,
+                 top_n: int = 10, liquidation_window: float = 900, flow_window: int = 60, out=None):
+        self.ws_manager = ws_manager
+        self.min_liquidation_usd = min_liquidation_usd
+        self.refresh_interval = 1.0 / refresh_hz
+        self.top_n = top_n
+        self.liquidation_window = liquidation_window
+        self.flow_window = flow_window
+        self.out = out or sys.stdout
+
+        self.liquidations = deque(maxlen=1000)  # (timestamp ms, symbol, side, price, usd value)
+        self.flows: Dict[str, TradeFlow] = {}
+        self.funding: Dict[str, Tuple[float, float, int]] = {}  # symbol -> (rate, mark price, timestamp)
+        self.last_trade_second = 0
+        self.log_handler = DashboardLogHandler()
+
+        self.started = time.time()
+        self.frame: List[str] = []  # Rendered lines of the frame on screen
+        self.size: Optional[Tuple[int, int]] = None
+        self.frames = 0
+        self.bytes_written = 0
+        self._message_count = 0
+        self._message_time = 0.0
+        self.message_rate = 0.0
+
+    # Listener hooks
+
+    def on_liquidation(self, symbol: str, side: str, price: float, quantity: float, timestamp: int):
+        usd_value = price * quantity
+        if usd_value >= self.min_liquidation_usd:
+            self.liquidations.append((timestamp, symbol, side, price, usd_value))
+
+    def on_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        flow = self.flows.get(symbol)
+        if flow is None:
+            flow = self.flows[symbol] = TradeFlow(self.flow_window)
+        second = timestamp // 1000
+        flow.add(second, price * quantity, is_buyer_maker, price)
+        if second > self.last_trade_second:
+            self.last_trade_second = second
+
+    def on_funding(self, symbol: str, funding_rate: float, mark_price: float, index_price: float, timestamp: int):
+        self.funding[symbol] = (funding_rate, mark_price, timestamp)
+
+    # Rendering
+
+    def _header(self, width: int) -> Line:
+        uptime = int(time.time() - self.started)
+        text = (f" BINANCE FUTURES MONITOR  {datetime.now():%H:%M:%S}  "
+                f"up {uptime // 3600:02d}:{uptime % 3600 // 60:02d}:{uptime % 60:02d}")
+        line = [(text, Style.BRIGHT)]
+        if self.ws_manager is not None:
+            health = self.ws_manager.get_stream_health()
+            healthy = sum(1 for stream in health.values() if stream['state'] == 'ok')
+            color = Fore.GREEN if healthy == len(health) else Fore.YELLOW
+            line.append((f"  streams {healthy}/{len(health)} ok", color))
+            line.append((f"  {self.message_rate:,.0f} msg/s", ''))
+        return line
+
+    def _update_message_rate(self):
+        if self.ws_manager is None:
+            return
+        count = sum(stats.messages for stats in list(self.ws_manager.stream_stats.values()))
+        now = time.monotonic()
+        if self._message_time:
+            elapsed = now - self._message_time
+            if elapsed > 0:
+                rate = max(count - self._message_count, 0) / elapsed
+                self.message_rate += 0.3 * (rate - self.message_rate)
+        self._message_count = count
+        self._message_time = now
+
+    def _liquidation_lines(self) -> List[Line]:
+        minutes = int(self.liquidation_window // 60)
+        lines: List[Line] = [[(f" TOP LIQUIDATIONS ({minutes}m)", Style.BRIGHT + Fore.MAGENTA)],
+                             [(f"  {'TIME':<9} {'SYMBOL':<12} {'SIDE':<10} {'PRICE':>14} {'VALUE':>12}", Style.DIM)]]
+        oldest = (time.time() - self.liquidation_window) * 1000
+        recent = [entry for entry in list(self.liquidations) if entry[0] >= oldest]
+        recent.sort(key=lambda entry: entry[4], reverse=True)
+        for timestamp, symbol, side, price, usd_value in recent[:self.top_n]:
+            is_long = side == 'SELL'
+            lines.append([
+                (f"  {datetime.fromtimestamp(timestamp / 1000):%H:%M:%S}  {symbol:<12} ", ''),
+                (f"{'LONG LIQ' if is_long else 'SHORT LIQ':<10}", Fore.BLUE if is_long else Fore.MAGENTA),
+                (f" {price:>14,.4f} ", ''),
+                (f"{format_usd(usd_value):>12}", Fore.YELLOW + (Style.BRIGHT if usd_value >= 1_000_000 else ''))
+            ])
+        for _ in range(self.top_n - min(len(recent), self.top_n)):
+            lines.append([])
+        return lines
+
+    def _flow_lines(self) -> List[Line]:
+        lines: List[Line] = [[(f" TRADE FLOW ({self.flow_window}s)", Style.BRIGHT + Fore.BLUE)],
+                             [(f"  {'SYMBOL':<12} {'LAST':>14} {'BUY':>12} {'SELL':>12} {'NET':>12} {'TRADES/S':>9}",
+                               Style.DIM)]]
+        now = self.last_trade_second
+        for symbol in sorted(self.flows):
+            flow = self.flows[symbol]
+            buy, sell, count = flow.totals(now)
+            net = buy - sell
+            lines.append([
+                (f"  {symbol:<12} {flow.last_price:>14,.4f} ", ''),
+                (f"{format_usd(buy):>12} ", Fore.GREEN),
+                (f"{format_usd(sell):>12} ", Fore.RED),
+                (f"{('+' if net >= 0 else '-') + format_usd(abs(net)):>12}", Fore.GREEN if net >= 0 else Fore.RED),
+                (f" {count / self.flow_window:>9.1f}", '')
+            ])
+        return lines
+
+    def _funding_lines(self) -> List[Line]:
+        lines: List[Line] = [[(" FUNDING", Style.BRIGHT + Fore.CYAN)],
+                             [(f"  {'SYMBOL':<12} {'RATE':>10} {'ANNUAL':>9} {'MARK':>14}  {'BAND':<10}", Style.DIM)]]
+        for symbol in sorted(self.funding):
+            rate, mark_price, _ = self.funding[symbol]
+            annual = rate * 100 * 3 * 365
+            band = intensity_band(annual)
+            lines.append([
+                (f"  {symbol:<12} {rate * 100:>+9.4f}% {annual:>+8.1f}% {mark_price:>14,.4f}  ", ''),
+                (f"{BAND_LABELS[band]:<10}", BAND_COLORS[band])
+            ])
+        return lines
+
+    def build(self, width: int, height: int) -> List[str]:
+        """Render the screen as exactly `height` lines, each at most `width` visible columns"""
+        self._update_message_rate()
+        lines: List[Line] = [self._header(width), []]
+        lines += self._liquidation_lines() + [[]]
+        lines += self._flow_lines() + [[]]
+        lines += self._funding_lines()
+
+        footer: List[Line] = [[(f" {message}", Fore.YELLOW)] for message in self.log_handler.records]
+        body_height = max(height - len(footer), 0)
+        lines = lines[:body_height] + [[] for _ in range(body_height - len(lines))] + footer
+        return [render_line(line, width) for line in lines[:height]]
+
+    def draw(self) -> int:
+        """Write the lines that differ from the frame on screen; returns bytes written"""
+        width, height = shutil.get_terminal_size((100, 40))
+        frame = self.build(width, height)
+        parts = []
+        if (width, height) != self.size:
+            # Resized (or first frame): the old frame no longer maps to the screen
+            parts.append('\x1b[2J')
+            self.frame = []
+            self.size = (width, height)
+        for row, line in enumerate(frame):
+            if row >= len(self.frame) or self.frame[row] != line:
+                parts.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+        self.frame = frame
+        self.frames += 1
+        if not parts:
+            return 0
+        output = ''.join(parts)
+        self.out.write(output)
+        self.out.flush()
+        self.bytes_written += len(output)
+        return len(output)
+
+    async def run(self):
+        """Take over the terminal (alternate screen) and redraw until cancelled"""
+        root = logging.getLogger()
+        previous_handlers = root.handlers[:]
+        root.handlers = [self.log_handler]
+        self.out.write('\x1b[?1049h\x1b[?25l')  # Alternate screen, hide cursor
+        self.out.flush()
+        try:
+            loop = asyncio.get_running_loop()
+            next_frame = loop.time()
+            while True:
+                try:
+                    self.draw()
+                except Exception as e:
+                    logger.error(f"Dashboard render failed: {e}")
+                # Fixed cadence: a slow frame does not push the next ones back,
+                # and frames missed after a stall are skipped instead of drawn back to back
+                next_frame += self.refresh_interval
+                if next_frame < loop.time():
+                    next_frame = loop.time()
+                await asyncio.sleep(max(next_frame - loop.time(), 0))
+        finally:
+            self.out.write('\x1b[?25h\x1b[?1049l')  # Show cursor, back to the normal screen
+            self.out.flush()
+            root.handlers = previous_handlers
+
+
+def format_usd(value: float) -> str:
+    if value >= 1_000_000:
+        return f"${value / 1_000_000:.2f}M"
+    if value >= 1_000:
+        return f"${value / 1_000:.0f}K"
+    return f"${value:.0f}"
+
+
+def render_line(line: Line, width: int) -> str:
+    """Join styled segments, cutting the visible text at width columns"""
+    parts = []
+    remaining = width
+    for text, style in line:
+        if remaining <= 0:
+            break
+        text = text[:remaining]
+        remaining -= len(text)
+        parts.append(f"{style}{text}{Style.RESET_ALL}" if style else text)
+    return ''.join(parts)
@@ -0,0 +1,59 @@
+"""Client-supplied symbols must not exhaust the shared symbol table"""
+
+import asyncio
+
+import main_visual_production
+from bounded_state import symbols
+from liquidation_handler import LiquidationHandler
+from symbol_registry import FileExchangeInfoSource, SymbolRegistry
+from trades_handler import TradesHandler
+from web_server import _client_symbols
+
+FIXTURE = 'fixtures/exchange_info_sample.json'
+
+
+def load_registry() -> SymbolRegistry:
+    registry = SymbolRegistry(FileExchangeInfoSource(FIXTURE))
+    asyncio.run(registry.load())
+    return registry
+
+
+def test_resolve_does_not_intern_unknown_names():
+    registry = load_registry()
+    before = len(symbols)
+    for i in range(symbols.capacity + 10):
+        assert registry.resolve(f"BOGUS{i}") is None
+    assert len(symbols) == before
+    assert not registry.is_known('BOGUS1')
+    assert registry.resolve('BTC').symbol == 'BTCUSDT'
+
+
+def test_client_symbols_drop_unknown_names(monkeypatch):
+    class Stream:
+        registry = load_registry()
+
+    monkeypatch.setattr(main_visual_production, 'stream_instance', Stream())
+    flood = [f"FLOOD{i}" for i in range(symbols.capacity + 10)]
+    assert _client_symbols(flood + ['btc', 'ETHUSDT', 'btc']) == ['BTC', 'ETH']
+    assert len(_client_symbols(['BTC'] * 100 + ['ETH', 'SOL', 'x y'])) <= 3
+
+
+def test_ingest_keeps_working_after_flood():
+    registry = load_registry()
+    for i in range(symbols.capacity + 10):
+        registry.resolve(f"FLOODED{i}")
+
+    trades = TradesHandler(1000)
+    trades.console = False
+    asyncio.run(trades.handle_trade({'s': 'NEWLISTUSDT', 'p': '2', 'q': '10', 'T': 1_700_000_000_000, 'm': False}))
+    assert len(trades.trade_buckets) == 1
+
+    liquidations = LiquidationHandler(1000)
+    liquidations.console = False
+    seen = []
+    liquidations.add_liquidation_listener(lambda *args: seen.append(args))
+    asyncio.run(liquidations.handle_liquidation({
+        'e': 'forceOrder', 'E': 1_700_000_000_000,
+        'o': {'s': 'NEWLISTUSDT', 'S': 'SELL', 'p': '2', 'z': '1000'}
+    }))
+    assert [args[0] for args in seen] == ['NEWLISTUSDT']
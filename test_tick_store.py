@@ -0,0 +1,102 @@
+"""Behaviour of the columnar tick store: time queries, ring wrap, eviction, clamping"""
+
+import asyncio
+
+import pytest
+
+from liquidation_handler import LiquidationHandler
+from tick_store import SIDE_BUY, SIDE_SELL, TickBuffer, TickStore
+from trades_handler import TradesHandler
+
+
+def test_query_time_range_is_inclusive():
+    store = TickStore()
+    for ts in range(1000, 11000, 1000):
+        store.add_trade('BTCUSDT', 100.0, 1.0, ts, False)
+    columns = store.query('BTCUSDT', 3000, 6000)
+    assert columns['ts'].tolist() == [3000, 4000, 5000, 6000]
+    assert store.query('BTCUSDT', 20000, 30000)['ts'].size == 0
+    assert store.query('ETHUSDT')['ts'].size == 0
+
+
+def test_query_filters_notional_and_side():
+    store = TickStore()
+    store.add_trade('BTCUSDT', 100.0, 1.0, 1000, False)  # $100 taker buy
+    store.add_trade('BTCUSDT', 100.0, 5.0, 2000, True)  # $500 taker sell
+    store.add_trade('BTCUSDT', 100.0, 9.0, 3000, False)  # $900 taker buy
+    assert store.query('BTCUSDT', min_notional=400)['ts'].tolist() == [2000, 3000]
+    assert store.query('BTCUSDT', side=SIDE_BUY)['ts'].tolist() == [1000, 3000]
+    assert store.query('BTCUSDT', min_notional=400, side=SIDE_SELL)['notional'].tolist() == [500.0]
+    with pytest.raises(ValueError):
+        store.query('BTCUSDT', kind='bogus')
+
+
+def test_ring_wrap_keeps_newest_rows_in_order():
+    buffer = TickBuffer(4)
+    for ts in range(1, 7):
+        buffer.append(ts * 1000, float(ts), 1.0, SIDE_BUY)
+    assert buffer.window()['ts'].tolist() == [3000, 4000, 5000, 6000]
+    # A range spanning both physical segments of the ring
+    assert buffer.window(4000, 5000)['price'].tolist() == [4.0, 5.0]
+
+
+def test_out_of_order_ticks_are_clamped():
+    buffer = TickBuffer(8)
+    buffer.append(5000, 1.0, 1.0, SIDE_BUY)
+    buffer.append(4000, 2.0, 1.0, SIDE_SELL)  # Late tick keeps the index sorted
+    buffer.append(6000, 3.0, 1.0, SIDE_BUY)
+    assert buffer.window()['ts'].tolist() == [5000, 5000, 6000]
+    assert buffer.window(5000, 5000)['price'].tolist() == [1.0, 2.0]
+
+
+def test_retention_hides_expired_rows():
+    store = TickStore(retention_hours=1)
+    store.add_trade('BTCUSDT', 1.0, 1.0, 0, False)
+    store.add_trade('BTCUSDT', 1.0, 1.0, 3_600_000 + 1, False)
+    assert store.query('BTCUSDT')['ts'].tolist() == [3_600_001]
+
+
+def test_least_recently_updated_symbol_is_evicted():
+    store = TickStore(trade_capacity=8, max_trade_symbols=2)
+    store.add_trade('BTCUSDT', 1.0, 1.0, 1000, False)
+    store.add_trade('ETHUSDT', 1.0, 1.0, 3000, False)
+    store.add_trade('SOLUSDT', 1.0, 1.0, 4000, False)
+    assert set(store.buffers['trades']) == {'ETHUSDT', 'SOLUSDT'}
+    assert store.evictions == 1
+    # The reused buffer starts empty
+    assert store.query('SOLUSDT')['ts'].tolist() == [4000]
+
+
+def test_notional_by_side():
+    store = TickStore()
+    store.add_trade('BTCUSDT', 100.0, 1.0, 1000, False)
+    store.add_trade('BTCUSDT', 100.0, 2.0, 60_000, True)
+    store.add_trade('BTCUSDT', 100.0, 3.0, 90_000, False)
+    assert store.notional_by_side('BTCUSDT', 30_000) == {'buy': 300.0, 'sell': 200.0, 'count': 2}
+    with pytest.raises(ValueError):
+        store.notional_by_side('BTCUSDT', 30_000, kind='bogus')
+
+
+def test_failing_listener_keeps_alerts_and_other_listeners():
+    def broken(*args):
+        raise RuntimeError('listener failure')
+
+    store = TickStore()
+    liquidations = LiquidationHandler(1000)
+    liquidations.console = False
+    alerts = []
+    liquidations._print_liquidation = lambda *args: alerts.append(args)
+    liquidations.add_liquidation_listener(broken)
+    liquidations.add_liquidation_listener(store.add_liquidation)
+    asyncio.run(liquidations.handle_liquidation({
+        'e': 'forceOrder', 'E': 5000, 'o': {'s': 'BTCUSDT', 'S': 'SELL', 'p': '100', 'z': '50'}
+    }))
+    assert len(alerts) == 1
+    assert store.query('BTCUSDT', kind='liquidations')['ts'].tolist() == [5000]
+
+    trades = TradesHandler(1000)
+    trades.console = False
+    trades.add_trade_listener(broken)
+    trades.add_trade_listener(store.add_trade)
+    asyncio.run(trades.handle_trade({'s': 'BTCUSDT', 'p': '100', 'q': '1', 'T': 7000, 'm': False}))
+    assert store.query('BTCUSDT')['ts'].tolist() == [7000]
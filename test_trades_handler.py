@@ -0,0 +1,53 @@
+"""Regression tests for event-time trade bucket closing"""
+
+import asyncio
+
+from trades_handler import TradesHandler
+
+
+class RecordingTradesHandler(TradesHandler):
+    def __init__(self, min_usd_value: float):
+        super().__init__(min_usd_value)
+        self.console = False
+        self.alerts = []
+
+    def _on_aggregated_trade(self, symbol_id, second, usd_total, is_buyer_maker, correction=False):
+        self.alerts.append((second, usd_total, correction))
+
+
+def trade(timestamp_ms: int, usd_value: float, symbol: str = 'BTCUSDT'):
+    return {'s': symbol, 'p': '1', 'q': str(usd_value), 'T': timestamp_ms, 'm': False}
+
+
+def test_watermark_jump_closes_buckets_beyond_correction_window():
+    handler = RecordingTradesHandler(1000)
+    start = 1_700_000_000_000
+    asyncio.run(handler.handle_trade(trade(start, 5000)))
+    asyncio.run(handler.handle_trade(trade(start + 10_600, 10)))
+
+    assert handler.alerts == [(start // 1000, 5000.0, False)]
+    assert len(handler.trade_buckets) == 1  # Only the second of the new trade is still open
+
+
+def test_long_stall_closes_buckets_by_scanning():
+    handler = RecordingTradesHandler(1000)
+    start = 1_700_000_000_000
+    asyncio.run(handler.handle_trade(trade(start, 5000)))
+    asyncio.run(handler.handle_trade(trade(start + 1_500, 2000)))
+    asyncio.run(handler.handle_trade(trade(start + 3_600_000, 10)))
+
+    assert [alert[:2] for alert in handler.alerts] == [(start // 1000, 5000.0), (start // 1000 + 1, 2000.0)]
+    assert len(handler.trade_buckets) == 1
+
+
+def test_late_trade_into_folded_second_updates_coarse_bucket():
+    handler = RecordingTradesHandler(1000)
+    handler.bucket_seconds = 5
+    start = 1_700_000_000_000 - 1_700_000_000_000 % 5000  # First second of a coarse bucket
+    asyncio.run(handler.handle_trade(trade(start, 600)))
+    asyncio.run(handler.handle_trade(trade(start + 1_500, 10)))  # Closes and folds the first second
+    asyncio.run(handler.handle_trade(trade(start + 200, 600)))  # Late into the folded second
+    assert handler.alerts == []
+
+    asyncio.run(handler.handle_trade(trade(start + 6_500, 10)))
+    assert handler.alerts == [(start // 1000, 1210.0, False)]
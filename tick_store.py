@@ -0,0 +1,198 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Side encoding: taker side for trades, order side for liquidations
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+COLUMNS = ('ts', 'price', 'qty', 'side')
+
+
+class TickBuffer:
+    """Fixed-capacity columnar ring buffer of ticks ordered by timestamp.
+
+    Timestamps are kept non-decreasing so each of the (at most two) physical
+    segments of the ring can be binary searched with ``np.searchsorted``.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.qty = np.zeros(capacity, dtype=np.float64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.write = 0  # Next physical slot to write
+        self.count = 0
+        self.last_ts = 0
+
+    def append(self, ts: int, price: float, qty: float, side: int):
+        """Append one tick, overwriting the oldest when full"""
+        # Out-of-order ticks are clamped so the time index stays sorted
+        if ts < self.last_ts:
+            ts = self.last_ts
+        self.last_ts = ts
+
+        i = self.write
+        self.ts[i] = ts
+        self.price[i] = price
+        self.qty[i] = qty
+        self.side[i] = side
+        self.write = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """Physical [lo, hi) ranges of the ring in chronological order"""
+        write, count = self.write, self.count
+        if count < self.capacity:
+            return [(0, count)]
+        return [(write, self.capacity), (0, write)]
+
+    def window(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Return the columns for ticks with start_ms <= ts <= end_ms"""
+        pieces = []
+        for lo, hi in self._segments():
+            ts = self.ts[lo:hi]
+            first = lo + (np.searchsorted(ts, start_ms, 'left') if start_ms is not None else 0)
+            last = lo + (np.searchsorted(ts, end_ms, 'right') if end_ms is not None else hi - lo)
+            if last > first:
+                pieces.append((first, last))
+
+        if len(pieces) == 1:
+            first, last = pieces[0]
+            return {name: getattr(self, name)[first:last] for name in COLUMNS}
+        return {
+            name: np.concatenate([getattr(self, name)[first:last] for first, last in pieces])
+            if pieces else getattr(self, name)[:0]
+            for name in COLUMNS
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+
+class TickStore:
+    """Per-symbol in-memory store of recent aggTrades and liquidations.
+
+    Buffers are allocated on the first tick of a symbol and never grow, and
+    the number of symbols per kind is capped (the least recently updated
+    symbol is evicted), so memory is bounded by ``capacity`` rows of 25 bytes
+    times ``max_symbols`` per kind.
+    """
+
+    KINDS = ('trades', 'liquidations')
+
+    def __init__(self, trade_capacity: int = 400_000, liquidation_capacity: int = 20_000,
+                 retention_hours: float = 4.0, max_trade_symbols: int = 16, max_liquidation_symbols: int = 128):
+        self.capacities = {
+            'trades': trade_capacity,
+            'liquidations': liquidation_capacity,
+        }
+        self.max_symbols = {
+            'trades': max_trade_symbols,
+            'liquidations': max_liquidation_symbols,
+        }
+        self.evictions = 0
+        self.retention_ms = int(retention_hours * 3_600_000)
+        self.buffers: Dict[str, Dict[str, TickBuffer]] = {kind: {} for kind in self.KINDS}
+
+    def _buffer(self, kind: str, symbol: str) -> TickBuffer:
+        buffers = self.buffers[kind]
+        buffer = buffers.get(symbol)
+        if buffer is None:
+            if len(buffers) >= self.max_symbols[kind]:
+                # Reuse the arrays of the symbol with the oldest last tick
+                victim = min(buffers, key=lambda name: buffers[name].last_ts)
+                logger.info(f"Tick store full for {kind}, evicting {victim} for {symbol}")
+                buffer = buffers.pop(victim)
+                buffer.write = buffer.count = buffer.last_ts = 0
+                self.evictions += 1
+            else:
+                buffer = TickBuffer(self.capacities[kind])
+            buffers[symbol] = buffer
+        return buffer
+
+    def add_trade(self, symbol: str, price: float, quantity: float, timestamp: int, is_buyer_maker: bool):
+        """Trade listener: store an aggTrade (side is the taker side)"""
+        self._buffer('trades', symbol).append(
+            timestamp, price, quantity, SIDE_SELL if is_buyer_maker else SIDE_BUY
+        )
+
+    def add_liquidation(self, symbol: str, side: str, price: float, quantity: float, timestamp: int):
+        """Liquidation listener: store a forceOrder (side is the order side)"""
+        self._buffer('liquidations', symbol).append(
+            timestamp, price, quantity, SIDE_BUY if side == 'BUY' else SIDE_SELL
+        )
+
+    def query(self, symbol: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+              min_notional: Optional[float] = None, side: Optional[int] = None,
+              kind: str = 'trades') -> Dict[str, np.ndarray]:
+        """Return ticks in [start_ms, end_ms] matching the notional and side filters.
+
+        Example: all BTC prints over $250k between t1 and t2::
+
+            store.query('BTCUSDT', t1, t2, min_notional=250_000)
+        """
+        if kind not in self.buffers:
+            raise ValueError(f"Unknown tick kind: {kind}")
+        buffer = self.buffers[kind].get(symbol)
+        if buffer is None or buffer.count == 0:
+            return {name: np.empty(0) for name in COLUMNS + ('notional',)}
+
+        # Older rows may still be in the ring but are outside retention
+        oldest = buffer.last_ts - self.retention_ms
+        start_ms = oldest if start_ms is None else max(start_ms, oldest)
+
+        columns = buffer.window(start_ms, end_ms)
+        notional = columns['price'] * columns['qty']
+        mask = None
+        if min_notional is not None:
+            mask = notional >= min_notional
+        if side is not None:
+            side_mask = columns['side'] == side
+            mask = side_mask if mask is None else mask & side_mask
+        if mask is not None:
+            columns = {name: values[mask] for name, values in columns.items()}
+            notional = notional[mask]
+        columns['notional'] = notional
+        return columns
+
+    def notional_by_side(self, symbol: str, window_ms: int, now_ms: Optional[int] = None,
+                         kind: str = 'trades') -> Dict[str, float]:
+        """Sum notional by side over the last window_ms (event time by default).
+
+        Example: notional by side over the last 90 s::
+
+            store.notional_by_side('BTCUSDT', 90_000)
+        """
+        if kind not in self.buffers:
+            raise ValueError(f"Unknown tick kind: {kind}")
+        buffer = self.buffers[kind].get(symbol)
+        if buffer is None or buffer.count == 0:
+            return {'buy': 0.0, 'sell': 0.0, 'count': 0}
+        if now_ms is None:
+            now_ms = buffer.last_ts
+
+        columns = self.query(symbol, now_ms - window_ms, now_ms, kind=kind)
+        notional = columns['notional']
+        is_buy = columns['side'] == SIDE_BUY
+        return {
+            'buy': float(notional[is_buy].sum()),
+            'sell': float(notional[~is_buy].sum()),
+            'count': int(notional.size)
+        }
+
+    def get_stats(self) -> Dict:
+        """Return row counts and memory usage per kind and symbol"""
+        return {
+            kind: {
+                symbol: {'rows': buffer.count, 'capacity': buffer.capacity, 'bytes': buffer.nbytes}
+                for symbol, buffer in list(buffers.items())
+            }
+            for kind, buffers in self.buffers.items()
+        }
@@ -1,9 +1,13 @@
 import logging
 import asyncio
+import time
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Callable, Dict, List
+import numpy as np
 from colorama import Fore, Style, init
 
+from bounded_state import symbols
+
 init(autoreset=True)
 logger = logging.getLogger(__name__)
 
@@ -11,9 +15,37 @@ logger = logging.getLogger(__name__)
 class TradesHandler:
     def __init__(self, min_usd_value: float = 500000):
         self.min_usd_value = min_usd_value
-        self.trade_buckets: Dict[Tuple[str, str, bool], float] = {}
+        # One int key per (second, symbol id, side) bucket: (second * capacity + id) * 2 + side
+        self.trade_buckets: Dict[int, float] = {}
+        self.max_buckets = 100_000  # Oldest buckets are evicted beyond this
+        self.evicted_buckets = 0
         self.last_check_time = datetime.utcnow()
-        
+        # Event-time windowing: a symbol's buckets close once its watermark
+        # (latest trade time T minus the allowed lateness, or the estimated
+        # exchange clock for quiet symbols) passes the end of their second
+        self.allowed_lateness_ms = 250
+        self.sweep_interval = 0.1  # Wall-clock watermark cadence for symbols without new trades
+        self.clock_offset_ms = None  # EWMA of local receive time minus trade time T, sampled per closed second
+        self.closed_through: Dict[int, int] = {}  # Symbol id -> last closed second
+        # Recently closed buckets still open to late trades: key -> [usd_total, alerted]
+        self.closed_buckets: Dict[int, List] = {}
+        self.correction_window = 5  # Seconds a closed bucket accepts late trades
+        self.max_scan_seconds = 60  # Longer watermark jumps scan the open buckets instead
+        self.late_trades = 0
+        self.dropped_late_trades = 0
+        # Alert granularity in seconds (widened by load shedding): closed one-second
+        # buckets are summed per symbol into coarse buckets, alerted when those close
+        self.bucket_seconds = 1
+        self.coarse_buckets: Dict[int, Dict[int, List]] = {}  # Symbol id -> {key: [usd_total, last second]}
+        self.console = True  # Print alerts to the terminal
+        self.trade_listeners: List[Callable] = []  # Called with every parsed trade
+        self.min_vector_batch = 32  # Smaller batches are handled trade by trade
+        self.sinks = None  # Optional SinkPipeline for exported alerts
+
+    def add_trade_listener(self, listener: Callable):
+        """Register a callable(symbol, price, quantity, timestamp, is_buyer_maker) fed by every trade"""
+        self.trade_listeners.append(listener)
+
     async def handle_trade(self, data: Dict):
         """Process aggregated trade data from Binance"""
         try:
@@ -26,60 +58,250 @@ class TradesHandler:
             # Calculate USD value
             usd_value = price * quantity
             
-            # Get time bucket (second precision)
-            dt = datetime.fromtimestamp(timestamp / 1000)
-            time_bucket = dt.strftime('%H:%M:%S')
-            
-            # Format symbol
-            symbol_display = symbol.replace('USDT', '')
-            
-            # Add to bucket
-            trade_key = (symbol_display, time_bucket, is_buyer_maker)
-            self.trade_buckets[trade_key] = self.trade_buckets.get(trade_key, 0) + usd_value
+            # Add to the (second, symbol, side) bucket, or correct a closed one
+            symbol_id = symbols.intern(symbol)
+            second = timestamp // 1000
+            trade_key = (second * symbols.capacity + symbol_id) * 2 + bool(is_buyer_maker)
+            closed = self.closed_through.setdefault(symbol_id, second - 1)
+            if second <= closed:
+                self._add_late(trade_key, usd_value, closed)
+            else:
+                self._add_to_bucket(trade_key, usd_value)
+            # Only a trade that moves the watermark past a second boundary costs more
+            watermark_ms = timestamp - self.allowed_lateness_ms
+            if watermark_ms // 1000 - 1 > closed:
+                self._observe_clock(timestamp)
+                self._advance(symbol_id, watermark_ms)
+
+            # Feed downstream consumers (candles, stores) from the same parsed trade
+            for listener in self.trade_listeners:
+                try:
+                    listener(symbol, price, quantity, timestamp, is_buyer_maker)
+                except Exception:
+                    logger.exception("Error in trade listener")
                 
         except Exception as e:
             logger.error(f"Error processing trade data: {e}")
             
+    async def handle_batch(self, records: List[Dict]):
+        """Process a batch of aggregated trades, summing buckets as vectors"""
+        # Vector setup costs more than it saves on tiny batches
+        if len(records) < self.min_vector_batch:
+            for data in records:
+                await self.handle_trade(data)
+            return
+            
+        try:
+            names = [data.get('s', 'Unknown') for data in records]
+            prices = np.array([data.get('p', 0) for data in records], dtype=np.float64)
+            quantities = np.array([data.get('q', 0) for data in records], dtype=np.float64)
+            timestamps = np.array([data.get('T', 0) for data in records], dtype=np.int64)
+            makers = np.array([data.get('m', False) for data in records], dtype=np.int64)
+        except (TypeError, ValueError) as e:
+            # Malformed record somewhere in the batch: fall back to per-trade handling
+            logger.warning(f"Falling back to per-trade processing for batch: {e}")
+            for data in records:
+                await self.handle_trade(data)
+            return
+            
+        usd_values = prices * quantities
+        seconds = timestamps // 1000
+        
+        # Usually a batch comes from one stream and holds a single symbol
+        if names.count(names[0]) == len(names):
+            symbol_id = symbols.intern(names[0])
+            symbol_ids = np.full(len(names), symbol_id, dtype=np.int64)
+            watermarks = {symbol_id: int(timestamps.max())}
+        else:
+            symbol_names, symbol_codes = np.unique(names, return_inverse=True)
+            unique_ids = [symbols.intern(name) for name in symbol_names.tolist()]
+            symbol_ids = np.array(unique_ids, dtype=np.int64)[symbol_codes]
+            latest = np.full(len(unique_ids), np.iinfo(np.int64).min)
+            np.maximum.at(latest, symbol_codes, timestamps)
+            watermarks = dict(zip(unique_ids, latest.tolist()))
+            
+        # Same integer bucket keys as handle_trade, summed in a single pass
+        keys = (seconds * symbols.capacity + symbol_ids) * 2 + makers
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=usd_values)
+        
+        # Keys sort by second first, so a new symbol starts at its earliest second
+        for key, usd_total in zip(unique_keys.tolist(), totals.tolist()):
+            second, symbol_id = divmod(key // 2, symbols.capacity)
+            closed = self.closed_through.setdefault(symbol_id, second - 1)
+            if second <= closed:
+                self._add_late(key, usd_total, closed)
+            else:
+                self._add_to_bucket(key, usd_total)
+                
+        self._observe_clock(int(timestamps[-1]))
+        for symbol_id, timestamp in watermarks.items():
+            self._advance(symbol_id, timestamp - self.allowed_lateness_ms)
+            
+        if self.trade_listeners:
+            rows = zip(names, prices.tolist(), quantities.tolist(), timestamps.tolist(), makers.tolist())
+            for symbol, price, quantity, timestamp, is_buyer_maker in rows:
+                for listener in self.trade_listeners:
+                    try:
+                        listener(symbol, price, quantity, timestamp, bool(is_buyer_maker))
+                    except Exception:
+                        logger.exception("Error in trade listener")
+                        
+    def _add_to_bucket(self, trade_key: int, usd_value: float):
+        total = self.trade_buckets.get(trade_key)
+        if total is None:
+            if len(self.trade_buckets) >= self.max_buckets:
+                # Keys are inserted roughly in time order, so the first is the oldest
+                del self.trade_buckets[next(iter(self.trade_buckets))]
+                self.evicted_buckets += 1
+            self.trade_buckets[trade_key] = usd_value
+        else:
+            self.trade_buckets[trade_key] = total + usd_value
+            
+    def _observe_clock(self, timestamp: int):
+        """Track the offset between the local clock and exchange trade times"""
+        offset = time.time() * 1000 - timestamp
+        if self.clock_offset_ms is None:
+            self.clock_offset_ms = offset
+        else:
+            self.clock_offset_ms += 0.05 * (offset - self.clock_offset_ms)
+            
+    def _advance(self, symbol_id: int, watermark_ms: float):
+        """Move a symbol's watermark, closing every bucket it has passed"""
+        through = int(watermark_ms // 1000) - 1
+        closed = self.closed_through[symbol_id]
+        if through <= closed:
+            return
+        self.closed_through[symbol_id] = through
+        width = self.bucket_seconds
+        coarse = self.coarse_buckets.get(symbol_id)
+        if through - closed <= self.max_scan_seconds:
+            seconds = range(closed + 1, through + 1)
+        else:
+            # Long jump (loop stall, reconnect gap, wide batch): find the symbol's
+            # open buckets instead of walking every second in between
+            capacity = symbols.capacity
+            seconds = sorted({trade_key // 2 // capacity for trade_key in self.trade_buckets
+                              if trade_key // 2 % capacity == symbol_id and trade_key // 2 // capacity <= through})
+        for second in seconds:
+            base = (second * symbols.capacity + symbol_id) * 2
+            for trade_key in (base, base + 1):
+                usd_total = self.trade_buckets.pop(trade_key, None)
+                if usd_total is None:
+                    continue
+                if width > 1:
+                    start = second - second % width
+                    coarse_key = (start * symbols.capacity + symbol_id) * 2 + (trade_key & 1)
+                    if coarse is None:
+                        coarse = self.coarse_buckets[symbol_id] = {}
+                    entry = coarse.get(coarse_key)
+                    if entry is None:
+                        coarse[coarse_key] = [usd_total, start + width - 1]
+                    else:
+                        entry[0] += usd_total
+                    # Folded seconds remember their coarse bucket for late trades
+                    self.closed_buckets[trade_key] = [usd_total, False, coarse_key]
+                    continue
+                alerted = usd_total >= self.min_usd_value
+                if alerted:
+                    self._on_aggregated_trade(symbol_id, second, usd_total, bool(trade_key & 1))
+                self.closed_buckets[trade_key] = [usd_total, alerted]
+                
+        # Coarse buckets close with their last second, also after the width went back to 1
+        if coarse:
+            for coarse_key, (usd_total, last_second) in list(coarse.items()):
+                if last_second <= through:
+                    del coarse[coarse_key]
+                    if usd_total >= self.min_usd_value:
+                        self._on_aggregated_trade(symbol_id, coarse_key // 2 // symbols.capacity, usd_total,
+                                                  bool(coarse_key & 1))
+                
+    def _add_late(self, trade_key: int, usd_value: float, closed: int):
+        """Apply a trade that arrived after its bucket closed, re-alerting the bucket as a correction"""
+        self.late_trades += 1
+        second, symbol_id = divmod(trade_key // 2, symbols.capacity)
+        entry = self.closed_buckets.get(trade_key)
+        if entry is None and self.bucket_seconds > 1:
+            start = second - second % self.bucket_seconds
+            entry = [0.0, False, (start * symbols.capacity + symbol_id) * 2 + (trade_key & 1)]
+        if entry is not None and len(entry) > 2:
+            # Folded into a coarse bucket: count it there while it is open, no one-second correction
+            coarse = self.coarse_buckets.get(symbol_id)
+            coarse_entry = coarse.get(entry[2]) if coarse else None
+            if coarse_entry is None:
+                self.dropped_late_trades += 1
+                return
+            coarse_entry[0] += usd_value
+            entry[0] += usd_value
+            self.closed_buckets[trade_key] = entry
+            return
+        if entry is None:
+            if closed - second >= self.correction_window:
+                self.dropped_late_trades += 1
+                logger.debug(f"Dropped trade for {symbols.name(symbol_id)} at {second}: "
+                             f"older than the {self.correction_window}s correction window")
+                return
+            entry = self.closed_buckets[trade_key] = [0.0, False]
+        entry[0] += usd_value
+        if entry[1] or entry[0] >= self.min_usd_value:
+            entry[1] = True
+            self._on_aggregated_trade(symbol_id, second, entry[0], bool(trade_key & 1), correction=True)
+            
+    def get_window_stats(self) -> Dict:
+        """Event-time windowing state: clock offset, open/closed buckets and late trades"""
+        return {
+            'clock_offset_ms': round(self.clock_offset_ms, 1) if self.clock_offset_ms is not None else None,
+            'allowed_lateness_ms': self.allowed_lateness_ms,
+            'open_buckets': len(self.trade_buckets),
+            'closed_buckets': len(self.closed_buckets),
+            'late_trades': self.late_trades,
+            'dropped_late_trades': self.dropped_late_trades,
+            'evicted_buckets': self.evicted_buckets,
+            'bucket_seconds': self.bucket_seconds
+        }
+        
     async def print_aggregated_trades(self):
-        """Check and print aggregated trades every second"""
+        """Close buckets of quiet symbols as the estimated exchange clock passes them"""
         while True:
-            await asyncio.sleep(1)
+            await asyncio.sleep(self.sweep_interval)
             await self._check_and_print_trades()
             
     async def _check_and_print_trades(self):
-        """Check buckets and print trades that exceed threshold"""
-        current_time = datetime.utcnow().strftime("%H:%M:%S")
-        deletions = []
-        
-        for trade_key, usd_total in self.trade_buckets.items():
-            symbol, time_bucket, is_buyer_maker = trade_key
+        """Advance every symbol's watermark to the estimated exchange clock and expire closed buckets"""
+        if self.clock_offset_ms is None:
+            return
+        watermark_ms = time.time() * 1000 - self.clock_offset_ms - self.allowed_lateness_ms
+        for symbol_id in list(self.closed_through):
+            self._advance(symbol_id, watermark_ms)
             
-            # Only process completed seconds
-            if time_bucket < current_time and usd_total >= self.min_usd_value:
-                self._print_aggregated_trade(symbol, time_bucket, usd_total, is_buyer_maker)
-                deletions.append(trade_key)
-                
-        # Clean up printed trades
-        for key in deletions:
-            del self.trade_buckets[key]
-            
-        # Clean up old buckets (older than 5 seconds)
-        current_dt = datetime.utcnow()
-        old_keys = []
-        for trade_key in self.trade_buckets.keys():
-            _, time_bucket, _ = trade_key
-            try:
-                bucket_time = datetime.strptime(f"{current_dt.date()} {time_bucket}", "%Y-%m-%d %H:%M:%S")
-                if (current_dt - bucket_time).total_seconds() > 5:
-                    old_keys.append(trade_key)
-            except:
-                pass
-                
-        for key in old_keys:
-            del self.trade_buckets[key]
+        # Closed buckets are inserted roughly in time order
+        cutoff = int(watermark_ms // 1000) - self.correction_window
+        while self.closed_buckets:
+            trade_key = next(iter(self.closed_buckets))
+            if trade_key // 2 // symbols.capacity >= cutoff:
+                break
+            del self.closed_buckets[trade_key]
+            
+    def _on_aggregated_trade(self, symbol_id: int, second: int, usd_total: float, is_buyer_maker: bool,
+                             correction: bool = False):
+        """Alert for a closed bucket above the threshold (correction: revised total after late trades)"""
+        symbol = symbols.display(symbol_id)
+        time_bucket = datetime.fromtimestamp(second).strftime('%H:%M:%S')
+        self._print_aggregated_trade(symbol, time_bucket, usd_total, is_buyer_maker, correction)
+        if self.sinks:
+            self.sinks.publish('trade', {
+                'symbol': symbol,
+                'timestr': time_bucket,
+                'usdValue': usd_total,
+                'direction': 'SELL' if is_buyer_maker else 'BUY',
+                'correction': correction
+            })
             
-    def _print_aggregated_trade(self, symbol: str, time_bucket: str, usd_total: float, is_buyer_maker: bool):
+    def _print_aggregated_trade(self, symbol: str, time_bucket: str, usd_total: float, is_buyer_maker: bool,
+                                correction: bool = False):
         """Print formatted aggregated trade information"""
+        if not self.console:
+            return
         # Determine trade direction and color
         if is_buyer_maker:
             direction = "SELL"
@@ -102,7 +324,7 @@ class TradesHandler:
             suffix = ""
             
         print(f"\n{bg_color}{Style.BRIGHT}{prefix}{icon} {direction} {Style.RESET_ALL}{suffix}| "
-              f"{time_bucket} | "
+              f"{time_bucket}{' (revised)' if correction else ''} | "
               f"{symbol} | "
               f"{Fore.YELLOW}{Style.BRIGHT}{value_str}{Style.RESET_ALL}")
               
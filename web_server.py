@@ -1,22 +1,117 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from flask_socketio import SocketIO
 from flask_cors import CORS
 import asyncio
 from threading import Thread
+import gzip
+import hashlib
 import json
-from datetime import datetime
+import hmac
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from bounded_state import BoundedDict, symbols
+from client_sessions import ClientSessionIndex
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Polling responses are gzip/deflate compressed above the threshold; the
+# websocket transport negotiates permessage-deflate when the browser offers it
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading',
+                    http_compression=True, compression_threshold=512)
 
 # Store recent events for new connections
+MAX_RECENT_EVENTS = 50
+MAX_TICKS_LIMIT = 10000  # Rows per /api/ticks response
+MAX_CANDLES_LIMIT = 5000  # Candles per /api/candles response
 recent_events = {
-    'liquidations': [],
-    'trades': [],
-    'funding': {}
+    'liquidations': deque(maxlen=MAX_RECENT_EVENTS),
+    'trades': deque(maxlen=MAX_RECENT_EVENTS),
+    'funding': BoundedDict(1024)  # Latest FundingEvent per symbol
 }
-MAX_RECENT_EVENTS = 50
+
+# Per-client symbol sets and thresholds; new clients start with the defaults
+client_sessions = ClientSessionIndex()
+DEFAULT_SYMBOLS = ['BTC', 'ETH']
+DEFAULT_MIN_LIQUIDATION = 100000
+DEFAULT_MIN_TRADE = 500000
+MAX_CLIENT_SYMBOLS = 20  # Symbols one client can watch
+CLIENT_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9]{1,20}$')
+
+# Clients receive live pushes unless they sent a max-rate hint, in which
+# case they get conflated 'batch' pushes at their own rate
+THROTTLE_TICK = 0.05
+throttled_clients = {}
+throttle_lock = threading.Lock()
+throttle_task_started = False
+
+# Load shedding conflates pushes to live clients as well, at shed_interval;
+# liquidations are exempt and always go out live
+UNSHED_EVENTS = frozenset(['liquidation'])
+shed_interval = 0.0
+shed_clients = {}  # sid -> ClientThrottle while pushes are shed
+
+# Opt-in compact encoding: events are sent as packed arrays in a 'p' push and
+# symbols are replaced by ids from the shared symbol table. Each compact client
+# is sent the table entries it has not seen yet, once, before they are used.
+compact_clients = {}  # sid -> number of symbol table entries already sent
+compact_lock = threading.Lock()
+
+
+class SnapshotCache:
+    """Pre-encoded /api/snapshot body, rebuilt at most once per state change
+    
+    invalidate() is a counter bump on the hot path; the JSON encode, gzip
+    and ETag hash happen on the first request after a change and are shared
+    by every poller until the next one.
+    """
+    
+    def __init__(self, build):
+        self.build = build
+        self.version = 0
+        self.built_version = -1
+        self.entry = (b'', b'', '')  # (body, gzipped body, etag), swapped atomically
+        self.lock = threading.Lock()
+        
+    def invalidate(self):
+        self.version += 1
+        
+    def get(self):
+        if self.built_version != self.version:
+            with self.lock:
+                if self.built_version != self.version:
+                    version = self.version
+                    body = json.dumps(self.build(), separators=(',', ':')).encode()
+                    etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+                    self.entry = (body, gzip.compress(body, compresslevel=6), etag)
+                    self.built_version = version
+        return self.entry
+
+
+class ClientThrottle:
+    """Pending updates for a client that accepts at most max_rate pushes per second"""
+    
+    def __init__(self, max_rate):
+        self.interval = 1.0 / max_rate
+        self.next_flush = 0.0
+        self.events = deque(maxlen=MAX_RECENT_EVENTS)  # Discrete events, newest kept
+        self.latest = {}  # Conflated state updates keyed by (event name, key)
+        
+    def add(self, name, event, conflate_key=None):
+        if conflate_key is None:
+            self.events.append([name, event])
+        else:
+            self.latest[(name, conflate_key)] = [name, event]
+            
+    def drain(self):
+        events = list(self.events) + list(self.latest.values())
+        self.events.clear()
+        self.latest.clear()
+        return events
 
 
 @app.route('/')
@@ -46,6 +141,8 @@ def health():
                 # Count active connections
                 health_data['websocket_connections'] = len(stream_instance.ws_manager.connections)
                 health_data['active_streams'] = list(stream_instance.current_subscriptions.keys())
+                streams = stream_instance.ws_manager.get_stream_health()
+                health_data['streams'] = streams
                 
                 # Check if liquidation stream is active
                 if '!forceOrder@arr' not in stream_instance.current_subscriptions:
@@ -54,6 +151,26 @@ def health():
                 elif '!forceOrder@arr' not in stream_instance.ws_manager.connections:
                     health_data['status'] = 'degraded'
                     health_data['error'] = 'Liquidation stream not connected'
+                elif streams.get('!forceOrder@arr', {}).get('state') != 'ok':
+                    health_data['status'] = 'degraded'
+                    health_data['error'] = 'Liquidation stream stale'
+                else:
+                    # Only the liquidation feed and the default symbols' aggTrades gate health;
+                    # quiet markPrice legs or illiquid spot basis streams are informational
+                    critical = {info.trade_stream for info in map(stream_instance.registry.resolve,
+                                                                  stream_instance.default_symbols) if info}
+                    unhealthy = [name for name, stream in streams.items() if stream['state'] != 'ok']
+                    critical_unhealthy = [name for name in unhealthy if name in critical]
+                    health_data['unhealthy_streams'] = unhealthy
+                    if critical_unhealthy:
+                        health_data['status'] = 'degraded'
+                        health_data['error'] = f"Critical streams not healthy: {', '.join(critical_unhealthy)}"
+            if getattr(stream_instance, 'load_shedder', None):
+                shedding = stream_instance.load_shedder.get_stats()
+                health_data['load_shedding'] = shedding
+                if shedding['tier'] and health_data['status'] == 'healthy':
+                    health_data['status'] = 'degraded'
+                    health_data['error'] = f"Load shedding active: {shedding['name']}"
         else:
             health_data['status'] = 'unhealthy'
             health_data['error'] = 'Stream instance not initialized'
@@ -86,98 +203,581 @@ def debug():
         debug_data['active_symbols'] = getattr(si, 'active_symbols', [])
         debug_data['min_liquidation_usd'] = getattr(si, 'min_liquidation_usd', None)
         debug_data['min_trade_usd'] = getattr(si, 'min_trade_usd', None)
+        if getattr(si, 'lag_monitor', None):
+            debug_data['loop_lag'] = si.lag_monitor.get_stats()
+        if getattr(si, 'funding_handler', None):
+            debug_data['funding_filter'] = si.funding_handler.get_filter_stats()
+        if getattr(si, 'trades_handler', None):
+            debug_data['trade_windows'] = si.trades_handler.get_window_stats()
+        if debug_data['has_ws_manager']:
+            debug_data['redundancy'] = si.ws_manager.get_redundancy_stats()
+    debug_data['client_sessions'] = client_sessions.get_stats()
         
     return jsonify(debug_data)
 
 
-def emit_liquidation(data):
-    """Emit liquidation event to all connected clients"""
-    event = {
-        'timestamp': datetime.utcnow().isoformat(),
-        'data': data
+def _debug_authorized():
+    """Check the DEBUG_TOKEN for protected debug endpoints (disabled when unset)"""
+    expected = os.environ.get('DEBUG_TOKEN')
+    if not expected:
+        return False
+    # Header only: query strings end up in access logs and browser history
+    supplied = request.headers.get('X-Debug-Token', '')
+    return hmac.compare_digest(supplied, expected)
+
+
+@app.route('/debug/profile')
+def debug_profile():
+    """Sample the ingest thread and return a collapsed-stack profile"""
+    from main_visual_production import stream_instance
+    from loop_monitor import SamplingProfiler
+    
+    if not _debug_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    if not stream_instance or not getattr(stream_instance, 'thread_id', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    if not SamplingProfiler.supported():
+        return jsonify({
+            'error': 'Profiling unavailable under gevent: the ingest loop runs as a greenlet on the '
+                     'sampling thread, so it has no separate stack to sample. Run with threading '
+                     '(python main_visual_production.py) to profile.'
+        }), 501
+    
+    seconds = min(max(request.args.get('seconds', 5, type=float), 0.1), 60)
+    interval = min(max(request.args.get('interval', 0.005, type=float), 0.001), 0.1)
+    profiler = SamplingProfiler(interval=interval)
+    counts = profiler.sample(stream_instance.thread_id, seconds)
+    
+    if request.args.get('format') == 'json':
+        return jsonify({'seconds': seconds, 'samples': sum(counts.values()), 'stacks': counts})
+    return Response(SamplingProfiler.collapse(counts), mimetype='text/plain')
+
+
+@app.route('/debug/memory')
+def debug_memory():
+    """Approximate bytes, entries and capacity bound per in-memory structure"""
+    from main_visual_production import stream_instance
+    from bounded_state import deep_sizeof, process_rss
+    
+    if not _debug_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    # name -> (structure, entry count, capacity bound)
+    structures = {
+        'symbol_table': (symbols, len(symbols), symbols.capacity),
+        'recent_liquidations': (recent_events['liquidations'], len(recent_events['liquidations']), MAX_RECENT_EVENTS),
+        'recent_trades': (recent_events['trades'], len(recent_events['trades']), MAX_RECENT_EVENTS),
+        'recent_funding': (recent_events['funding'], len(recent_events['funding']), recent_events['funding'].capacity),
+        'client_sessions': (client_sessions, len(client_sessions.sessions), None),
+        'throttled_clients': (throttled_clients, len(throttled_clients), None)
     }
-    recent_events['liquidations'].append(event)
-    if len(recent_events['liquidations']) > MAX_RECENT_EVENTS:
-        recent_events['liquidations'].pop(0)
+    if stream_instance:
+        si = stream_instance
+        structures.update({
+            'trade_buckets': (si.trades_handler.trade_buckets, len(si.trades_handler.trade_buckets),
+                              si.trades_handler.max_buckets),
+            'trade_closed_buckets': (si.trades_handler.closed_buckets, len(si.trades_handler.closed_buckets), None),
+            'funding_last_rates': (si.funding_handler.last_rates, len(si.funding_handler.last_rates),
+                                   si.funding_handler.last_rates.capacity),
+            'funding_current_rates': (si.funding_handler.current_rates, len(si.funding_handler.current_rates),
+                                      si.funding_handler.current_rates.capacity),
+            'candles': (si.candle_builder.series, len(si.candle_builder.series), si.candle_builder.max_symbols),
+            'tick_store_trades': (si.tick_store.buffers['trades'], len(si.tick_store.buffers['trades']),
+                                  si.tick_store.max_symbols['trades']),
+            'tick_store_liquidations': (si.tick_store.buffers['liquidations'], len(si.tick_store.buffers['liquidations']),
+                                        si.tick_store.max_symbols['liquidations']),
+            'basis': (si.basis_engine, len(si.basis_engine.symbols), si.basis_engine.max_symbols),
+            'correlation': (si.correlation_engine, len(si.correlation_engine.slots),
+                            si.correlation_engine.max_symbols),
+            'impact_pending': (si.impact_study.pending, len(si.impact_study.pending), si.impact_study.max_pending),
+            'impact_curves': (si.impact_study.impacts, int(si.impact_study.heads.clip(max=si.impact_study.window).sum()),
+                              si.impact_study.impacts.size),
+            'stream_races': (si.ws_manager.races, len(si.ws_manager.races), None),
+            'stream_stats': (si.ws_manager.stream_stats, len(si.ws_manager.stream_stats), None)
+        })
     
-    socketio.emit('liquidation', event)
+    report = {
+        name: {'bytes': deep_sizeof(structure), 'entries': entries, 'capacity': capacity}
+        for name, (structure, entries, capacity) in structures.items()
+    }
+    return jsonify({
+        'rss_bytes': process_rss(),
+        'total_bytes': sum(entry['bytes'] for entry in report.values()),
+        'structures': report
+    })
+
 
+def _full_symbol(symbol):
+    """Normalize 'btc' / 'BTC' / 'BTCUSDT' to the exchange symbol"""
+    symbol = symbol.upper()
+    return symbol if symbol.endswith('USDT') else f"{symbol}USDT"
 
-def emit_trade(data):
-    """Emit trade event to all connected clients"""
-    event = {
-        'timestamp': datetime.utcnow().isoformat(),
-        'data': data
+
+@app.route('/api/candles')
+def api_candles():
+    """Return OHLCV candles built from the aggTrade stream"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'candle_builder', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    symbol = request.args.get('symbol')
+    if not symbol:
+        return jsonify({'error': 'Missing symbol parameter'}), 400
+    symbol = _full_symbol(symbol)
+    interval = request.args.get('interval', '1m')
+    limit = request.args.get('limit', 500, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(limit, MAX_CANDLES_LIMIT)
+    footprint = request.args.get('footprint', '0').lower() in ('1', 'true', 'yes')
+    
+    try:
+        candles = stream_instance.candle_builder.get_candles(symbol, interval, limit, footprint=footprint)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'symbol': symbol,
+        'interval': interval,
+        'candles': candles
+    })
+
+
+@app.route('/api/ticks')
+def api_ticks():
+    """Query stored ticks by time range, minimum notional and side"""
+    from main_visual_production import stream_instance
+    from tick_store import SIDE_BUY, SIDE_SELL
+    
+    if not stream_instance or not getattr(stream_instance, 'tick_store', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    symbol = request.args.get('symbol')
+    if not symbol:
+        return jsonify({'error': 'Missing symbol parameter'}), 400
+    symbol = _full_symbol(symbol)
+    kind = request.args.get('kind', 'trades')
+    side = {'buy': SIDE_BUY, 'sell': SIDE_SELL}.get(request.args.get('side', '').lower())
+    limit = request.args.get('limit', 1000, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(limit, MAX_TICKS_LIMIT)
+    
+    try:
+        columns = stream_instance.tick_store.query(
+            symbol,
+            start_ms=request.args.get('start', type=int),
+            end_ms=request.args.get('end', type=int),
+            min_notional=request.args.get('min_usd', type=float),
+            side=side,
+            kind=kind
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Columnar response, newest rows kept when limited
+    total = int(columns['ts'].size)
+    return jsonify({
+        'symbol': symbol,
+        'kind': kind,
+        'total': total,
+        'ticks': {name: values[-limit:].tolist() for name, values in columns.items()}
+    })
+
+
+@app.route('/api/ticks/flow')
+def api_tick_flow():
+    """Notional by side over a trailing window (seconds)"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'tick_store', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    symbol = request.args.get('symbol')
+    if not symbol:
+        return jsonify({'error': 'Missing symbol parameter'}), 400
+    symbol = _full_symbol(symbol)
+    window = request.args.get('window', 90, type=float)
+    kind = request.args.get('kind', 'trades')
+    
+    try:
+        flow = stream_instance.tick_store.notional_by_side(symbol, int(window * 1000), kind=kind)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'symbol': symbol, 'kind': kind, 'window': window, **flow})
+
+
+def _build_snapshot():
+    """Current funding per symbol, latest liquidations and trades, active subscriptions"""
+    from main_visual_production import stream_instance
+    
+    return {
+        'timestamp': int(time.time() * 1000),
+        'funding': {event.exchange_symbol: event.to_dict() for event in list(recent_events['funding'].values())},
+        'liquidations': [event.to_dict() for event in list(recent_events['liquidations'])],
+        'trades': [event.to_dict() for event in list(recent_events['trades'])],
+        'subscriptions': sorted(stream_instance.current_subscriptions) if stream_instance else []
     }
+
+
+snapshot_cache = SnapshotCache(_build_snapshot)
+
+
+@app.route('/api/snapshot')
+def api_snapshot():
+    """Cached state snapshot for pollers (supports If-None-Match and gzip)"""
+    body, gzipped, etag = snapshot_cache.get()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/basis')
+def api_basis():
+    """Latest spot/futures basis per symbol"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'basis_engine', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    return jsonify(stream_instance.basis_engine.get_snapshot())
+
+
+@app.route('/api/symbols')
+def api_symbols():
+    """Registered symbols with their ids and contract metadata"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'registry', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    return jsonify(stream_instance.registry.get_snapshot())
+
+
+@app.route('/api/correlation')
+def api_correlation():
+    """Rolling return correlation matrix and per-symbol anomaly scores"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'correlation_engine', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    snapshot = stream_instance.correlation_engine.get_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'Not enough samples yet'}), 503
+    return jsonify(snapshot)
+
+
+@app.route('/api/impact')
+def api_impact():
+    """Rolling price-impact curves after large liquidations, by size bucket and side"""
+    from main_visual_production import stream_instance
+    
+    if not stream_instance or not getattr(stream_instance, 'impact_study', None):
+        return jsonify({'error': 'Stream instance not initialized'}), 503
+    
+    return jsonify(stream_instance.impact_study.get_snapshot())
+
+
+def _payload(event):
+    """JSON payload of an event record (candle/basis/correlation events already are payloads)"""
+    return event.to_payload() if hasattr(event, 'to_payload') else event
+
+
+def _pack(event):
+    """Packed-array form of an event, or None if it has no compact form"""
+    return event.pack() if hasattr(event, 'pack') else None
+
+
+def _send_packed(sids, records):
+    """Send packed records, preceded by any symbol table entries a client lacks"""
+    with compact_lock:
+        size = len(symbols.displays)
+        for sid in sids:
+            sent = compact_clients.get(sid)
+            if sent is not None and sent < size:
+                compact_clients[sid] = size
+                # Emitted under the lock so no record can overtake its symbols
+                socketio.emit('symbols', {'start': sent, 'names': symbols.displays[sent:size]}, to=sid)
+    socketio.emit('p', records, to=sids)
+
+
+def _deliver(name, event, symbol, kind='any', usd_value=0.0, conflate_key=None):
+    """Push an event to the clients whose filters accept it (live or queued if throttled)"""
+    sids = client_sessions.match(symbol, kind, usd_value)
+    if sids:
+        _send(name, event, sids, conflate_key)
+
+
+def _send(name, event, sids, conflate_key=None):
+    """Send an event to the given clients: queued for throttled ones, packed or JSON for the rest
+    
+    The JSON payload and packed form are each built at most once, and only
+    if some recipient needs them.
+    """
+    if throttled_clients or shed_interval:
+        live = []
+        with throttle_lock:
+            shed = shed_interval and name not in UNSHED_EVENTS
+            for sid in sids:
+                throttle = throttled_clients.get(sid)
+                if throttle is None and shed:
+                    throttle = shed_clients.get(sid)
+                    if throttle is None:
+                        throttle = shed_clients[sid] = ClientThrottle(1 / shed_interval)
+                if throttle is None:
+                    live.append(sid)
+                else:
+                    throttle.add(name, event, conflate_key)
+        sids = live
+    if sids and compact_clients:
+        packed = _pack(event)
+        if packed is not None:
+            compact = [sid for sid in sids if sid in compact_clients]
+            if compact:
+                _send_packed(compact, [packed])
+                sids = [sid for sid in sids if sid not in compact_clients]
+    if sids:
+        # One emit for all recipients so the packet is encoded once
+        socketio.emit(name, _payload(event), to=sids)
+
+
+def _flush_throttled_clients():
+    """Background task: send each throttled client its pending updates when due"""
+    while True:
+        socketio.sleep(THROTTLE_TICK)
+        now = time.monotonic()
+        due = []
+        with throttle_lock:
+            for sid, throttle in list(throttled_clients.items()) + list(shed_clients.items()):
+                if now >= throttle.next_flush:
+                    events = throttle.drain()
+                    if events:
+                        throttle.next_flush = now + throttle.interval
+                        due.append((sid, events))
+            if not shed_interval and shed_clients:
+                # Shedding ended: send what is still pending, then back to live pushes
+                for sid, throttle in shed_clients.items():
+                    events = throttle.drain()
+                    if events:
+                        due.append((sid, events))
+                shed_clients.clear()
+        for sid, events in due:
+            if sid in compact_clients:
+                packed = []
+                rest = []
+                for name, event in events:
+                    record = _pack(event)
+                    if record is None:
+                        rest.append([name, event])
+                    else:
+                        packed.append(record)
+                if packed:
+                    _send_packed([sid], packed)
+                events = rest
+            if events:
+                socketio.emit('batch', {'events': [[name, _payload(event)] for name, event in events]}, to=sid)
+
+
+def emit_liquidation(event):
+    """Emit a LiquidationEvent to clients watching the symbol above their threshold"""
+    recent_events['liquidations'].append(event)
+    snapshot_cache.invalidate()
+    _deliver('liquidation', event, event.symbol, 'liquidation', event.usd_value)
+
+
+def emit_trade(event):
+    """Emit a TradeEvent to clients watching the symbol above their threshold"""
     recent_events['trades'].append(event)
-    if len(recent_events['trades']) > MAX_RECENT_EVENTS:
-        recent_events['trades'].pop(0)
+    snapshot_cache.invalidate()
+    _deliver('trade', event, event.symbol, 'trade', event.usd_value)
+
+
+def emit_funding(event):
+    """Emit a FundingEvent to clients watching the symbol"""
+    recent_events['funding'][event.symbol_id] = event
+    snapshot_cache.invalidate()
+    _deliver('funding', event, event.symbol, conflate_key=event.symbol_id)
+
+
+def emit_candle(symbol, interval, candle):
+    """Emit a closed candle to clients watching the symbol"""
+    display = symbols.display(symbols.intern(symbol))
+    _deliver('candle', {
+        'symbol': display,
+        'interval': interval,
+        'data': candle
+    }, display, conflate_key=(symbol, interval, candle['openTime']))
+
+
+def emit_basis(symbol, data):
+    """Emit a spot/futures basis update to clients watching the symbol"""
+    _deliver('basis', {'symbol': symbol, 'data': data}, symbols.display(symbols.intern(symbol)), conflate_key=symbol)
+
+
+def emit_correlation(data):
+    """Emit cross-symbol correlation scores to every client (one conflated update)"""
+    sids = list(client_sessions.sessions)
+    if sids:
+        _send('correlation', data, sids, conflate_key='correlation')
+
+
+def set_push_shedding(interval):
+    """Conflate non-liquidation pushes to every client at interval seconds (0 restores live pushes)"""
+    global shed_interval, throttle_task_started
     
-    socketio.emit('trade', event)
+    with throttle_lock:
+        shed_interval = interval
+        if interval and not throttle_task_started:
+            throttle_task_started = True
+            socketio.start_background_task(_flush_throttled_clients)
 
 
-def emit_funding(symbol, data):
-    """Emit funding rate event to all connected clients"""
-    recent_events['funding'][symbol] = {
-        'timestamp': datetime.utcnow().isoformat(),
-        'data': data
-    }
-    socketio.emit('funding', {'symbol': symbol, 'data': data})
+def _apply_client_filters():
+    """Drive the shared ingest streams from the union of all client symbol sets"""
+    from main_visual_production import stream_instance
+    
+    if stream_instance:
+        stream_instance.apply_client_filters(client_sessions.active_symbols())
+
+
+def _send_funding_snapshot(session):
+    """Send the latest funding rates for a session's symbols to that client only"""
+    for event in list(recent_events['funding'].values()):
+        if event.symbol in session.symbols:
+            socketio.emit('funding', event.to_payload(), to=session.sid)
+
+
+def _client_symbols(requested):
+    """Normalize client symbols, keeping listed ones only (at most MAX_CLIENT_SYMBOLS)
+
+    Unknown names never reach the ingest, where they would be interned into
+    the capped shared symbol table and subscribed as nonexistent streams.
+    """
+    from main_visual_production import stream_instance
+    
+    registry = getattr(stream_instance, 'registry', None)
+    names = []
+    for symbol in requested:
+        name = str(symbol).upper().replace('USDT', '')
+        if not CLIENT_SYMBOL_PATTERN.match(name) or name in names:
+            continue
+        if registry is not None and not registry.is_known(name):
+            continue
+        names.append(name)
+        if len(names) >= MAX_CLIENT_SYMBOLS:
+            break
+    return names
 
 
 @socketio.on('connect')
 def handle_connect():
-    """Send recent events to newly connected client"""
+    """Register a default filter session and send matching recent events"""
     print('Client connected')
+    session = client_sessions.update(request.sid, DEFAULT_SYMBOLS, DEFAULT_MIN_LIQUIDATION, DEFAULT_MIN_TRADE)
+    _apply_client_filters()
     
     # Send recent liquidations
-    for event in recent_events['liquidations'][-10:]:
-        socketio.emit('liquidation', event, room=request.sid)
+    for event in list(recent_events['liquidations'])[-10:]:
+        if event.symbol in session.symbols and event.usd_value >= session.thresholds['liquidation']:
+            socketio.emit('liquidation', event.to_payload(), to=request.sid)
     
     # Send recent trades
-    for event in recent_events['trades'][-10:]:
-        socketio.emit('trade', event, room=request.sid)
+    for event in list(recent_events['trades'])[-10:]:
+        if event.symbol in session.symbols and event.usd_value >= session.thresholds['trade']:
+            socketio.emit('trade', event.to_payload(), to=request.sid)
     
     # Send current funding rates
-    for symbol, data in recent_events['funding'].items():
-        socketio.emit('funding', {'symbol': symbol, 'data': data['data']}, room=request.sid)
+    _send_funding_snapshot(session)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    with throttle_lock:
+        throttled_clients.pop(request.sid, None)
+        shed_clients.pop(request.sid, None)
+    with compact_lock:
+        compact_clients.pop(request.sid, None)
+    if client_sessions.remove(request.sid) is not None:
+        _apply_client_filters()
+
+
+@socketio.on('client_hints')
+def handle_client_hints(data):
+    """Apply a client's hints: maxRate (updates per second, 0 for live) and encoding ('compact' or 'json')"""
+    global throttle_task_started
+    
+    if not isinstance(data, dict):
+        return
+    
+    if 'maxRate' in data:
+        try:
+            max_rate = float(data.get('maxRate') or 0)
+        except (TypeError, ValueError):
+            max_rate = 0
+            
+        with throttle_lock:
+            if max_rate > 0:
+                throttled_clients[request.sid] = ClientThrottle(min(max_rate, 1 / THROTTLE_TICK))
+                if not throttle_task_started:
+                    throttle_task_started = True
+                    socketio.start_background_task(_flush_throttled_clients)
+            else:
+                throttled_clients.pop(request.sid, None)
+    
+    if 'encoding' in data:
+        with compact_lock:
+            if data['encoding'] == 'compact':
+                # A (re)negotiated session starts with an empty symbol table
+                compact_clients[request.sid] = 0
+            else:
+                compact_clients.pop(request.sid, None)
 
 
 @socketio.on('update_settings')
 def handle_settings_update(data):
-    """Handle settings update from client"""
+    """Update this client's filters; streams follow the union of all clients"""
     print(f"Settings update received: {data}")
     
+    try:
+        requested = data.get('symbols') or []
+        if not isinstance(requested, list):
+            raise TypeError('symbols must be a list')
+        symbol_names = _client_symbols(requested)
+        min_liq = float(data.get('minLiquidation', DEFAULT_MIN_LIQUIDATION))
+        min_trade = float(data.get('minTrade', DEFAULT_MIN_TRADE))
+    except (TypeError, ValueError, AttributeError):
+        socketio.emit('settings_updated', {'status': 'error', 'message': 'Invalid settings'}, to=request.sid)
+        return
+    
+    if not symbol_names:
+        # Empty, missing or all-unknown list keeps the client's current symbols
+        current = client_sessions.get(request.sid)
+        symbol_names = current.symbols if current is not None else DEFAULT_SYMBOLS
+    session = client_sessions.update(request.sid, symbol_names, min_liq, min_trade)
+    
     # Import here to avoid circular import
     try:
-        from main_visual_production import stream_instance
-        
-        if stream_instance:
-            symbols = data.get('symbols', [])
-            min_liq = data.get('minLiquidation')
-            min_trade = data.get('minTrade')
-            
-            stream_instance.update_settings(
-                symbols=symbols if symbols else None,
-                min_liquidation=min_liq,
-                min_trade=min_trade
-            )
-            
-            # Send current funding rates for the active symbols
-            stream_instance.send_current_funding_rates()
-            
-            socketio.emit('settings_updated', {'status': 'ok'})
-        else:
-            print("Warning: stream_instance not initialized")
-            socketio.emit('settings_updated', {'status': 'error', 'message': 'Stream instance not initialized'})
+        _apply_client_filters()
     except ImportError as e:
         print(f"Error importing stream_instance: {e}")
-        socketio.emit('settings_updated', {'status': 'error', 'message': 'Stream instance not available'})
+        socketio.emit('settings_updated', {'status': 'error', 'message': 'Stream instance not available'}, to=request.sid)
+        return
+    
+    # Send current funding rates for this client's symbols
+    _send_funding_snapshot(session)
+    
+    socketio.emit('settings_updated', {'status': 'ok', 'settings': session.to_dict()}, to=request.sid)
 
 
 def run_server():
@@ -1,12 +1,99 @@
 import asyncio
 import json
+import socket
+import time
 import websockets
+from collections import OrderedDict, deque
 from typing import Dict, List, Callable, Optional
+from urllib.parse import urlparse
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Spot streams share names with futures streams (e.g. btcusdt@aggTrade),
+# so they are keyed with this suffix in connections/callbacks
+SPOT_SUFFIX = '#spot'
+
+
+def event_identity(data: Dict):
+    """Identity of a stream event, shared by its copies on redundant legs"""
+    if 'a' in data:  # aggTrade id
+        return data['a']
+    order = data.get('o')
+    if order:  # forceOrder has no id; the order fields identify it
+        return (order.get('s'), order.get('S'), order.get('T'), order.get('q'), order.get('p'))
+    return (data.get('e'), data.get('s'), data.get('E'))
+
+
+class LegRace:
+    """First-arrival-wins de-duplication across redundant legs of one stream
+    
+    Identities are kept in a bounded seen-set (oldest evicted first). Each
+    event is credited to the leg that delivered it first; when a later copy
+    arrives, the winner's lead over it is recorded.
+    """
+    
+    def __init__(self, legs: int, capacity: int = 4096):
+        self.capacity = capacity
+        self.seen: OrderedDict = OrderedDict()  # identity -> [winning leg, arrival, copies]
+        self.wins = [0] * legs
+        self.duplicates = 0
+        self.leads_ms = deque(maxlen=1024)
+        
+    def accept(self, identity, leg: int) -> bool:
+        """True if this is the first copy of the event"""
+        now = time.monotonic()
+        entry = self.seen.get(identity)
+        if entry is None:
+            self.seen[identity] = [leg, now, 1]
+            if len(self.seen) > self.capacity:
+                self.seen.popitem(last=False)
+            self.wins[leg] += 1
+            return True
+        entry[2] += 1
+        self.duplicates += 1
+        if entry[2] == 2:  # Runner-up copy: the winner's lead
+            self.leads_ms.append((now - entry[1]) * 1000)
+        return False
+        
+    def get_stats(self) -> Dict:
+        leads = sorted(self.leads_ms)
+        return {
+            'wins': list(self.wins),
+            'duplicates': self.duplicates,
+            'lead_ms_p50': round(leads[len(leads) // 2], 3) if leads else None,
+            'lead_ms_p99': round(leads[int(len(leads) * 0.99)], 3) if leads else None,
+            'lead_ms_max': round(leads[-1], 3) if leads else None
+        }
+
+
+class StreamStats:
+    """Liveness of one stream connection (leg), updated per message at the cost of a few float ops"""
+    
+    __slots__ = ('opened', 'last', 'messages', 'gap', 'reconnects', 'heals', 'healing')
+    
+    def __init__(self):
+        self.opened = self.last = time.monotonic()
+        self.messages = 0
+        self.gap: Optional[float] = None  # EWMA of seconds between messages
+        self.reconnects = 0
+        self.heals = 0
+        self.healing = False
+        
+    def record(self, now: float, count: int = 1):
+        if self.messages:
+            gap = (now - self.last) / count
+            self.gap = gap if self.gap is None else self.gap + 0.02 * (gap - self.gap)
+        self.last = now
+        self.messages += count
+        
+    def reopened(self):
+        # The learned gap survives reconnects; the age restarts
+        self.opened = self.last = time.monotonic()
+        self.reconnects += 1
+        self.healing = False
+
 
 class BinanceWebSocketManager:
     def __init__(self):
@@ -14,35 +101,123 @@ class BinanceWebSocketManager:
         self.spot_url = "wss://stream.binance.com:9443"
         self.connections: Dict[str, websockets.WebSocketClientProtocol] = {}
         self.callbacks: Dict[str, List[Callable]] = {}
+        self.batch_callbacks: Dict[str, List[Callable]] = {}
+        self.stream_markets: Dict[str, bool] = {}  # stream key -> is_futures
+        self.max_batch_size = 1000  # Upper bound on frames drained per wakeup
+        self.redundancy: Dict[str, int] = {}  # stream key -> number of legs
+        self.leg_connections: Dict[str, Dict[int, websockets.WebSocketClientProtocol]] = {}  # extra legs
+        self.races: Dict[str, LegRace] = {}
         self.running = False
         
-    async def connect(self, stream_name: str, callback: Callable, is_futures: bool = True):
-        """Connect to a Binance WebSocket stream"""
-        url = f"{self.base_url}/ws/{stream_name}" if is_futures else f"{self.spot_url}/ws/{stream_name}"
+        # Staleness watchdog: a stream is healed (reconnected) when quiet for
+        # stale_factor x its usual gap between messages, clamped to
+        # [stale_min, stale_max]; stale_default applies until min_samples
+        # messages were seen (spot_stale_default for spot streams, which stay
+        # silent for contracts with no spot market), and stale_overrides fixes
+        # the limit per stream
+        self.stream_stats: Dict[tuple, StreamStats] = {}  # (stream key, leg) -> stats
+        self.stale_factor = 50
+        self.stale_min = 30.0
+        self.stale_max = 300.0
+        self.stale_default = 120.0
+        self.spot_stale_default = 900.0
+        self.min_samples = 100
+        self.stale_overrides: Dict[str, float] = {'!forceOrder@arr': 600.0}  # Bursty, often quiet for minutes
+        self.reconnect_delay = 5.0
+        
+    async def connect(self, stream_name: str, callback: Callable, is_futures: bool = True,
+                      batch_callback: Optional[Callable] = None, redundancy: int = 1):
+        """Connect to a Binance WebSocket stream
+        
+        If batch_callback is given it replaces callback for this stream: every
+        frame already buffered on the socket is drained and the decoded records
+        are passed to batch_callback(records) in a single call.
+        
+        With redundancy > 1 the stream is opened on that many independent
+        connections (spread over the resolved edge addresses) and each event
+        is dispatched once, from whichever copy arrives first.
+        
+        Spot streams are registered under stream_key(stream_name, False).
+        """
+        key = self.stream_key(stream_name, is_futures)
+        if batch_callback is not None:
+            self.batch_callbacks.setdefault(key, []).append(batch_callback)
+        else:
+            self.callbacks.setdefault(key, []).append(callback)
+        self.stream_markets[key] = is_futures
+        
+        if redundancy > 1:
+            self.redundancy[key] = redundancy
+            self.races[key] = LegRace(redundancy)
+            await asyncio.gather(*(self._open(key, leg) for leg in range(redundancy)))
+        else:
+            await self._open(key)
+        
+    @staticmethod
+    def stream_key(stream_name: str, is_futures: bool = True) -> str:
+        """Key used for a stream in connections and callbacks"""
+        return stream_name if is_futures else f"{stream_name}{SPOT_SUFFIX}"
         
-        logger.info(f"Attempting to connect to WebSocket: {url}")
+    async def _edge_address(self, url: str, leg: int) -> Optional[str]:
+        """Resolved address for a leg, so legs land on different edges when DNS offers several"""
+        parsed = urlparse(url)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                parsed.hostname, parsed.port or 443, type=socket.SOCK_STREAM)
+        except OSError as e:
+            logger.warning(f"Cannot resolve {parsed.hostname} for leg {leg}: {e}")
+            return None
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        return addresses[leg % len(addresses)] if addresses else None
+        
+    async def _open(self, stream_name: str, leg: int = 0):
+        """Open the WebSocket (or one leg of a redundant stream) for an already registered stream key"""
+        is_futures = self.stream_markets.get(stream_name, True)
+        path = stream_name[:-len(SPOT_SUFFIX)] if stream_name.endswith(SPOT_SUFFIX) else stream_name
+        url = f"{self.base_url}/ws/{path}" if is_futures else f"{self.spot_url}/ws/{path}"
         
-        if stream_name not in self.callbacks:
-            self.callbacks[stream_name] = []
-        self.callbacks[stream_name].append(callback)
+        logger.info(f"Attempting to connect to WebSocket: {url}" + (f" (leg {leg})" if leg else ""))
         
         try:
-            websocket = await websockets.connect(url)
-            self.connections[stream_name] = websocket
-            logger.info(f"Successfully connected to {stream_name}")
+            address = await self._edge_address(url, leg) if stream_name in self.redundancy else None
+            if address:
+                # host only changes the TCP target; TLS SNI and Host still come from the URL
+                websocket = await websockets.connect(url, host=address)
+            else:
+                websocket = await websockets.connect(url)
+            if leg == 0:
+                self.connections[stream_name] = websocket
+            else:
+                self.leg_connections.setdefault(stream_name, {})[leg] = websocket
+            stats = self.stream_stats.get((stream_name, leg))
+            if stats is None:
+                self.stream_stats[(stream_name, leg)] = StreamStats()
+            else:
+                stats.reopened()
+            logger.info(f"Successfully connected to {stream_name}" + (f" (leg {leg})" if leg else ""))
             
-            asyncio.create_task(self._handle_messages(stream_name, websocket))
+            asyncio.create_task(self._handle_messages(stream_name, websocket, leg))
             
         except Exception as e:
             logger.error(f"Failed to connect to {stream_name}: {e}", exc_info=True)
             raise
             
-    async def _handle_messages(self, stream_name: str, websocket: websockets.WebSocketClientProtocol):
+    async def _handle_messages(self, stream_name: str, websocket: websockets.WebSocketClientProtocol, leg: int = 0):
         """Handle incoming messages from a WebSocket stream"""
+        stats = self.stream_stats.setdefault((stream_name, leg), StreamStats())
         try:
             async for message in websocket:
+                stats.record(time.monotonic())
+                if stream_name in self.batch_callbacks:
+                    drained = await self._handle_batch(stream_name, websocket, message, leg)
+                    if drained:
+                        stats.record(time.monotonic(), drained)
+                    continue
                 try:
                     data = json.loads(message)
+                    race = self.races.get(stream_name)
+                    if race is not None and not race.accept(event_identity(data), leg):
+                        continue
                     # Debug logging for liquidation stream
                     if "forceOrder" in stream_name:
                         logger.info(f"Received message on {stream_name}: {message[:200]}...")
@@ -53,33 +228,193 @@ class BinanceWebSocketManager:
                 except Exception as e:
                     logger.error(f"Error processing message from {stream_name}: {e}")
         except websockets.exceptions.ConnectionClosed:
-            logger.warning(f"Connection closed for {stream_name}")
-            await self._reconnect(stream_name)
+            logger.warning(f"Connection closed for {stream_name}" + (f" (leg {leg})" if leg else ""))
         except Exception as e:
             logger.error(f"Unexpected error in message handler for {stream_name}: {e}")
             
-    async def _reconnect(self, stream_name: str):
-        """Reconnect to a stream after disconnection"""
-        await asyncio.sleep(5)  # Wait before reconnecting
+        # Closed by the server, by an error or by the watchdog: reopen unless
+        # the stream was disconnected on purpose (its callbacks are gone then)
+        await self._reconnect(stream_name, leg, websocket)
+            
+    @staticmethod
+    def _buffered_frames(websocket) -> int:
+        """Number of complete frames received by the socket but not yet consumed"""
+        frames = getattr(getattr(websocket, 'recv_messages', None), 'frames', None)
+        try:
+            return len(frames) if frames is not None else 0
+        except TypeError:
+            return 0
+            
+    async def _handle_batch(self, stream_name: str, websocket, first_message, leg: int = 0) -> int:
+        """Drain every buffered frame after first_message and dispatch them as one batch
+        
+        Returns the number of frames drained in addition to first_message.
+        """
+        messages = [first_message]
+        # recv() returns without suspending while frames are already buffered
+        while len(messages) < self.max_batch_size and self._buffered_frames(websocket):
+            messages.append(await websocket.recv())
+            
+        race = self.races.get(stream_name)
+        records = []
+        for message in messages:
+            try:
+                data = json.loads(message)
+            except json.JSONDecodeError:
+                logger.error(f"Failed to decode message from {stream_name}: {message}")
+                continue
+            if race is None or race.accept(event_identity(data), leg):
+                records.append(data)
+                
+        if records:
+            for batch_callback in self.batch_callbacks.get(stream_name, []):
+                try:
+                    await batch_callback(records)
+                except Exception as e:
+                    logger.error(f"Error processing batch of {len(records)} from {stream_name}: {e}")
+        return len(messages) - 1
+            
+    def _registered(self, stream_name: str) -> bool:
+        return bool(self.callbacks.get(stream_name) or self.batch_callbacks.get(stream_name))
         
-        if stream_name in self.connections:
-            del self.connections[stream_name]
+    async def _reconnect(self, stream_name: str, leg: int = 0, websocket=None):
+        """Reconnect to a stream (or one of its legs) after disconnection, retrying until it opens"""
+        if websocket is not None and self._socket(stream_name, leg) is not websocket:
+            return  # Disconnected on purpose, possibly already replaced by a new connection
+        if leg == 0:
+            self.connections.pop(stream_name, None)
+        else:
+            self.leg_connections.get(stream_name, {}).pop(leg, None)
             
-        if stream_name in self.callbacks and self.callbacks[stream_name]:
-            is_futures = "fstream" in stream_name or "@forceOrder" in stream_name
-            await self.connect(stream_name, self.callbacks[stream_name][0], is_futures)
+        # Callbacks stay registered; only the socket is reopened
+        delay = self.reconnect_delay
+        while True:
+            await asyncio.sleep(delay)  # Wait before reconnecting
+            if not self._registered(stream_name) or self._socket(stream_name, leg) is not None:
+                return
+            try:
+                await self._open(stream_name, leg)
+                return
+            except Exception:
+                delay = min(delay * 2, 60.0)
+            
+    def stale_after(self, stream_name: str, stats: StreamStats) -> float:
+        """Seconds of silence after which a stream connection is considered stalled"""
+        override = self.stale_overrides.get(stream_name)
+        if override is not None:
+            return override
+        if stats.gap is None or stats.messages < self.min_samples:
+            return self.spot_stale_default if stream_name.endswith(SPOT_SUFFIX) else self.stale_default
+        return min(max(stats.gap * self.stale_factor, self.stale_min), self.stale_max)
+        
+    def _socket(self, stream_name: str, leg: int):
+        if leg == 0:
+            return self.connections.get(stream_name)
+        return self.leg_connections.get(stream_name, {}).get(leg)
+        
+    async def watchdog(self, interval: float = 5.0):
+        """Close stalled connections so their handlers reconnect them"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for (stream_name, leg), stats in list(self.stream_stats.items()):
+                websocket = self._socket(stream_name, leg)
+                if websocket is None or stats.healing:
+                    continue
+                age = now - stats.last
+                limit = self.stale_after(stream_name, stats)
+                if age > limit:
+                    logger.warning(f"Stream {stream_name}" + (f" (leg {leg})" if leg else "") +
+                                   f" silent for {age:.0f}s (limit {limit:.0f}s), reconnecting")
+                    stats.healing = True
+                    stats.heals += 1
+                    asyncio.create_task(websocket.close())
+                    
+    def get_stream_health(self) -> Dict[str, Dict]:
+        """Per stream: state (ok/stale/reconnecting), last-message age, rate and heal counters"""
+        now = time.monotonic()
+        health = {}
+        for (stream_name, leg), stats in list(self.stream_stats.items()):
+            age = now - stats.last
+            limit = self.stale_after(stream_name, stats)
+            if self._socket(stream_name, leg) is None or stats.healing:
+                state = 'reconnecting'
+            elif age > limit:
+                state = 'stale'
+            else:
+                state = 'ok'
+            detail = {
+                'state': state,
+                'last_message_age': round(age, 3),
+                'rate': round(1 / stats.gap, 3) if stats.gap else None,
+                'stale_after': round(limit, 1),
+                'messages': stats.messages,
+                'reconnects': stats.reconnects,
+                'heals': stats.heals
+            }
+            entry = health.setdefault(stream_name, {'state': state, 'legs': []})
+            entry['legs'].append(detail)
+            # A redundant stream is fine while any leg is
+            if state == 'ok':
+                entry['state'] = 'ok'
+        for entry in health.values():
+            if len(entry['legs']) == 1:
+                entry.update(entry.pop('legs')[0])
+        return health
+        
+    async def disconnect(self, stream_name: str):
+        """Close a stream (by key), including any redundant legs, and forget its callbacks"""
+        self.callbacks.pop(stream_name, None)
+        self.batch_callbacks.pop(stream_name, None)
+        self.stream_markets.pop(stream_name, None)
+        self.redundancy.pop(stream_name, None)
+        self.races.pop(stream_name, None)
+        for stats_key in [k for k in self.stream_stats if k[0] == stream_name]:
+            del self.stream_stats[stats_key]
+        websockets_to_close = list(self.leg_connections.pop(stream_name, {}).values())
+        websocket = self.connections.pop(stream_name, None)
+        if websocket is not None:
+            websockets_to_close.append(websocket)
+        for websocket in websockets_to_close:
+            await websocket.close()
+            
+    def get_backlog(self) -> int:
+        """Frames received on all sockets but not yet consumed (ingest queue depth)"""
+        backlog = sum(self._buffered_frames(websocket) for websocket in list(self.connections.values()))
+        for legs in list(self.leg_connections.values()):
+            backlog += sum(self._buffered_frames(websocket) for websocket in list(legs.values()))
+        return backlog
+        
+    def get_redundancy_stats(self) -> Dict[str, Dict]:
+        """Per redundant stream: connected legs, wins per leg and the winner's lead"""
+        stats = {}
+        for stream_name, race in self.races.items():
+            connected = int(stream_name in self.connections) + len(self.leg_connections.get(stream_name, {}))
+            stats[stream_name] = {'legs': self.redundancy.get(stream_name, 1), 'connected': connected,
+                                  **race.get_stats()}
+        return stats
             
     async def subscribe_multiple(self, subscriptions: List[Dict]):
         """Subscribe to multiple streams at once"""
         tasks = []
         for sub in subscriptions:
-            task = self.connect(sub['stream'], sub['callback'], sub.get('is_futures', True))
+            task = self.connect(sub['stream'], sub['callback'], sub.get('is_futures', True),
+                                sub.get('batch_callback'), sub.get('redundancy', 1))
             tasks.append(task)
         await asyncio.gather(*tasks)
         
     async def close_all(self):
         """Close all WebSocket connections"""
-        for stream_name, websocket in self.connections.items():
-            await websocket.close()
+        websockets_to_close = list(self.connections.values())
+        for legs in self.leg_connections.values():
+            websockets_to_close.extend(legs.values())
+        # Forget the streams first so the closing handlers do not reconnect
         self.connections.clear()
-        self.callbacks.clear()
\ No newline at end of file
+        self.leg_connections.clear()
+        self.callbacks.clear()
+        self.batch_callbacks.clear()
+        self.redundancy.clear()
+        self.races.clear()
+        self.stream_stats.clear()
+        for websocket in websockets_to_close:
+            await websocket.close()
\ No newline at end of file